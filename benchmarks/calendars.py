@@ -0,0 +1,147 @@
+"""
+Compact the calendars of a synthetic regional network with many
+near-identical day types. Every original service must operate on the same
+days as the compacted service it is mapped to, and random calendars must
+never be compacted into more rows than they had.
+
+    python -m benchmarks.calendars [--services 500] [--exceptions 20] [--random-networks 200]
+"""
+import click
+import random
+import time
+
+from datetime import date, datetime, timedelta
+
+from x2gtfs.calendars import ServiceDays, compact_calendars
+from x2gtfs.models import Calendar, CalendarDate
+
+# weekday combinations of the day types, weekdays, Saturdays, Sundays and school days
+WEEKDAY_COMBINATIONS: tuple[tuple[int, ...], ...] = (
+    (1, 1, 1, 1, 1, 0, 0),
+    (0, 0, 0, 0, 0, 1, 0),
+    (0, 0, 0, 0, 0, 0, 1),
+    (1, 1, 1, 1, 1, 1, 0),
+    (0, 0, 0, 0, 0, 1, 1)
+)
+
+# holidays removed from most day types
+HOLIDAYS: tuple[date, ...] = tuple(date(2026, 1, 1) + timedelta(days=d) for d in (0, 5, 92, 95, 120, 130, 141, 151, 275, 358, 359))
+
+
+def _calendars(services: int, exceptions: int) -> tuple[dict[str, Calendar], dict[str, list[CalendarDate]]]:
+    random.seed(services)
+
+    calendars: dict[str, Calendar] = {}
+    calendar_exceptions: dict[str, list[CalendarDate]] = {}
+
+    for s in range(services):
+        service_id: str = f"service:{s + 1}"
+        calendars[f"T{s}"] = Calendar(service_id, *WEEKDAY_COMBINATIONS[s % len(WEEKDAY_COMBINATIONS)], '20260101', '20261231')
+
+        # most day types only differ in how the holidays and a few extra days are written
+        calendar_dates: list[CalendarDate] = [CalendarDate(service_id, d.strftime('%Y%m%d'), 2) for d in HOLIDAYS]
+        if s % 10 == 0:
+            calendar_dates.extend(
+                CalendarDate(service_id, (date(2026, 1, 1) + timedelta(days=random.randrange(365))).strftime('%Y%m%d'), random.choice((1, 2)))
+                for _ in range(exceptions)
+            )
+
+        calendar_exceptions[f"T{s}"] = calendar_dates
+
+    return calendars, calendar_exceptions
+
+
+def _random_calendars(seed: int) -> tuple[dict[str, Calendar], dict[str, list[CalendarDate]]]:
+    # a few services with random weekdays, validity and exceptions, some of them far outside the validity
+    random.seed(seed)
+
+    calendars: dict[str, Calendar] = {}
+    calendar_exceptions: dict[str, list[CalendarDate]] = {}
+
+    for s in range(random.randint(1, 8)):
+        service_id: str = f"service:{s + 1}"
+        start_date: date = date(2026, 1, 1) + timedelta(days=random.randrange(200))
+        end_date: date = start_date + timedelta(days=random.randrange(120))
+
+        if random.random() < 0.8:
+            weekdays: list[int] = [1 if random.random() < 0.6 else 0 for _ in range(7)]
+            calendars[f"T{s}"] = Calendar(service_id, *weekdays, start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d'))
+
+        calendar_exceptions[f"T{s}"] = [
+            CalendarDate(service_id, (start_date + timedelta(days=random.randrange(-30, 180))).strftime('%Y%m%d'), random.choice((1, 2)))
+            for _ in range(random.randrange(5))
+        ]
+
+    return calendars, calendar_exceptions
+
+
+def _check(calendars: dict[str, Calendar], calendar_exceptions: dict[str, list[CalendarDate]]) -> tuple[list[Calendar], list[CalendarDate]]:
+    """
+    Compact calendars, check the days of operation of every service and return the compacted rows.
+    """
+    calendar_rows, calendar_date_rows, service_id_mapping = compact_calendars(calendars, calendar_exceptions)
+
+    dates: list[str] = [cd.date for cdl in calendar_exceptions.values() for cd in cdl]
+    dates.extend(d for c in calendars.values() for d in (c.start_date, c.end_date))
+    dates.extend(d for c in calendar_rows for d in (c.start_date, c.end_date))
+    service_days: ServiceDays = ServiceDays(datetime.strptime(min(dates), '%Y%m%d').date(), datetime.strptime(max(dates), '%Y%m%d').date())
+
+    compacted: dict[str, int] = {
+        c.service_id: service_days.bitset(c, [cd for cd in calendar_date_rows if cd.service_id == c.service_id])
+        for c in calendar_rows
+    }
+    for service_id in {cd.service_id for cd in calendar_date_rows} - compacted.keys():
+        compacted[service_id] = service_days.bitset(None, [cd for cd in calendar_date_rows if cd.service_id == service_id])
+
+    for key, calendar_date_list in calendar_exceptions.items():
+        calendar: Calendar|None = calendars.get(key)
+        if calendar is None and not calendar_date_list:
+            continue
+
+        service_id: str = calendar.service_id if calendar is not None else calendar_date_list[0].service_id
+        if service_days.bitset(calendar, calendar_date_list) != compacted.get(service_id_mapping[service_id], 0):
+            raise RuntimeError(f"Compacted service of {service_id} operates on different days.")
+
+    rows: int = len(calendars) + sum(len(cdl) for cdl in calendar_exceptions.values())
+    if len(calendar_rows) + len(calendar_date_rows) > rows:
+        raise RuntimeError(f"Compaction grew {rows} rows to {len(calendar_rows) + len(calendar_date_rows)} rows.")
+
+    return calendar_rows, calendar_date_rows
+
+
+@click.command
+@click.option('--services', default=500, help='Number of day types')
+@click.option('--exceptions', default=20, help='Random exceptions of every tenth day type')
+@click.option('--random-networks', default=200, help='Random sets of calendars to check before the benchmark')
+def main(services, exceptions, random_networks):
+    # a single outlying date must not stretch the validity of the calendar row over many removed dates
+    calendar_rows, calendar_date_rows = _check(
+        {'T0': Calendar('service:1', 1, 1, 1, 1, 1, 1, 0, '20260115', '20260407')},
+        {'T0': [CalendarDate('service:1', '20260518', 1)]}
+    )
+    if len(calendar_rows) + len(calendar_date_rows) > 2:
+        raise RuntimeError("Outlying date stretches the compacted calendar.")
+
+    for seed in range(random_networks):
+        calendars, calendar_exceptions = _random_calendars(seed)
+        if any(calendar_exceptions.values()) or calendars:
+            _check(calendars, calendar_exceptions)
+
+    calendars, calendar_exceptions = _calendars(services, exceptions)
+    rows: int = len(calendars) + sum(len(cdl) for cdl in calendar_exceptions.values())
+
+    start: float = time.perf_counter()
+    compact_calendars(calendars, calendar_exceptions)
+    seconds: float = time.perf_counter() - start
+
+    calendar_rows, calendar_date_rows = _check(calendars, calendar_exceptions)
+    compacted_services: int = len({c.service_id for c in calendar_rows} | {cd.service_id for cd in calendar_date_rows})
+
+    print(f"{'calendars':<12} {'services':>9} {'calendar':>9} {'dates':>9}")
+    print(f"{'original':<12} {len(calendars):>9} {len(calendars):>9} {rows - len(calendars):>9}")
+    print(f"{'compacted':<12} {compacted_services:>9} {len(calendar_rows):>9} {len(calendar_date_rows):>9}")
+    print(f"compaction took {seconds:.3f}s, {rows / (len(calendar_rows) + len(calendar_date_rows)):.1f}x fewer rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for configuration lookups per timetable cell and per
+calendar row, comparing attribute chains on Configuration with the
+precompiled conversion plan.
+
+    python -m benchmarks.config_lookup [--count 1000000]
+"""
+import click
+import time
+
+from openpyxl.utils import column_index_from_string
+from typing import Callable
+
+from x2gtfs.config import Configuration
+from x2gtfs.plan import ConversionPlan, TimetablesPlan
+
+from benchmarks.synthetic import timetable_config
+
+
+def _cell_lookups_attribute_chains(count: int) -> None:
+    value: str = '06:00'
+    for _ in range(count):
+        if value == Configuration.config.timetables.run_through_char:
+            continue
+
+        column_index_from_string(Configuration.config.timetables.stop_identification_index)
+
+def _cell_lookups_plan(count: int) -> None:
+    plan: TimetablesPlan = Configuration.plan.timetables
+    run_through_char: str = plan.run_through_char
+    stop_identification_col: int = plan.stop_identification_col
+
+    value: str = '06:00'
+    for _ in range(count):
+        if value == run_through_char:
+            continue
+
+        stop_identification_col
+
+def _row_lookups_attribute_chains(count: int) -> None:
+    for _ in range(count):
+        for _ in range(7):
+            Configuration.config.mappings.calendar_day_type.dict().get('x', 0)
+
+def _row_lookups_plan(count: int) -> None:
+    plan: ConversionPlan = Configuration.plan
+    for _ in range(count):
+        day_type = plan.calendar_day_type
+        for _ in range(7):
+            day_type.get('x', 0)
+
+def _measure(func: Callable[[int], None], count: int) -> float:
+    start: float = time.perf_counter()
+    func(count)
+
+    return time.perf_counter() - start
+
+
+@click.command
+@click.option('--count', default=1000000, help='Number of cells and calendar rows')
+def main(count):
+    Configuration.apply_config(timetable_config('.'))
+
+    print(f"{'lookup':<20} {'attribute chains':>18} {'plan':>10} {'speedup':>9}")
+    for name, chains, plan in [
+        ('per cell', _cell_lookups_attribute_chains, _cell_lookups_plan),
+        ('per calendar row', _row_lookups_attribute_chains, _row_lookups_plan)
+    ]:
+        chains_seconds: float = _measure(chains, count)
+        plan_seconds: float = _measure(plan, count)
+
+        print(f"{name:<20} {chains_seconds / count * 1e9:>15.0f} ns {plan_seconds / count * 1e9:>7.0f} ns {chains_seconds / plan_seconds:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
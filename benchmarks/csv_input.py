@@ -0,0 +1,113 @@
+"""
+Compare reading a synthetic network from CSV exports with reading it from
+the workbooks. The CSV and the xlsx version of the network must convert
+into identical feeds before the time of the loading phases is reported.
+
+    python -m benchmarks.csv_input [--lines 10] [--trips 200] [--stops 30]
+"""
+import click
+import csv
+import glob
+import logging
+import os
+import tempfile
+
+from datetime import datetime, time
+from typing import Any
+from zipfile import ZipFile
+
+from x2gtfs.converter import Converter
+from x2gtfs.profiling import Phase, Profiler
+from x2gtfs.reader import iter_sheet_rows
+
+from benchmarks.synthetic import write_network
+
+# phases of a conversion which read input files
+LOADING_PHASES: tuple[str, ...] = ('stops metadata', 'calendar metadata', 'agency and route metadata', 'timetables')
+
+
+def _csv_value(value: Any, date_format: str) -> str:
+    # values are written the way spreadsheet applications export them
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime(date_format)
+    if isinstance(value, time):
+        return value.strftime('%H:%M:%S')
+
+    return str(value)
+
+def _export_csv(xlsx_filename: str, csv_filename: str, delimiter: str) -> None:
+    with open(csv_filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        for row in iter_sheet_rows(xlsx_filename):
+            writer.writerow([_csv_value(v, '%d.%m.%Y') for v in row])
+
+def _export_network(config: dict, directory: str, delimiter: str) -> dict:
+    """
+    Export all workbooks of a network into directory and return the configuration of the CSV files.
+    """
+    csv_config: dict = {'config': {**config['config'], 'csv': {'delimiter': delimiter}}}
+    csv_config['config']['metadata'] = {k: dict(v) for k, v in config['config']['metadata'].items()}
+    csv_config['config']['timetables'] = {**config['config']['timetables'], 'input_directory': os.path.join(directory, 'timetables')}
+
+    os.makedirs(os.path.join(directory, 'meta'), exist_ok=True)
+    for section in csv_config['config']['metadata'].values():
+        csv_filename: str = os.path.join(directory, 'meta', os.path.basename(section['input_filename'])[:-len('.xlsx')] + '.csv')
+        _export_csv(section['input_filename'], csv_filename, delimiter)
+        section['input_filename'] = csv_filename
+
+    os.makedirs(os.path.join(directory, 'timetables'))
+    for xlsx_filename in glob.glob(os.path.join(config['config']['timetables']['input_directory'], '*.xlsx')):
+        _export_csv(xlsx_filename, os.path.join(directory, 'timetables', os.path.basename(xlsx_filename)[:-len('.xlsx')] + '.csv'), delimiter)
+
+    return csv_config
+
+def _convert(config: dict, reader: str, output_filename: str) -> list[Phase]:
+    profiler: Profiler = Profiler()
+    Converter(config, reader=reader).convert(profiler=profiler).write(output_filename)
+
+    return [p for p in profiler.phases if p.name in LOADING_PHASES]
+
+def _members(zip_filename: str) -> dict[str, bytes]:
+    with ZipFile(zip_filename) as zipf:
+        return {name: zipf.read(name) for name in zipf.namelist()}
+
+
+@click.command
+@click.option('--lines', default=10, help='Lines of the synthetic network, each in its own timetable file')
+@click.option('--trips', default=200, help='Trips per line')
+@click.option('--stops', default=30, help='Stops per trip')
+@click.option('--delimiter', default=';', help='Delimiter of the CSV exports')
+def main(lines, trips, stops, delimiter):
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        config: dict = write_network(os.path.join(directory, 'xlsx'), lines, trips, stops, pairs=5)
+        csv_config: dict = _export_network(config, os.path.join(directory, 'csv'), delimiter)
+
+        runs: list[tuple[str, list[Phase]]] = []
+        for name, run_config, reader in (('xlsx openpyxl', config, 'openpyxl'), ('xlsx fast', config, 'fast'), ('csv', csv_config, 'openpyxl')):
+            output_filename: str = os.path.join(directory, f"{name.replace(' ', '_')}.zip")
+            runs.append((name, _convert(run_config, reader, output_filename)))
+
+        reference: dict[str, bytes] = _members(os.path.join(directory, 'xlsx_openpyxl.zip'))
+        if _members(os.path.join(directory, 'csv.zip')) != reference:
+            raise RuntimeError("CSV and xlsx input produce different feeds.")
+
+    stop_times: int = next(p.rows for p in runs[0][1] if p.name == 'timetables')
+
+    print(f"CSV and xlsx input produce identical feeds with {stop_times} stop times")
+    print(f"{'input':<14} {'metadata':>9} {'timetables':>11} {'stop times/s':>13}")
+    for name, phases in runs:
+        metadata_seconds: float = sum(p.wall_time for p in phases if p.name != 'timetables')
+        timetable_seconds: float = sum(p.wall_time for p in phases if p.name == 'timetables')
+        print(f"{name:<14} {metadata_seconds:>8.3f}s {timetable_seconds:>10.3f}s {stop_times / timetable_seconds:>13,.0f}")
+
+    xlsx_seconds: float = sum(p.wall_time for p in runs[0][1])
+    csv_seconds: float = sum(p.wall_time for p in runs[2][1])
+    print(f"csv loads {xlsx_seconds / csv_seconds:.1f}x faster than xlsx with openpyxl")
+
+
+if __name__ == '__main__':
+    main()
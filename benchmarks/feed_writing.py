@@ -0,0 +1,93 @@
+"""
+Write the feed of a synthetic network in full and incrementally, against
+a previous feed of the same network and of a network with other trips,
+with one and with several compression threads. All runs must write
+identical members before the times are reported.
+
+    python -m benchmarks.feed_writing [--lines 20] [--trips 200] [--stops 30] [--workers 4] [--compression-level 9]
+"""
+import click
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from zipfile import ZipFile
+
+from x2gtfs.config import Configuration
+from x2gtfs.gtfs import Feed
+from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files
+
+from benchmarks.synthetic import write_network
+
+
+def _feed(directory: str, lines: int, trips: int, stops: int, workers: int, compression_level: int|None) -> Feed:
+    Configuration.apply_config(write_network(directory, lines, trips, stops, pairs=5))
+
+    stop_list = load_stop_metadata()
+    calendar_list, calendar_date_list = load_calendar_metadata()
+    agency_list, route_list = load_agency_and_route_metadata()
+    trip_list, stop_time_list = process_timetable_files(stop_list, calendar_list, calendar_date_list, agency_list, route_list)
+
+    feed: Feed = Feed(compresslevel=compression_level, workers=workers)
+    feed.add_data('stops.txt', list(stop_list.values()))
+    feed.add_data('agency.txt', list(agency_list.values()))
+    feed.add_data('routes.txt', list(route_list.values()))
+    feed.add_data('calendar.txt', list(calendar_list.values()))
+    feed.add_data('calendar_dates.txt', [cd for cdl in calendar_date_list.values() for cd in cdl])
+    feed.add_data('trips.txt', trip_list)
+    feed.add_data('stop_times.txt', stop_time_list)
+
+    return feed
+
+def _members(zip_filename: str) -> dict[str, bytes]:
+    with ZipFile(zip_filename) as zipf:
+        return {name: zipf.read(name) for name in zipf.namelist()}
+
+
+@click.command
+@click.option('--lines', default=20, help='Number of lines, one timetable workbook each')
+@click.option('--trips', default=200, help='Trips per line')
+@click.option('--stops', default=30, help='Stops per trip')
+@click.option('--workers', default=4, help='Compression threads of the parallel runs')
+@click.option('--compression-level', default=None, type=int, help='DEFLATE level of the feeds')
+def main(lines, trips, stops, workers, compression_level):
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        feeds: dict[int, Feed] = {w: _feed(os.path.join(directory, f"network{w}"), lines, trips, stops, w, compression_level) for w in (1, workers)}
+
+        # previous feeds of the same network and of a network with other trips
+        unchanged_filename: str = os.path.join(directory, 'unchanged.zip')
+        feeds[1].write(unchanged_filename)
+        changed_filename: str = os.path.join(directory, 'changed.zip')
+        _feed(os.path.join(directory, 'other'), lines, trips // 2, stops, 1, compression_level).write(changed_filename)
+
+        runs: list[tuple[str, int, float]] = []
+        reference: dict[str, bytes]|None = None
+        for name, previous_filename in (('full', None), ('incremental unchanged', unchanged_filename), ('incremental changed', changed_filename)):
+            for w, feed in feeds.items():
+                output_filename: str = os.path.join(directory, 'output.zip')
+                if previous_filename is not None:
+                    shutil.copyfile(previous_filename, output_filename)
+
+                start: float = time.perf_counter()
+                feed.write(output_filename, output_filename if previous_filename is not None else None)
+                runs.append((name, w, time.perf_counter() - start))
+
+                members: dict[str, bytes] = _members(output_filename)
+                if reference is None:
+                    reference = members
+                elif members != reference:
+                    raise RuntimeError(f"Feed written {name} with {w} threads differs from the full feed.")
+
+                os.remove(output_filename)
+
+    print(f"{'write':<22} {'threads':>7} {'seconds':>8}")
+    for name, w, seconds in runs:
+        print(f"{name:<22} {w:>7} {seconds:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Compress a synthetic high-frequency network into frequencies.txt and
+compare trips, stop times and feed size with the uncompressed feed. The
+network is written as workbooks and parsed like a conversion does, so
+every trip has its own short name. The frequencies are expanded again and
+must reproduce every original trip exactly once, whether consumers take
+the end time of a frequency as exclusive or as inclusive.
+
+    python -m benchmarks.frequencies [--lines 20] [--stops 30] [--store objects]
+"""
+import click
+import logging
+import os
+import tempfile
+import time
+
+from x2gtfs.config import Configuration
+from x2gtfs.frequencies import compress_frequencies
+from x2gtfs.gtfs import Feed
+from x2gtfs.models import Trip, StopTime, Frequency
+from x2gtfs.patterns import PatternIndex
+from x2gtfs.times import time_to_seconds
+from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files, STOP_TIME_STORES
+
+from benchmarks.synthetic import write_network
+
+# (first departure, last departure, headway) in minutes of each period of a service day
+PERIODS: tuple[tuple[int, int, int], ...] = ((300, 540, 10), (540, 900, 15), (900, 1140, 10), (1140, 1380, 30))
+
+# departures of the late evening, no constant headway
+IRREGULAR_DEPARTURES: tuple[int, ...] = (1405, 1422, 1434)
+
+
+def _frequency_starts(frequency: Frequency, inclusive: bool) -> range:
+    end: int = time_to_seconds(frequency.end_time) + (1 if inclusive else 0)
+    return range(time_to_seconds(frequency.start_time), end, frequency.headway_secs)
+
+def _expand(trips: list[Trip], stop_times: list[StopTime], frequencies: list[Frequency], inclusive: bool = False) -> list[tuple]:
+    # (route, service, departure at the first stop) of every trip the feed describes, sorted
+    first_departures: dict[str, int] = {}
+    for stop_time in stop_times:
+        if stop_time.stop_sequence == 1:
+            first_departures[stop_time.trip_id] = time_to_seconds(stop_time.departure_time)
+
+    trip_index: dict[str, Trip] = {t.trip_id: t for t in trips}
+    frequency_trip_ids: set[str] = {f.trip_id for f in frequencies}
+
+    result: list[tuple] = [
+        (t.route_id, t.service_id, first_departures[t.trip_id])
+        for t in trips if t.trip_id not in frequency_trip_ids
+    ]
+    for frequency in frequencies:
+        trip: Trip = trip_index[frequency.trip_id]
+        result.extend((trip.route_id, trip.service_id, start) for start in _frequency_starts(frequency, inclusive))
+
+    return sorted(result)
+
+def _feed_size(filename: str, trips: list[Trip], stop_times: list[StopTime], frequencies: list[Frequency]) -> int:
+    feed: Feed = Feed()
+    feed.add_data('trips.txt', trips)
+    feed.add_data('stop_times.txt', stop_times)
+    if frequencies:
+        feed.add_data('frequencies.txt', frequencies)
+
+    feed.write(filename)
+
+    return os.path.getsize(filename)
+
+
+@click.command
+@click.option('--lines', default=20, help='Number of lines')
+@click.option('--stops', default=30, help='Stops per trip')
+@click.option('--store', type=click.Choice(list(STOP_TIME_STORES)), default='objects', help='Container for stop times')
+def main(lines, stops, store):
+    logging.disable(logging.WARNING)
+
+    departures: list[int] = [m for first, last, headway in PERIODS for m in range(first, last, headway)] + list(IRREGULAR_DEPARTURES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Configuration.apply_config(write_network(directory, lines, len(departures), stops, departures=departures))
+
+        metadata: tuple = (load_stop_metadata(), *load_calendar_metadata(), *load_agency_and_route_metadata())
+        patterns: PatternIndex = PatternIndex()
+        trips, stop_times = process_timetable_files(*metadata, stop_time_store=store, patterns=patterns)
+        expanded: list[tuple] = _expand(trips, stop_times, [])
+
+        results: list[tuple[str, list[Trip], int, list[Frequency], int, float]] = [
+            ('full', trips, len(stop_times), [], _feed_size(os.path.join(directory, 'full.zip'), trips, stop_times, []), 0.0)
+        ]
+
+        for name, drop_short_names in (('short names', False), ('no short names', True)):
+            start: float = time.perf_counter()
+            compressed_trips, compressed_stop_times, frequencies = compress_frequencies(trips, stop_times, drop_short_names=drop_short_names, patterns=patterns)
+            seconds: float = time.perf_counter() - start
+
+            for inclusive in (False, True):
+                if _expand(compressed_trips, compressed_stop_times, frequencies, inclusive) != expanded:
+                    raise RuntimeError(f"Expanded frequencies differ from the original trips with {name}, end times {'inclusive' if inclusive else 'exclusive'}.")
+
+            size: int = _feed_size(os.path.join(directory, f"{drop_short_names}.zip"), compressed_trips, compressed_stop_times, frequencies)
+            results.append((name, compressed_trips, len(compressed_stop_times), frequencies, size, seconds))
+
+    print(f"{'feed':<16} {'trips':>8} {'stop_times':>11} {'frequencies':>12} {'zip KiB':>9} {'seconds':>8}")
+    for name, result_trips, stop_time_count, frequencies, size, seconds in results:
+        print(f"{name:<16} {len(result_trips):>8} {stop_time_count:>11} {len(frequencies):>12} {size / 1024:>9.1f} {seconds:>8.3f}")
+
+    print(f"without short names stop_times.txt {results[0][2] / results[2][2]:.1f}x and zip {results[0][4] / results[2][4]:.1f}x smaller")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare the memory used by one million stop times stored as plain
+dataclasses with copied identifiers against the slotted models with
+shared identifiers.
+
+    python -m benchmarks.model_memory [--count 1000000]
+"""
+import click
+import gc
+import tracemalloc
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from x2gtfs.models import StopTime
+
+
+@dataclass
+class _PlainStopTime:
+    trip_id: str = ""
+    arrival_time: str = "00:00:00"
+    departure_time: str = "00:00:00"
+    stop_id: str = ""
+    stop_sequence: int = 0
+    stop_headsign: Optional[str] = None
+    pickup_type: Optional[int] = None
+    drop_off_type: Optional[int] = None
+    shape_dist_traveled: Optional[float] = None
+    timepoint: Optional[int] = None
+
+
+def _plain(count: int) -> list:
+    # every stop time carries its own copy of the identifiers
+    return [
+        _PlainStopTime(f"de:trip:sample:{i // 30 + 1}", "10:00:00", "10:00:00", f"de:08215:{i % 500}", i % 30 + 1)
+        for i in range(count)
+    ]
+
+def _slotted(count: int) -> list:
+    interned_ids: dict[str, str] = {}
+
+    result: list[StopTime] = []
+    for i in range(count):
+        trip_id: str = f"de:trip:sample:{i // 30 + 1}"
+        stop_id: str = f"de:08215:{i % 500}"
+        result.append(StopTime(
+            interned_ids.setdefault(trip_id, trip_id),
+            "10:00:00",
+            "10:00:00",
+            interned_ids.setdefault(stop_id, stop_id),
+            i % 30 + 1
+        ))
+
+    return result
+
+def _measure(func: Callable[[int], list], count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result: list = func(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    return current
+
+
+@click.command
+@click.option('--count', default=1000000, help='Number of stop times')
+def main(count):
+    print(f"{'representation':<28} {'MiB':>9} {'bytes/stop time':>16}")
+    for name, func in (('plain dataclass', _plain), ('slotted, interned ids', _slotted)):
+        size: int = _measure(func, count)
+        print(f"{name:<28} {size / 2**20:>9.1f} {size / count:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark parsing a directory of timetable files with a growing number
+of worker processes. Each run is checked to produce the same trips and
+stop times as the serial run.
+
+    python -m benchmarks.parallel_timetables [--files 32] [--jobs 1,2,4,8]
+"""
+import click
+import logging
+import tempfile
+import time
+
+from dataclasses import astuple
+
+from x2gtfs.config import Configuration
+from x2gtfs.x2gtfs import process_timetable_files
+
+from benchmarks.synthetic import timetable_config, write_timetable_directory
+
+
+@click.command
+@click.option('--files', default=32, help='Number of timetable workbooks')
+@click.option('--trips', default=60, help='Trips per workbook')
+@click.option('--stops', default=25, help='Stops per trip')
+@click.option('--jobs', 'job_counts', default='1,2,4,8', help='Comma separated worker counts to measure')
+def main(files, trips, stops, job_counts):
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_timetable_directory(directory, files, trips, stops, pairs=3)
+        Configuration.apply_config(timetable_config(directory))
+
+        reference: list[tuple]|None = None
+        serial: float|None = None
+
+        print(f"{'jobs':>5} {'seconds':>9} {'speedup':>8}")
+        for jobs in [int(j) for j in job_counts.split(',')]:
+            start: float = time.perf_counter()
+            trip_list, stop_time_list = process_timetable_files({}, {}, {}, {}, {}, jobs=jobs)
+            elapsed: float = time.perf_counter() - start
+
+            result: list[tuple] = [astuple(t) for t in trip_list] + [astuple(st) for st in stop_time_list]
+            if reference is None:
+                reference, serial = result, elapsed
+            elif result != reference:
+                raise RuntimeError(f"Result with {jobs} jobs differs from the first run.")
+
+            print(f"{jobs:>5} {elapsed:>9.3f} {serial / elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark all stages of a conversion on a synthetic network and append
+the results to a JSON lines file, so runs of different commits can be
+compared.
+
+Each stage is run once untraced for wall and CPU time and throughput, and
+once more with tracemalloc for its peak memory, as tracing distorts the
+timings of workbook loading.
+
+    python -m benchmarks.pipeline [--lines 20] [--trips 100] [--stops 30] [--pairs 5]
+    python -m benchmarks.pipeline --compare benchmark_results.jsonl
+"""
+import click
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import tracemalloc
+
+from datetime import datetime, timezone
+from typing import Any
+
+from x2gtfs.config import Configuration
+from x2gtfs.gtfs import Feed
+from x2gtfs.profiling import Phase, Profiler
+from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files
+
+from benchmarks.synthetic import write_network
+
+
+def _commit() -> str|None:
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _run_stages(output_filename: str, trace_memory: bool) -> list[Phase]:
+    profiler: Profiler = Profiler(trace_memory=trace_memory)
+
+    with profiler.phase('load_stop_metadata') as phase:
+        stops = load_stop_metadata()
+        phase.rows = len(stops)
+
+    with profiler.phase('load_calendar_metadata') as phase:
+        calendars, calendar_exceptions = load_calendar_metadata()
+        phase.rows = len(calendars) + sum(len(cdl) for cdl in calendar_exceptions.values())
+
+    with profiler.phase('load_agency_and_route_metadata') as phase:
+        agencies, routes = load_agency_and_route_metadata()
+        phase.rows = len(agencies) + len(routes)
+
+    with profiler.phase('process_timetable_files') as phase:
+        trips, stop_times = process_timetable_files(stops, calendars, calendar_exceptions, agencies, routes)
+        phase.rows = len(stop_times)
+
+    feed: Feed = Feed()
+    feed.add_data('stops.txt', list(stops.values()))
+    feed.add_data('calendar.txt', list(calendars.values()))
+    feed.add_data('calendar_dates.txt', [cd for cdl in calendar_exceptions.values() for cd in cdl])
+    feed.add_data('agency.txt', list(agencies.values()))
+    feed.add_data('routes.txt', list(routes.values()))
+    feed.add_data('trips.txt', trips)
+    feed.add_data('stop_times.txt', stop_times)
+
+    with profiler.phase('Feed.write') as phase:
+        feed.write(output_filename)
+        phase.rows = len(stops) + len(calendars) + len(agencies) + len(routes) + len(trips) + len(stop_times)
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    return profiler.phases
+
+def _compare(results_filename: str) -> None:
+    with open(results_filename, 'r', encoding='utf-8') as f:
+        runs: list[dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+
+    stages: list[str] = list(dict.fromkeys(s['name'] for run in runs for s in run['stages']))
+
+    print(f"{'commit':<20} {'network':<20}" + ''.join(f" {s[:24]:>24}" for s in stages))
+    for run in runs:
+        parameters: dict[str, int] = run['parameters']
+        network: str = f"{parameters['lines']}x{parameters['trips']}x{parameters['stops']}/{parameters['pairs']}"
+        seconds: dict[str, float] = {s['name']: s['wall_time'] for s in run['stages']}
+
+        print(f"{str(run['commit']):<20} {network:<20}" + ''.join(
+            f" {seconds[s]:>23.3f}s" if s in seconds else f" {'':>24}" for s in stages
+        ))
+
+
+@click.command
+@click.option('--lines', default=20, help='Number of lines, one timetable workbook each')
+@click.option('--trips', default=100, help='Trips per line')
+@click.option('--stops', default=30, help='Stops per trip')
+@click.option('--pairs', default=5, help='Stops per trip with arrival and departure row')
+@click.option('--results', 'results_filename', default='benchmark_results.jsonl', type=click.Path(dir_okay=False), help='JSON lines file the results are appended to')
+@click.option('--memory/--no-memory', default=True, help='Measure peak memory in a second, traced run')
+@click.option('--compare', 'compare_filename', default=None, type=click.Path(exists=True, dir_okay=False), help='Print the stage times of all runs in a results file and exit')
+def main(lines, trips, stops, pairs, results_filename, memory, compare_filename):
+    if compare_filename is not None:
+        _compare(compare_filename)
+        return
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Configuration.apply_config(write_network(directory, lines, trips, stops, pairs))
+
+        output_filename: str = os.path.join(directory, 'feed.zip')
+        phases: list[Phase] = _run_stages(output_filename, trace_memory=False)
+        feed_size: int = os.path.getsize(output_filename)
+
+        if memory:
+            for phase, traced_phase in zip(phases, _run_stages(output_filename, trace_memory=True)):
+                phase.peak_memory = traced_phase.peak_memory
+
+    result: dict[str, Any] = {
+        'commit': _commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'parameters': {'lines': lines, 'trips': trips, 'stops': stops, 'pairs': pairs},
+        'feed_size': feed_size,
+        'stages': [
+            {
+                'name': phase.name,
+                'wall_time': phase.wall_time,
+                'cpu_time': phase.cpu_time,
+                'rows': phase.rows,
+                'rows_per_second': phase.rows / phase.wall_time if phase.wall_time > 0 else None,
+                'peak_memory': phase.peak_memory
+            }
+            for phase in phases
+        ]
+    }
+
+    with open(results_filename, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+
+    print(f"{'stage':<32} {'seconds':>9} {'rows':>10} {'rows/s':>12} {'peak MiB':>9}")
+    for stage in result['stages']:
+        peak_memory: str = '' if stage['peak_memory'] is None else f"{stage['peak_memory'] / 2**20:.1f}"
+        print(f"{stage['name']:<32} {stage['wall_time']:>9.3f} {stage['rows']:>10} {stage['rows_per_second']:>12.0f} {peak_memory:>9}")
+
+    print(f"Results appended to {results_filename}")
+
+
+if __name__ == '__main__':
+    main()
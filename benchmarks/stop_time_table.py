@@ -0,0 +1,76 @@
+"""
+Compare a list of StopTime objects with the columnar StopTimeTable and
+the disk-backed SqliteStopTimeTable in memory use and stop_times.txt
+serialization time. Memory of SQLite itself, at most its page cache, is
+not traced.
+
+    python -m benchmarks.stop_time_table [--count 1000000]
+"""
+import click
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from datetime import time as dtime
+from typing import Any, Callable
+
+from x2gtfs.gtfs import Feed
+from x2gtfs.models import StopTime
+from x2gtfs.tables import SqliteStopTimeTable, StopTimeTable
+
+
+def _stop_times(count: int) -> list[StopTime]:
+    trip_ids: list[str] = [f"de:trip:sample:{i + 1}" for i in range(count // 30 + 1)]
+    stop_ids: list[str] = [f"de:08215:{i}" for i in range(500)]
+
+    result: list[StopTime] = []
+    for i in range(count):
+        minute: int = (i * 7) % 1440
+        departure: dtime = dtime(minute // 60, minute % 60)
+        result.append(StopTime(trip_ids[i // 30], departure, departure, stop_ids[i % 500], i % 30 + 1))
+
+    return result
+
+def _measure(func: Callable[[], Any]) -> tuple[Any, int]:
+    gc.collect()
+    tracemalloc.start()
+    result: Any = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, current
+
+def _write(stop_times: Any, filename: str) -> float:
+    feed: Feed = Feed()
+    feed.add_data('stop_times.txt', stop_times)
+
+    start: float = time.perf_counter()
+    feed.write(filename)
+
+    return time.perf_counter() - start
+
+
+@click.command
+@click.option('--count', default=1000000, help='Number of stop times')
+def main(count):
+    stop_time_list, list_size = _measure(lambda: _stop_times(count))
+    table, table_size = _measure(lambda: StopTimeTable(stop_time_list))
+    sqlite_table, sqlite_size = _measure(lambda: SqliteStopTimeTable(stop_time_list))
+
+    with tempfile.TemporaryDirectory() as directory:
+        list_seconds: float = _write(stop_time_list, os.path.join(directory, 'list.zip'))
+        table_seconds: float = _write(table, os.path.join(directory, 'table.zip'))
+        sqlite_seconds: float = _write(sqlite_table, os.path.join(directory, 'sqlite.zip'))
+
+    sqlite_table.close()
+
+    print(f"{'container':<20} {'MiB':>9} {'bytes/stop time':>16} {'write seconds':>14}")
+    print(f"{'list[StopTime]':<20} {list_size / 2**20:>9.1f} {list_size / count:>16.1f} {list_seconds:>14.2f}")
+    print(f"{'StopTimeTable':<20} {table_size / 2**20:>9.1f} {table_size / count:>16.1f} {table_seconds:>14.2f}")
+    print(f"{'SqliteStopTimeTable':<20} {sqlite_size / 2**20:>9.1f} {sqlite_size / count:>16.1f} {sqlite_seconds:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
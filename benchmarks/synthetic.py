@@ -0,0 +1,256 @@
+import os
+import yaml
+
+from datetime import datetime, time, timedelta
+from openpyxl import Workbook
+from openpyxl.worksheet.worksheet import Worksheet
+
+
+def timetable_config(input_directory: str) -> dict:
+    """
+    Build a configuration matching the layout written by write_timetable_workbook.
+
+    Args:
+        input_directory: Directory containing the synthetic timetable workbooks
+
+    Returns:
+        Configuration dict suitable for Configuration.apply_config
+    """
+    return {
+        'config': {
+            'metadata': {},
+            'timetables': {
+                'input_directory': input_directory,
+                'layout_type': 'vertical',
+                'run_through_char': '$',
+                'data_start_area': 'C6',
+                'stop_identification_index': 'B',
+                'route_identification_index': 1,
+                'service_identification_index': 5,
+                'shape_identification_index': 2,
+                'trip_short_name_index': 3,
+                'trip_headsign_index': 4
+            },
+            'mappings': {
+                'route_type': {},
+                'calendar_day_type': {'x': 1, '': 0},
+                'calendar_exception_type': {'verkehrt': 1, 'verkehrt nicht': 2}
+            },
+            'defaults': {
+                'trip_id_pattern': 'bench:trip:{trip_id}',
+                'service_id_pattern': 'bench:service:{service_id}'
+            }
+        }
+    }
+
+
+def write_timetable_workbook(filename: str, line: str, num_trips: int, num_stops: int, pairs: int = 0, departures: list[int]|None = None) -> int:
+    """
+    Write a vertical timetable workbook in the layout of samples/simplexl.
+
+    Args:
+        filename: Target .xlsx filename
+        line: Route identification written into the header rows
+        num_trips: Number of trip columns
+        num_stops: Number of stops per trip
+        pairs: Number of stops per trip listed twice with arrival and departure time
+        departures: Departure of each trip at its first stop in minutes, None for departures every 7 minutes
+
+    Returns:
+        Number of time cells written
+    """
+    wb: Workbook = Workbook()
+    ws: Worksheet = wb.active
+
+    ws.cell(1, 2, 'Linie')
+    ws.cell(2, 2, 'Route')
+    ws.cell(3, 2, 'Zug')
+    ws.cell(4, 2, 'Ziel')
+    ws.cell(5, 1, 'Haltestelle')
+    ws.cell(5, 2, 'Kürzel / Tagesart')
+
+    # build the stop rows, the first `pairs` stops get an arrival and a departure row
+    stop_rows: list[str] = []
+    for s in range(num_stops):
+        stop_rows.append(f"{line}S{s}")
+        if s < pairs:
+            stop_rows.append(f"{line}S{s}")
+
+    for r, stop_idx in enumerate(stop_rows):
+        ws.cell(6 + r, 1, stop_idx)
+        ws.cell(6 + r, 2, stop_idx)
+
+    cells: int = 0
+    for t in range(num_trips):
+        col: int = 3 + t
+        ws.cell(1, col, line)
+        ws.cell(2, col, f"{line}>{line}")
+        ws.cell(3, col, f"{line}{t}")
+        ws.cell(4, col, f"{line}S{num_stops - 1}")
+        ws.cell(5, col, 'Weekday')
+
+        minute: int = departures[t] if departures is not None else 5 * 60 + (t * 7) % (17 * 60)
+        for r in range(len(stop_rows)):
+            ws.cell(6 + r, col, time(minute // 60 % 24, minute % 60))
+            minute += 1 if r + 1 < len(stop_rows) and stop_rows[r + 1] == stop_rows[r] else 2
+            cells += 1
+
+    wb.save(filename)
+
+    return cells
+
+
+def write_timetable_directory(directory: str, num_files: int, num_trips: int, num_stops: int, pairs: int = 0) -> int:
+    """
+    Write num_files synthetic timetable workbooks into directory.
+
+    Returns:
+        Total number of time cells written
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    cells: int = 0
+    for f in range(num_files):
+        cells += write_timetable_workbook(
+            os.path.join(directory, f"L{f:03d}.xlsx"),
+            f"L{f:03d}",
+            num_trips,
+            num_stops,
+            pairs
+        )
+
+    return cells
+
+
+def network_config(directory: str) -> dict:
+    """
+    Build a configuration in the layout of samples/simplexl/config.yaml for
+    a network written by write_network.
+
+    Args:
+        directory: Directory containing the synthetic network
+
+    Returns:
+        Configuration dict suitable for Configuration.apply_config
+    """
+    config: dict = timetable_config(os.path.join(directory, 'timetables'))
+    config['config']['metadata'] = {
+        'stops': {
+            'input_filename': os.path.join(directory, 'meta', 'Haltestellen.xlsx'),
+            'stop_identification_index': 'C',
+            'stop_id_index': 'A',
+            'stop_name_index': 'B',
+            'stop_lat_index': 'D',
+            'stop_lon_index': 'E'
+        },
+        'routes': {
+            'input_filename': os.path.join(directory, 'meta', 'LinienUnternehmer.xlsx'),
+            'route_identification_index': 'D',
+            'route_id_index': 'A',
+            'route_short_name_index': 'B',
+            'route_long_name_index': 'C',
+            'route_type_index': 'E',
+            'route_color_index': 'F',
+            'route_text_color_index': 'G',
+            'agency_name_index': 'H',
+            'agency_url_index': 'I'
+        },
+        'calendars': {
+            'input_filename': os.path.join(directory, 'meta', 'Kalender.xlsx'),
+            'date_format': '%d.%m.%Y',
+            'service_identification_index': 'A',
+            'monday_index': 'B',
+            'tuesday_index': 'C',
+            'wednesday_index': 'D',
+            'thursday_index': 'E',
+            'friday_index': 'F',
+            'saturday_index': 'G',
+            'sunday_index': 'H',
+            'start_date_index': 'I',
+            'end_date_index': 'J'
+        },
+        'calendar_exceptions': {
+            'input_filename': os.path.join(directory, 'meta', 'KalenderAusnahmen.xlsx'),
+            'date_format': '%d.%m.%Y',
+            'service_identification_index': 'A',
+            'date_index': 'B',
+            'exception_type_index': 'C'
+        }
+    }
+    config['config']['mappings']['route_type'] = {'Straßenbahn': 0, 'Bus': 3}
+
+    return config
+
+
+def _write_rows(filename: str, rows: list[tuple]) -> None:
+    wb: Workbook = Workbook()
+    ws: Worksheet = wb.active
+
+    for row in rows:
+        ws.append(row)
+
+    wb.save(filename)
+
+
+def write_network(directory: str, num_lines: int, num_trips: int, num_stops: int, pairs: int = 0, departures: list[int]|None = None) -> dict:
+    """
+    Write a synthetic network in the layout of samples/simplexl into directory.
+
+    The network consists of stop, route, calendar and calendar exception
+    metadata workbooks, one vertical timetable workbook per line and a
+    config.yaml referencing all of them.
+
+    Args:
+        directory: Target directory
+        num_lines: Number of lines, each line gets its own timetable workbook
+        num_trips: Trips per line
+        num_stops: Stops per trip
+        pairs: Stops per trip listed twice with arrival and departure time
+        departures: Departure of each trip at its first stop in minutes, see write_timetable_workbook
+
+    Returns:
+        Configuration dict of the network, as written to config.yaml
+    """
+    os.makedirs(os.path.join(directory, 'meta'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'timetables'), exist_ok=True)
+
+    lines: list[str] = [f"L{f:03d}" for f in range(num_lines)]
+
+    _write_rows(os.path.join(directory, 'meta', 'Haltestellen.xlsx'), [
+        ('ID', 'Name', 'Kürzel', 'Breitengrad', 'Längengrad'),
+        *(
+            (f"de:bench:{line}:{s}", f"{line} Haltestelle {s}", f"{line}S{s}", f"{48.9 + s * 0.001:.6f}", f"{8.4 + l * 0.001:.6f}")
+            for l, line in enumerate(lines) for s in range(num_stops)
+        )
+    ])
+
+    _write_rows(os.path.join(directory, 'meta', 'LinienUnternehmer.xlsx'), [
+        ('ID', 'Name', 'Langname', 'Kürzel', 'Typ', 'Farbe', 'Textfarbe', 'Unternehmer', 'Webadresse'),
+        *(
+            (f"de:bench:{line}", line, f"Linie {line}", line, 'Bus' if l % 2 else 'Straßenbahn', 'FF0000', 'FFFFFF', f"Unternehmer {l % 3}", 'https://example.org')
+            for l, line in enumerate(lines)
+        )
+    ])
+
+    _write_rows(os.path.join(directory, 'meta', 'Kalender.xlsx'), [
+        ('Bezeichnung', 'Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag', 'Startdatum', 'Enddatum'),
+        ('Weekday', 'x', 'x', 'x', 'x', 'x', None, None, datetime(2026, 1, 1), datetime(2026, 12, 31)),
+        ('Weekend', None, None, None, None, None, 'x', 'x', '01.01.2026', '31.12.2026')
+    ])
+
+    _write_rows(os.path.join(directory, 'meta', 'KalenderAusnahmen.xlsx'), [
+        ('Kalender', 'Datum', 'Ausnahme', 'Beschreibung'),
+        *(
+            ('Weekday', datetime(2026, 1, 1) + timedelta(days=d), 'verkehrt nicht', 'Feiertag')
+            for d in (0, 95, 98, 120, 128, 139, 149, 358, 359)
+        )
+    ])
+
+    for line in lines:
+        write_timetable_workbook(os.path.join(directory, 'timetables', f"{line}.xlsx"), line, num_trips, num_stops, pairs, departures)
+
+    config: dict = network_config(directory)
+    with open(os.path.join(directory, 'config.yaml'), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(config, f, allow_unicode=True, sort_keys=False)
+
+    return config
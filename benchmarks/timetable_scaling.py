@@ -0,0 +1,48 @@
+"""
+Regression benchmark for process_timetable_files.
+
+Converts synthetic timetables of growing size and prints the time per
+stop time cell. A linear conversion keeps this value roughly constant,
+a quadratic one grows with the input size.
+
+    python -m benchmarks.timetable_scaling
+"""
+import click
+import logging
+import tempfile
+import time
+
+from x2gtfs.config import Configuration
+from x2gtfs.x2gtfs import process_timetable_files
+
+from benchmarks.synthetic import timetable_config, write_timetable_directory
+
+
+@click.command
+@click.option('--stops', default=30, help='Stops per trip')
+@click.option('--pairs', default=5, help='Stops per trip with arrival and departure row')
+@click.option('--trips', 'trip_counts', default='100,200,400,800', help='Comma separated trip counts to measure')
+def main(stops, pairs, trip_counts):
+    logging.disable(logging.WARNING)
+
+    results: list[tuple[int, int, float]] = []
+    for num_trips in [int(t) for t in trip_counts.split(',')]:
+        with tempfile.TemporaryDirectory() as directory:
+            cells: int = write_timetable_directory(directory, 1, num_trips, stops, pairs)
+            Configuration.apply_config(timetable_config(directory))
+
+            start: float = time.perf_counter()
+            trips, stop_times = process_timetable_files({}, {}, {}, {}, {})
+            elapsed: float = time.perf_counter() - start
+
+        results.append((num_trips, len(stop_times), elapsed))
+
+    baseline: float = results[0][2] / results[0][1]
+    print(f"{'trips':>8} {'stop times':>12} {'seconds':>10} {'us/stop time':>14} {'ratio':>7}")
+    for num_trips, num_stop_times, elapsed in results:
+        per_stop_time: float = elapsed / num_stop_times
+        print(f"{num_trips:>8} {num_stop_times:>12} {elapsed:>10.3f} {per_stop_time * 1e6:>14.2f} {per_stop_time / baseline:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
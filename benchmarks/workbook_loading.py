@@ -0,0 +1,90 @@
+"""
+Compare loading worksheets in full mode with cell-by-cell access
+against the streaming read-only reader in x2gtfs.reader.
+
+    python -m benchmarks.workbook_loading [--rows 100000]
+"""
+import click
+import glob
+import multiprocessing
+import openpyxl as xl
+import os
+import resource
+import tempfile
+import time
+
+from openpyxl import Workbook
+from typing import Callable
+
+from x2gtfs.reader import iter_sheet_rows, load_sheet
+
+
+def _full_mode(filename: str) -> int:
+    wb: Workbook = xl.load_workbook(filename, data_only=True)
+    ws = wb.active
+
+    max_row: int = ws.max_row
+    max_column: int = ws.max_column
+
+    cells: int = 0
+    for row in range(1, max_row + 1):
+        for column in range(1, max_column + 1):
+            ws.cell(row=row, column=column).value
+            cells += 1
+
+    return cells
+
+def _streaming(filename: str) -> int:
+    cells: int = 0
+    for row in iter_sheet_rows(filename):
+        cells += len(row)
+
+    return cells
+
+def _grid(filename: str) -> int:
+    return sum(len(row) for row in load_sheet(filename).rows)
+
+def _run(func: Callable[[str], int], filename: str) -> tuple[float, int]:
+    rss_before: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start: float = time.perf_counter()
+    func(filename)
+    elapsed: float = time.perf_counter() - start
+    rss_after: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return elapsed, (rss_after - rss_before) * 1024
+
+def _measure(func: Callable[[str], int], filename: str) -> tuple[float, int]:
+    # run each measurement in a fresh process, so the peak resident
+    # memory is not shadowed by a previous measurement
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_run, (func, filename))
+
+def _write_synthetic_sheet(filename: str, rows: int) -> None:
+    wb: Workbook = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['Name', 'ID', 'Kürzel', 'Breite', 'Länge'])
+    for r in range(rows):
+        ws.append([f"Stop {r}", f"de:1:{r}", f"S{r}", 48.0 + r * 1e-6, 8.0 + r * 1e-6])
+
+    wb.save(filename)
+
+
+@click.command
+@click.option('--rows', default=100000, help='Rows of the synthetic sheet')
+def main(rows):
+    filenames: list[str] = sorted(glob.glob('samples/simplexl/**/*.xlsx', recursive=True))
+
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic_filename: str = os.path.join(directory, f"synthetic_{rows}.xlsx")
+        _write_synthetic_sheet(synthetic_filename, rows)
+        filenames.append(synthetic_filename)
+
+        print(f"{'file':<32} {'engine':<10} {'seconds':>9} {'peak RSS MiB':>12}")
+        for filename in filenames:
+            for name, func in (('full', _full_mode), ('streaming', _streaming), ('grid', _grid)):
+                elapsed, peak = _measure(func, filename)
+                print(f"{os.path.basename(filename):<32} {name:<10} {elapsed:>9.3f} {peak / 2**20:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
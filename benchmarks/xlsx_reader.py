@@ -0,0 +1,92 @@
+"""
+Compare the fast xlsx reader with openpyxl. Both readers must produce
+identical sheets for the sample workbooks and identical trips and stop
+times for the sample timetables, then a large synthetic timetable is
+loaded with both readers.
+
+    python -m benchmarks.xlsx_reader [--trips 2000] [--stops 40]
+"""
+import click
+import glob
+import logging
+import os
+import tempfile
+import time
+import yaml
+
+from dataclasses import astuple
+
+from x2gtfs.config import Configuration
+from x2gtfs.reader import Sheet, load_sheet
+from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files
+
+from benchmarks.synthetic import write_timetable_workbook
+
+SAMPLES_DIRECTORY: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'samples', 'simplexl')
+
+
+def _grid(sheet: Sheet) -> list[list[tuple[type, object]]]:
+    # values together with their types, 1 and 1.0 or a time and a datetime must not compare equal
+    return [
+        [(type(v), v) for v in (sheet.value(r, c) for c in range(1, sheet.max_column + 1))]
+        for r in range(1, sheet.max_row + 1)
+    ]
+
+def _check_sheets(filenames: list[str]) -> None:
+    for filename in filenames:
+        if _grid(load_sheet(filename, 'openpyxl')) != _grid(load_sheet(filename, 'fast')):
+            raise RuntimeError(f"Readers produce different sheets for {filename}.")
+
+def _check_samples() -> None:
+    with open(os.path.join(SAMPLES_DIRECTORY, 'config.yaml'), 'r') as f:
+        Configuration.apply_config(yaml.safe_load(f))
+
+    # the sample configuration uses paths relative to the repository root
+    cwd: str = os.getcwd()
+    os.chdir(os.path.join(SAMPLES_DIRECTORY, '..', '..'))
+    try:
+        metadata: tuple = (load_stop_metadata(), *load_calendar_metadata(), *load_agency_and_route_metadata())
+
+        results: list[list[tuple]] = []
+        for reader in ('openpyxl', 'fast'):
+            trip_list, stop_time_list = process_timetable_files(*metadata, reader=reader)
+            results.append([astuple(t) for t in trip_list] + [astuple(st) for st in stop_time_list])
+    finally:
+        os.chdir(cwd)
+
+    if results[0] != results[1]:
+        raise RuntimeError("Readers produce different trips or stop times for the samples.")
+
+def _load_seconds(filename: str, reader: str) -> float:
+    start: float = time.perf_counter()
+    load_sheet(filename, reader)
+
+    return time.perf_counter() - start
+
+
+@click.command
+@click.option('--trips', default=2000, help='Trips of the synthetic timetable')
+@click.option('--stops', default=40, help='Stops per trip')
+def main(trips, stops):
+    logging.disable(logging.WARNING)
+
+    _check_sheets(sorted(glob.glob(os.path.join(SAMPLES_DIRECTORY, '**', '*.xlsx'), recursive=True)))
+    _check_samples()
+    print("Sample sheets and timetables are identical with both readers")
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename: str = os.path.join(directory, 'timetable.xlsx')
+        cells: int = write_timetable_workbook(filename, 'L000', trips, stops, pairs=5)
+        _check_sheets([filename])
+
+        openpyxl_seconds: float = _load_seconds(filename, 'openpyxl')
+        fast_seconds: float = _load_seconds(filename, 'fast')
+
+    print(f"{'reader':<10} {'seconds':>9} {'us/cell':>9}")
+    print(f"{'openpyxl':<10} {openpyxl_seconds:>9.3f} {openpyxl_seconds / cells * 1e6:>9.2f}")
+    print(f"{'fast':<10} {fast_seconds:>9.3f} {fast_seconds / cells * 1e6:>9.2f}")
+    print(f"speedup {openpyxl_seconds / fast_seconds:.1f}x for {cells} time cells")
+
+
+if __name__ == '__main__':
+    main()
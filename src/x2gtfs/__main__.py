@@ -1,77 +1,265 @@
 import click
+import cProfile
+import hashlib
 import logging
-import openpyxl as xl
 import os
+import re
+import time
 import yaml
 
-from openpyxl import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.utils import column_index_from_string
+from collections import Counter
+from typing import Any, Callable
 
-from x2gtfs.config import Configuration
-from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files
-from x2gtfs.models import Stop, Calendar, CalendarDate, Agency, Route, Trip, StopTime
-from x2gtfs.gtfs import Feed
+from x2gtfs.cache import Cache, MemoryCache, default_cache_directory
+from x2gtfs.converter import Converter, ValidationError
+from x2gtfs.diagnostics import Diagnostics
+from x2gtfs.profiling import Profiler
+from x2gtfs.reader import SHEET_READERS
+from x2gtfs.x2gtfs import STOP_TIME_STORES
+from x2gtfs.gtfs import Feed, MemberChange, change_summary, partition_key, write_feeds
+
+
+def _snapshot(filenames: list[str]) -> dict[str, tuple[int, int]|None]:
+    # size and modification time of each file, None for files which vanished
+    snapshot: dict[str, tuple[int, int]|None] = {}
+    for filename in filenames:
+        try:
+            stat: os.stat_result = os.stat(filename)
+            snapshot[filename] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            snapshot[filename] = None
+
+    return snapshot
+
+def _output_feeds(feed: Feed, outputfilename: str, partition: Callable[[Any], str|None]|None) -> dict[str, Feed]:
+    # the full feed and a feed per partition next to it, named after the partition
+    feeds: dict[str, Feed] = {outputfilename: feed}
+    if partition is None:
+        return feeds
+
+    partition_feeds: dict[str, Feed] = feed.partition(partition)
+    suffixes: dict[str, str] = {value: re.sub(r'[^\w.-]+', '_', str(value)) for value in partition_feeds}
+    suffix_counts: Counter = Counter(suffixes.values())
+
+    name, extension = os.path.splitext(outputfilename)
+    for value, partition_feed in partition_feeds.items():
+        suffix: str = suffixes[value]
+        if suffix_counts[suffix] > 1:
+            # partitions differing only in replaced characters, e.g. 'A/B' and 'A B', get a digest of their value
+            suffix = f"{suffix}_{hashlib.sha1(str(value).encode('utf-8')).hexdigest()[:8]}"
+
+        feeds[f"{name}_{suffix}{extension}"] = partition_feed
+
+    return feeds
+
+def _log_changes(changes: dict[str, dict[str, MemberChange]]) -> None:
+    for zip_filename, feed_changes in changes.items():
+        changed: int = sum(1 for c in feed_changes.values() if c.status != 'unchanged')
+        logging.info(f"{changed} of {len(feed_changes)} files of {zip_filename} changed:\n{change_summary(feed_changes)}")
+
+def _write_watched_feed(converter: Converter, outputfilename: str, partition: Callable[[Any], str|None]|None, write_options: dict, diagnostics_filename: str|None) -> list[str]:
+    diagnostics: Diagnostics = Diagnostics()
+    start: float = time.perf_counter()
+
+    # feeds are moved into place when complete, consumers never see a partially written feed
+    feeds: dict[str, Feed] = _output_feeds(converter.convert(diagnostics), outputfilename, partition)
+    changes: dict[str, dict[str, MemberChange]] = write_feeds(feeds, **write_options)
+
+    if write_options['incremental']:
+        _log_changes(changes)
+
+    if len(diagnostics) > 0:
+        logging.warning(f"{diagnostics.total} problems found:\n{diagnostics.summary()}")
+
+    if diagnostics_filename is not None:
+        diagnostics.write_json(diagnostics_filename)
+
+    logging.info(f"{len(feeds)} feeds written in {time.perf_counter() - start:.1f}s")
+
+    return list(feeds)
+
+def _watch(
+        inputfilename: str,
+        outputfilename: str,
+        converter: Converter,
+        converter_options: dict,
+        interval: float,
+        partition: Callable[[Any], str|None]|None,
+        write_options: dict,
+        diagnostics_filename: str|None) -> None:
+    """
+    Convert the input files and again whenever one of them changes, until interrupted.
+
+    The metadata and all parsed timetables stay in the cache of the
+    converter, so a conversion after a change parses the changed files
+    only. A changed configuration file replaces the converter, cached
+    results of unchanged files are still used as long as the relevant
+    configuration sections are unchanged.
+
+    Feeds written by the watch are never watched, even if they are
+    written into the timetable directory.
+    """
+    config_snapshot: dict = _snapshot([inputfilename])
+    converted_snapshot: dict|None = None
+    output_filenames: set[str] = {os.path.abspath(outputfilename)}
+
+    while True:
+        try:
+            if _snapshot([inputfilename]) != config_snapshot:
+                config_snapshot = _snapshot([inputfilename])
+                with open(inputfilename, 'r') as inputfile:
+                    converter = Converter(yaml.safe_load(inputfile), **converter_options)
+
+                logging.info(f"Configuration {inputfilename} reloaded")
+                converted_snapshot = None
+
+            snapshot: dict = _snapshot([inputfilename, *(f for f in converter.input_files() if os.path.abspath(f) not in output_filenames)])
+            if snapshot != converted_snapshot:
+                # editors save workbooks in several steps, wait until the files do not change anymore
+                time.sleep(interval)
+                if _snapshot(list(snapshot)) != snapshot:
+                    continue
+
+                converted_snapshot = snapshot
+                written_filenames: list[str] = _write_watched_feed(converter, outputfilename, partition, write_options, diagnostics_filename)
+                output_filenames.update(os.path.abspath(f) for f in written_filenames)
+
+                if converter_options['cache'] is not None:
+                    converter_options['cache'].prune()
+
+                logging.info(f"Watching {len(snapshot)} files for changes ...")
+        except ValidationError as ex:
+            logging.error(f"{ex.diagnostics.total} problems found:\n{ex.diagnostics.summary()}")
+            logging.error(f"{ex.errors} errors found in the feed, {outputfilename} is not written.")
+        except Exception as ex:
+            # a broken or half written input file must not end the watch, the next change is converted again
+            logging.exception(f"Conversion failed: {ex}")
+            config_snapshot = _snapshot([inputfilename])
+
+        time.sleep(interval)
 
 
 @click.command
 @click.argument('inputfilename', type=click.Path(exists=True))
 @click.argument('outputfilename', type=click.Path())
-def main(inputfilename, outputfilename):
-    
-    # load and apply configuration
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, help='Number of processes parsing timetable files in parallel.')
+@click.option('--compression-level', type=click.IntRange(min=0, max=9), default=None, help='DEFLATE compression level of the GTFS feed.')
+@click.option('--write-threads', type=click.IntRange(min=1), default=1, help='Number of threads compressing GTFS files in parallel.')
+@click.option('--drop-empty-columns', is_flag=True, default=False, help='Omit optional GTFS columns which are empty in every row of a file.')
+@click.option('--store', type=click.Choice(list(STOP_TIME_STORES)), default='objects', help='Container for stop times, columnar uses less memory for large networks, sqlite keeps them on disk.')
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=default_cache_directory, help='Directory for cached intermediate results.')
+@click.option('--cache-size', type=click.IntRange(min=0), default=512, help='Maximum size of the cache in MiB.')
+@click.option('--no-cache', is_flag=True, default=False, help='Parse all input files without using the cache.')
+@click.option('--diagnostics', 'diagnostics_filename', type=click.Path(dir_okay=False), default=None, help='Write problems found in the input files as JSON report.')
+@click.option('--reader', type=click.Choice(list(SHEET_READERS)), default='openpyxl', help='Engine reading the timetable workbooks, fast parses the sheet XML directly.')
+@click.option('--drop-duplicate-trips', is_flag=True, default=False, help='Drop trips with the same route, service, stops and times as an earlier trip.')
+@click.option('--compact-calendars', 'calendar_compaction', is_flag=True, default=False, help='Merge services with the same days of operation and write each with the fewest calendar rows.')
+@click.option('--frequencies', is_flag=True, default=False, help='Write runs of trips with a constant headway as frequencies.txt entries.')
+@click.option('--drop-frequency-short-names', is_flag=True, default=False, help='With --frequencies, also merge trips with different trip_short_name values, the template trips have no short name.')
+@click.option('--validate', 'validation', type=click.Choice(['strict', 'warn', 'off']), default='warn', help='Check references and stop time order of the feed, strict does not write a feed with errors.')
+@click.option('--partition-by', 'partition_spec', default=None, help="Also write a feed per agency ('agency') or per route group ('route:<regex>', the first group of the match is the partition) next to the full feed.")
+@click.option('--incremental', is_flag=True, default=False, help='Compare with the feeds already at the output paths and copy unchanged GTFS files from there instead of compressing them again.')
+@click.option('--watch', is_flag=True, default=False, help='Keep running and convert again whenever the configuration or an input file changes.')
+@click.option('--watch-interval', type=click.FloatRange(min=0.1), default=1.0, help='Seconds between checks for changed files in watch mode.')
+@click.option('--stats', 'stats_filename', type=click.Path(dir_okay=False), default=None, help='Measure time, rows and peak memory of each phase and write them as JSON.')
+@click.option('--profile', 'profile_filename', type=click.Path(dir_okay=False), default=None, help='Write a cProfile dump of the run.')
+def main(inputfilename, outputfilename, jobs, compression_level, write_threads, drop_empty_columns, store, cache_dir, cache_size, no_cache, diagnostics_filename, reader, drop_duplicate_trips, calendar_compaction, frequencies, drop_frequency_short_names, validation, partition_spec, incremental, watch, watch_interval, stats_filename, profile_filename):
+
+    # a watch runs until interrupted, there is no end of the run to report statistics at
+    if watch and (stats_filename is not None or profile_filename is not None):
+        raise click.UsageError("--stats and --profile can not be used with --watch.")
+
+    # the profile covers the main process, timetables parsed by worker processes are not included
+    profile: cProfile.Profile|None = None
+    if profile_filename is not None:
+        profile = cProfile.Profile()
+        profile.enable()
+
+    # memory is only traced if stats are requested, tracing slows down the run
+    profiler: Profiler = Profiler(trace_memory=stats_filename is not None)
+
+    # sub-feeds are split from the full feed after a single conversion
+    partition: Callable[[Any], str|None]|None = None
+    if partition_spec is not None:
+        try:
+            partition = partition_key(partition_spec)
+        except ValueError as ex:
+            raise click.BadParameter(str(ex), param_hint='--partition-by')
+
+    # load configuration
     with open(inputfilename, 'r') as inputfile:
         config: dict = yaml.safe_load(inputfile)
-        Configuration.apply_config(config)
-
-    # define containers for results and meta data lookups
-    stop_result_list: dict[str, Stop] = {}
-    calendar_result_list: dict[str, Calendar] = {}
-    calendar_exception_result_list: dict[str, list[CalendarDate]] = {}
-    agency_result_list: dict[str, Agency] = {}
-    route_result_list: dict[str, Route] = {}
-    
-    trip_result_list: list[Trip] = []
-    stop_time_result_list: list[StopTime] = []
-
-    # read meta data here if available
-    logging.info("Loading stops metadata ...")
-    stop_result_list = load_stop_metadata()
-
-    # calendar data
-    logging.info("Loading calendar metadata ...")
-    calendar_result_list, calendar_exception_result_list = load_calendar_metadata()
-
-    # route and agency data
-    logging.info("Loading agency and route metadata ...")
-    agency_result_list, route_result_list = load_agency_and_route_metadata()
-
-    # run over timetable input files and process each one
-    logging.info("Processing timetable input files ...")
-    trip_result_list, stop_time_result_list = process_timetable_files(
-        stop_result_list,
-        calendar_result_list,
-        calendar_exception_result_list,
-        agency_result_list,
-        route_result_list
-    )
-
-    # create GTFS output files
-    feed = Feed()
-    feed.add_data('stops.txt', list(stop_result_list.values()))
-
-    if len(calendar_result_list) > 0:
-        feed.add_data('calendar.txt', list(calendar_result_list.values()))
-    if len(calendar_exception_result_list) > 0:
-        feed.add_data('calendar_dates.txt', [cd for cdl in calendar_exception_result_list.values() for cd in cdl])
-
-    feed.add_data('agency.txt', list(agency_result_list.values()))
-    feed.add_data('routes.txt', list(route_result_list.values()))
-
-    feed.add_data('trips.txt', trip_result_list)
-    feed.add_data('stop_times.txt', stop_time_result_list)
-
-    feed.write(outputfilename)
+
+    # unchanged input files are loaded from the cache, a watching process keeps them in memory
+    cache: Cache|None = None
+    if not no_cache:
+        cache = MemoryCache(cache_size * 2**20) if watch else Cache(cache_dir, cache_size * 2**20)
+
+    converter_options: dict = {
+        'cache': cache,
+        'jobs': jobs,
+        'reader': reader,
+        'stop_time_store': store,
+        'drop_duplicate_trips': drop_duplicate_trips,
+        'calendar_compaction': calendar_compaction,
+        'frequencies': frequencies,
+        'drop_frequency_short_names': drop_frequency_short_names,
+        'validation': validation,
+        'compression_level': compression_level,
+        'write_threads': write_threads,
+        'drop_empty_columns': drop_empty_columns
+    }
+
+    converter: Converter = Converter(config, **converter_options)
+
+    write_options: dict = {
+        'workers': write_threads,
+        'incremental': incremental
+    }
+
+    if watch:
+        try:
+            _watch(inputfilename, outputfilename, converter, converter_options, watch_interval, partition, write_options, diagnostics_filename)
+        except KeyboardInterrupt:
+            logging.info("Stopped watching input files")
+
+        return
+
+    # problems in the input files are collected and reported once at the end
+    diagnostics: Diagnostics = Diagnostics()
+
+    # the profile and stats are also written if the conversion fails, failed runs can be profiled too
+    try:
+        try:
+            feed: Feed = converter.convert(diagnostics, profiler)
+        except ValidationError as ex:
+            logging.error(f"{diagnostics.total} problems found:\n{diagnostics.summary()}")
+            if diagnostics_filename is not None:
+                diagnostics.write_json(diagnostics_filename)
+
+            raise click.ClickException(f"{ex.errors} errors found in the feed, {outputfilename} is not written.")
+
+        changes: dict[str, dict[str, MemberChange]] = write_feeds(_output_feeds(feed, outputfilename, partition), **write_options)
+        if incremental:
+            _log_changes(changes)
+
+        if cache is not None:
+            cache.prune()
+
+        if len(diagnostics) > 0:
+            logging.warning(f"{diagnostics.total} problems found:\n{diagnostics.summary()}")
+
+        if diagnostics_filename is not None:
+            diagnostics.write_json(diagnostics_filename)
+
+    finally:
+        if stats_filename is not None:
+            logging.info(f"Phases of the run:\n{profiler.table()}")
+            profiler.write_json(stats_filename)
+
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(profile_filename)
 
 
 if __name__ == "__main__":
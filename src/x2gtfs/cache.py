@@ -0,0 +1,215 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+# bump whenever the layout of cached results changes
+CACHE_VERSION = 3
+
+def default_cache_directory() -> str:
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+        'x2gtfs'
+    )
+
+class Cache:
+    """
+    On-disk cache for parsed intermediate results.
+
+    Entries are keyed by content hashes of the input files and the relevant
+    configuration, so a changed file or setting never hits a stale entry.
+    When the cache grows beyond max_size, the least recently used entries
+    are removed by prune().
+
+    Usage:
+        cache = Cache("~/.cache/x2gtfs", 512 * 2**20)
+        key = cache.key("stops", cache.file_digest("stops.xlsx"), config_section)
+        stops = cache.get_or_create(key, load_stops)
+        cache.prune()
+    """
+    def __init__(self, directory: str, max_size: int):
+        """
+        Args:
+            directory: Directory to store cache entries in
+            max_size: Maximum total size of all entries in bytes
+        """
+        self._directory: str = os.path.expanduser(directory)
+        self._max_size: int = max_size
+
+        # digests of files already hashed in this run, keyed by path, size and mtime
+        self._file_digests: dict[tuple[str, int, int], str] = {}
+
+        os.makedirs(self._directory, exist_ok=True)
+
+    def file_digest(self, filename: str) -> str:
+        """
+        Return the SHA-256 digest of the content of filename.
+        """
+        stat: os.stat_result = os.stat(filename)
+        stat_key: tuple[str, int, int] = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+
+        if stat_key not in self._file_digests:
+            digest = hashlib.sha256()
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+
+            self._file_digests[stat_key] = digest.hexdigest()
+
+        return self._file_digests[stat_key]
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """
+        Build a cache key out of JSON serializable parts, such as file digests
+        and configuration sections.
+        """
+        payload: str = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Any|None:
+        """
+        Return the cached value for key or None if there is no valid entry.
+        """
+        path: str = self._path(key)
+
+        try:
+            with open(path, 'rb') as f:
+                value: Any = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logging.warning(f"Discarding unreadable cache entry {path}: {ex}")
+            self._remove(path)
+            return None
+
+        # mark the entry as recently used for pruning
+        os.utime(path)
+
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        path: str = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file first, so concurrent runs never read partial entries
+        fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temporary_path, path)
+        except BaseException:
+            self._remove(temporary_path)
+            raise
+
+    def get_or_create(self, key: str, create: Callable[[], T]) -> T:
+        """
+        Return the cached value for key, or create and store it on a miss.
+        """
+        value: Any|None = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+
+        return value
+
+    def prune(self) -> None:
+        """
+        Remove least recently used entries until the cache fits into max_size.
+        """
+        entries: list[tuple[float, int, str]] = []
+        for dirpath, _, filenames in os.walk(self._directory):
+            for filename in filenames:
+                path: str = os.path.join(dirpath, filename)
+                try:
+                    stat: os.stat_result = os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size: int = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_size:
+                break
+
+            self._remove(path)
+            total_size -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key[:2], f"{key}.pickle")
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class MemoryCache(Cache):
+    """
+    In-process cache with the interface of Cache, for long running processes.
+
+    Values are kept pickled, so every get returns a fresh copy and later
+    stages mutating results (such as assigning trip IDs) never change the
+    cached entries. When the pickled entries grow beyond max_size, the
+    least recently used entries are removed by prune().
+
+    Usage:
+        cache = MemoryCache(512 * 2**20)
+        stops = load_stop_metadata(cache)
+    """
+    def __init__(self, max_size: int):
+        """
+        Args:
+            max_size: Maximum total size of all pickled entries in bytes
+        """
+        self._max_size: int = max_size
+        self._file_digests: dict[tuple[str, int, int], str] = {}
+
+        # insertion order is the order of use, most recently used entries last
+        self._entries: dict[str, bytes] = {}
+
+    def contains(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Any|None:
+        value: bytes|None = self._entries.pop(key, None)
+        if value is None:
+            return None
+
+        self._entries[key] = value
+
+        return pickle.loads(value)
+
+    def put(self, key: str, value: Any) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def prune(self) -> None:
+        total_size: int = sum(len(v) for v in self._entries.values())
+        for key in list(self._entries):
+            if total_size <= self._max_size:
+                break
+
+            total_size -= len(self._entries.pop(key))
+
+        # digests of files which changed or vanished since are never looked up again
+        self._file_digests = {k: v for k, v in self._file_digests.items() if _stat_key(k[0]) == k}
+
+def _stat_key(filename: str) -> tuple[str, int, int]|None:
+    try:
+        stat: os.stat_result = os.stat(filename)
+    except FileNotFoundError:
+        return None
+
+    return (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
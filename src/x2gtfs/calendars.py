@@ -0,0 +1,232 @@
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from x2gtfs.models import Calendar, CalendarDate
+
+# weekday attributes of Calendar in the order of date.weekday()
+WEEKDAYS: tuple[str, ...] = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, '%Y%m%d').date()
+
+def _format_date(value: date) -> str:
+    return value.strftime('%Y%m%d')
+
+def _bit_range(first: int, last: int) -> int:
+    # bits first to last inclusive
+    return ((1 << (last + 1)) - 1) ^ ((1 << first) - 1)
+
+def _days(bits: int) -> Iterable[int]:
+    day: int = 0
+    while bits:
+        if bits & 1:
+            yield day
+
+        bits >>= 1
+        day += 1
+
+def _best_range(bits: int, pattern_bits: int) -> tuple[int, int, int]:
+    """
+    Return the range of days of pattern_bits a calendar row saves the most rows with.
+
+    Each pattern day in the range saves an added date if the service
+    operates on it and costs a removed date otherwise, the range with the
+    largest sum is found in a single scan (maximum subarray).
+
+    Returns:
+        Gain, first and last day of the range, a gain of 0 if no range saves rows
+    """
+    best: tuple[int, int, int] = (0, 0, 0)
+    gain: int = 0
+    first_day: int = 0
+
+    for day in _days(pattern_bits):
+        if gain <= 0:
+            gain, first_day = 0, day
+
+        gain += 1 if bits >> day & 1 else -1
+        if gain > best[0]:
+            best = (gain, first_day, day)
+
+    return best
+
+@dataclass(frozen=True, slots=True)
+class _Encoding:
+    """
+    calendar.txt row and calendar_dates.txt rows of one service.
+    """
+    weekday_mask: int  # bit n set for weekday n, 0 if the service has no calendar row
+    first_day: int
+    last_day: int
+    added_days: tuple[int, ...]
+    removed_days: tuple[int, ...]
+
+    @property
+    def rows(self) -> int:
+        return (1 if self.weekday_mask else 0) + len(self.added_days) + len(self.removed_days)
+
+class ServiceDays:
+    """
+    Days of operation of services as bitsets over a common period.
+
+    Bit n of a service bitset is set if the service operates on the n-th
+    day after the first day of the period. Services operating on the same
+    days have equal bitsets, whatever calendar and calendar exceptions
+    they were defined with.
+    """
+    def __init__(self, first_date: date, last_date: date):
+        self.first_date: date = first_date
+        self.days: int = (last_date - first_date).days + 1
+
+        # bitset of all days of the period falling on each weekday
+        self._weekday_bits: list[int] = [0] * 7
+        for day in range(self.days):
+            self._weekday_bits[(first_date.weekday() + day) % 7] |= 1 << day
+
+        # bitset of all days falling on one of the weekdays of each weekday mask
+        self._mask_bits: list[int] = [0] * 128
+        for weekday_mask in range(1, 128):
+            lowest_weekday: int = (weekday_mask & -weekday_mask).bit_length() - 1
+            self._mask_bits[weekday_mask] = self._mask_bits[weekday_mask & (weekday_mask - 1)] | self._weekday_bits[lowest_weekday]
+
+    def day(self, value: str) -> int:
+        return (_parse_date(value) - self.first_date).days
+
+    def date(self, day: int) -> str:
+        return _format_date(self.first_date + timedelta(days=day))
+
+    def bitset(self, calendar: Calendar|None, calendar_dates: Iterable[CalendarDate]) -> int:
+        """
+        Expand a calendar and its exceptions into the bitset of its days.
+        """
+        bits: int = 0
+        if calendar is not None:
+            weekday_mask: int = sum(1 << weekday for weekday, attribute in enumerate(WEEKDAYS) if getattr(calendar, attribute))
+            bits = self._mask_bits[weekday_mask] & _bit_range(self.day(calendar.start_date), self.day(calendar.end_date))
+
+        for calendar_date in calendar_dates:
+            if calendar_date.exception_type == 1:
+                bits |= 1 << self.day(calendar_date.date)
+            elif calendar_date.exception_type == 2:
+                bits &= ~(1 << self.day(calendar_date.date))
+
+        return bits
+
+    def encode(self, bits: int) -> _Encoding:
+        """
+        Return the encoding of bits with the fewest calendar and calendar_dates rows.
+
+        Every weekday combination is tried as calendar row, its validity is
+        the range of days on these weekdays with the most operating days
+        in excess of days without operation, so a single outlying date does
+        not stretch the range over many removed dates. Days of operation not
+        covered by the calendar row are added, covered days without
+        operation are removed. Listing all days in calendar_dates.txt
+        without calendar row is the fallback.
+        """
+        best: _Encoding = _Encoding(0, 0, 0, tuple(_days(bits)), ())
+        if not bits:
+            return best
+
+        # pattern days outside the days of operation never save rows
+        operating_range: int = _bit_range((bits & -bits).bit_length() - 1, bits.bit_length() - 1)
+
+        for weekday_mask in range(1, 128):
+            gain, first_day, last_day = _best_range(bits, self._mask_bits[weekday_mask] & operating_range)
+            if gain == 0:
+                continue
+
+            # a calendar row is preferred over calendar_dates rows with the same count,
+            # of calendar rows with the same count the first weekday combination is kept
+            rows: int = 1 + bits.bit_count() - gain
+            if rows < best.rows or (rows == best.rows and not best.weekday_mask):
+                pattern_bits: int = self._mask_bits[weekday_mask] & _bit_range(first_day, last_day)
+                best = _Encoding(
+                    weekday_mask,
+                    first_day,
+                    last_day,
+                    tuple(_days(bits & ~pattern_bits)),
+                    tuple(_days(pattern_bits & ~bits))
+                )
+
+        return best
+
+def compact_calendars(
+        calendar_meta_list: dict[str, Calendar],
+        calendar_exception_meta_list: dict[str, list[CalendarDate]]) -> tuple[list[Calendar], list[CalendarDate], dict[str, str]]:
+    """
+    Merge services operating on the same days and encode each of them
+    with the fewest calendar.txt and calendar_dates.txt rows. If no
+    encoding has fewer rows than the original rows of one of the merged
+    services, these original rows are kept, so the result never has more
+    rows than the input.
+
+    Args:
+        calendar_meta_list: Calendars as returned by load_calendar_metadata
+        calendar_exception_meta_list: Calendar exceptions as returned by load_calendar_metadata
+
+    Returns:
+        Calendars, calendar dates and the mapping of each service ID to the
+        service ID of the merged service, trips must be remapped with it
+    """
+    calendars: dict[str, Calendar] = {c.service_id: c for c in calendar_meta_list.values()}
+    calendar_dates: dict[str, list[CalendarDate]] = {}
+    for calendar_date_list in calendar_exception_meta_list.values():
+        for calendar_date in calendar_date_list:
+            calendar_dates.setdefault(calendar_date.service_id, []).append(calendar_date)
+
+    service_ids: list[str] = list(dict.fromkeys([*calendars, *calendar_dates]))
+    if not service_ids:
+        return [], [], {}
+
+    dates: list[str] = [cd.date for cdl in calendar_dates.values() for cd in cdl]
+    for calendar in calendars.values():
+        dates.extend((calendar.start_date, calendar.end_date))
+
+    service_days: ServiceDays = ServiceDays(_parse_date(min(dates)), _parse_date(max(dates)))
+
+    # bitset -> service IDs operating on these days, the first one is kept
+    services: dict[int, list[str]] = {}
+    service_id_mapping: dict[str, str] = {}
+    for service_id in service_ids:
+        bits: int = service_days.bitset(calendars.get(service_id), calendar_dates.get(service_id, []))
+        merged_service_ids: list[str] = services.setdefault(bits, [])
+        merged_service_ids.append(service_id)
+        service_id_mapping[service_id] = merged_service_ids[0]
+
+    def original_rows(service_id: str) -> int:
+        return (1 if service_id in calendars else 0) + len(calendar_dates.get(service_id, []))
+
+    calendar_result_list: list[Calendar] = []
+    calendar_date_result_list: list[CalendarDate] = []
+
+    for bits, merged_service_ids in services.items():
+        service_id: str = merged_service_ids[0]
+        encoding: _Encoding = service_days.encode(bits)
+
+        # services without any day of operation are written with an empty calendar row
+        original_service_id: str = min(merged_service_ids, key=original_rows)
+        if original_rows(original_service_id) <= max(encoding.rows, 1):
+            if original_service_id in calendars:
+                calendar_result_list.append(replace(calendars[original_service_id], service_id=service_id))
+
+            calendar_date_result_list.extend(replace(cd, service_id=service_id) for cd in calendar_dates.get(original_service_id, []))
+            continue
+
+        if encoding.weekday_mask or not bits:
+            calendar: Calendar = Calendar(service_id)
+            for weekday, attribute in enumerate(WEEKDAYS):
+                setattr(calendar, attribute, 1 if encoding.weekday_mask & (1 << weekday) else 0)
+
+            calendar.start_date = service_days.date(encoding.first_day)
+            calendar.end_date = service_days.date(encoding.last_day)
+            calendar_result_list.append(calendar)
+
+        calendar_date_result_list.extend(sorted(
+            [CalendarDate(service_id, service_days.date(d), 1) for d in encoding.added_days] +
+            [CalendarDate(service_id, service_days.date(d), 2) for d in encoding.removed_days],
+            key=lambda cd: cd.date
+        ))
+
+    return calendar_result_list, calendar_date_result_list, service_id_mapping
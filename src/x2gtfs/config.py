@@ -1,3 +1,6 @@
+from x2gtfs.plan import ConversionPlan, compile_plan
+
+
 class _ConfigNamespace:
     def __init__(self, **entries):
         for key, value in entries.items():
@@ -12,8 +15,20 @@ class _ConfigNamespace:
 
 class Configuration:
 
+    # precompiled form of the applied configuration, see x2gtfs.plan
+    plan: ConversionPlan|None = None
+
     @classmethod
     def apply_config(cls, config: dict) -> None:
+        cls.plan = cls.build_plan(config)
+
+        namespace = cls._dict_to_namespace(cls.plan.config)
+        for key, value in namespace.__dict__.items():
+            setattr(cls, key, value)
+
+    @classmethod
+    def build_plan(cls, config: dict) -> ConversionPlan:
+        # validates and merges the configuration without applying it
 
         # define required config keys
         required_config: list[tuple[str]] = [
@@ -39,6 +54,12 @@ class Configuration:
                     'layout_type': 'vertical',
                     'run_through_char': '$',
                     'time_format': '%H:%M:%S'
+                    # 'sheet_name_pattern': 'Linie *' converts every matching worksheet instead of the active one
+                },
+                'csv': {
+                    # input files ending with .csv are read as CSV files instead of workbooks
+                    'delimiter': ',',
+                    'encoding': 'utf-8-sig'
                 },
                 'defaults': {
                     'agency_id_pattern': '{agency_id}',
@@ -52,17 +73,15 @@ class Configuration:
         cls._validate_required(required_config, config)
         config = cls._merge_config(default_config, config)
 
-        namespace = cls._dict_to_namespace(config)
-        for key, value in namespace.__dict__.items():
-            setattr(cls, key, value)
-    
+        return compile_plan(config)
+
     @classmethod
     def _merge_config(cls, defaults: dict, actual: dict) -> dict:
         if isinstance(defaults, dict) and isinstance(actual, dict):
             return {
                 k: cls._merge_config(
-                    defaults[k] if k in defaults else {},
-                    actual[k] if k in actual else {}
+                    defaults[k] if k in defaults else None,
+                    actual[k] if k in actual else None
                 )
                 for k in set(defaults) | set(actual)
             }
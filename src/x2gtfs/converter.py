@@ -0,0 +1,247 @@
+import logging
+import os
+
+from typing import Any
+
+from x2gtfs.cache import Cache
+from x2gtfs.calendars import compact_calendars
+from x2gtfs.config import Configuration
+from x2gtfs.diagnostics import Diagnostics
+from x2gtfs.frequencies import compress_frequencies
+from x2gtfs.gtfs import Feed
+from x2gtfs.models import Stop, Calendar, CalendarDate, Frequency
+from x2gtfs.patterns import PatternIndex
+from x2gtfs.plan import ConversionPlan
+from x2gtfs.profiling import Profiler
+from x2gtfs.reader import input_filenames
+from x2gtfs.validation import error_count, validate_feed
+from x2gtfs.x2gtfs import load_stop_metadata, load_calendar_metadata, load_agency_and_route_metadata, process_timetable_files
+
+class ValidationError(Exception):
+    """
+    Raised by strict validation if the converted feed has errors.
+    """
+    def __init__(self, errors: int, diagnostics: Diagnostics):
+        super().__init__(f"{errors} errors found in the feed.")
+        self.errors: int = errors
+        self.diagnostics: Diagnostics = diagnostics
+
+class Converter:
+    """
+    Conversion of spreadsheet timetables into a GTFS feed in memory.
+
+    Each converter holds its own conversion plan and options and passes
+    the plan to the loaders, so several converters can be used in one
+    process without touching the global Configuration. Passing a Cache, such as a
+    MemoryCache kept for the lifetime of the converter, makes repeated
+    conversions parse only the input files changed in between.
+
+    Usage:
+        converter = Converter(config, cache=MemoryCache(512 * 2**20))
+        feed = converter.convert()
+        feed.write("gtfs_feed.zip")
+    """
+    def __init__(
+            self,
+            config: dict,
+            cache: Cache|None = None,
+            jobs: int = 1,
+            reader: str = 'openpyxl',
+            stop_time_store: str = 'objects',
+            drop_duplicate_trips: bool = False,
+            calendar_compaction: bool = False,
+            frequencies: bool = False,
+            drop_frequency_short_names: bool = False,
+            validation: str = 'warn',
+            compression_level: int|None = None,
+            write_threads: int = 1,
+            drop_empty_columns: bool = False):
+        """
+        Args:
+            config: Configuration as loaded from the YAML file
+            cache: Cache for parsed input files, None to parse all files on each conversion
+            jobs: Number of processes parsing timetable files in parallel
+            reader: Engine reading the timetable workbooks, one of SHEET_READERS
+            stop_time_store: Container for stop times, one of STOP_TIME_STORES
+            drop_duplicate_trips: Drop trips with the same route, service, stops and times as an earlier trip
+            calendar_compaction: Merge services with the same days of operation
+            frequencies: Replace runs of trips with a constant headway by frequencies
+            drop_frequency_short_names: Merge trips with different short names into frequencies
+            validation: strict, warn or off, strict raises ValidationError on errors
+            compression_level, write_threads, drop_empty_columns: Options of the returned Feed
+        """
+        # the configuration is validated and merged with the defaults once
+        self._plan: ConversionPlan = Configuration.build_plan(config)
+
+        self._cache: Cache|None = cache
+        self._jobs: int = jobs
+        self._reader: str = reader
+        self._stop_time_store: str = stop_time_store
+        self._drop_duplicate_trips: bool = drop_duplicate_trips
+        self._calendar_compaction: bool = calendar_compaction
+        self._frequencies: bool = frequencies
+        self._drop_frequency_short_names: bool = drop_frequency_short_names
+        self._validation: str = validation
+        self._feed_options: dict[str, Any] = {
+            'compresslevel': compression_level,
+            'workers': write_threads,
+            'drop_empty_columns': drop_empty_columns
+        }
+
+    def input_files(self) -> list[str]:
+        """
+        Return the metadata files and the timetable files of the timetable directory.
+
+        Only files with one of the INPUT_EXTENSIONS are timetable files,
+        other files in the directory, such as a feed written there, are not
+        converted and not returned.
+        """
+        filenames: list[str] = [
+            p.input_filename
+            for p in (self._plan.stops, self._plan.routes, self._plan.calendars, self._plan.calendar_exceptions)
+            if p is not None
+        ]
+
+        input_directory: str = self._plan.timetables.input_directory
+        filenames.extend(os.path.join(input_directory, f) for f in input_filenames(input_directory))
+
+        return filenames
+
+    def convert(self, diagnostics: Diagnostics|None = None, profiler: Profiler|None = None) -> Feed:
+        """
+        Convert all input files into a GTFS feed.
+
+        Args:
+            diagnostics: Collector for problems found in the input files and the feed
+            profiler: Profiler recording the phases of the conversion and of writing the feed
+
+        Returns:
+            Feed with all GTFS files added, not yet written
+
+        Raises:
+            ValidationError: If validation is strict and the feed has errors
+        """
+        if diagnostics is None:
+            diagnostics = Diagnostics()
+        if profiler is None:
+            profiler = Profiler()
+
+        return self._convert(diagnostics, profiler)
+
+    def _convert(self, diagnostics: Diagnostics, profiler: Profiler) -> Feed:
+        cache: Cache|None = self._cache
+
+        # read meta data here if available
+        logging.info("Loading stops metadata ...")
+        with profiler.phase("stops metadata") as phase:
+            stop_result_list: dict[str, Stop] = load_stop_metadata(cache, self._plan)
+            phase.rows = len(stop_result_list)
+
+        # calendar data
+        logging.info("Loading calendar metadata ...")
+        with profiler.phase("calendar metadata") as phase:
+            calendar_result_list, calendar_exception_result_list = load_calendar_metadata(cache, self._plan)
+            phase.rows = len(calendar_result_list) + sum(len(cdl) for cdl in calendar_exception_result_list.values())
+
+        # route and agency data
+        logging.info("Loading agency and route metadata ...")
+        with profiler.phase("agency and route metadata") as phase:
+            agency_result_list, route_result_list = load_agency_and_route_metadata(cache, self._plan)
+            phase.rows = len(agency_result_list) + len(route_result_list)
+
+        # trips share their stop patterns, frequencies are detected per pattern
+        patterns: PatternIndex = PatternIndex()
+
+        # run over timetable input files and process each one
+        logging.info("Processing timetable input files ...")
+        with profiler.phase("timetables") as phase:
+            trip_result_list, stop_time_result_list = process_timetable_files(
+                stop_result_list,
+                calendar_result_list,
+                calendar_exception_result_list,
+                agency_result_list,
+                route_result_list,
+                jobs=self._jobs,
+                stop_time_store=self._stop_time_store,
+                cache=cache,
+                diagnostics=diagnostics,
+                profiler=profiler,
+                reader=self._reader,
+                patterns=patterns,
+                drop_duplicate_trips=self._drop_duplicate_trips,
+                conversion_plan=self._plan
+            )
+            phase.rows = len(stop_time_result_list)
+
+        calendar_rows: list[Calendar] = list(calendar_result_list.values())
+        calendar_date_rows: list[CalendarDate] = [cd for cdl in calendar_exception_result_list.values() for cd in cdl]
+        frequency_result_list: list[Frequency] = []
+
+        # services are merged before frequencies are detected, so trips of merged services form common runs
+        if self._calendar_compaction:
+            logging.info("Compacting calendars ...")
+            with profiler.phase("calendars") as phase:
+                row_count: int = len(calendar_rows) + len(calendar_date_rows)
+                calendar_rows, calendar_date_rows, service_id_mapping = compact_calendars(calendar_result_list, calendar_exception_result_list)
+
+                for trip in trip_result_list:
+                    trip.service_id = service_id_mapping.get(trip.service_id, trip.service_id)
+
+                phase.rows = row_count
+
+            logging.info(f"Compacted {row_count} calendar rows of {len(service_id_mapping)} services into {len(calendar_rows) + len(calendar_date_rows)} rows of {len(set(service_id_mapping.values()))} services")
+
+        # trips at a constant headway are replaced by a template trip and a frequency
+        if self._frequencies:
+            logging.info("Compressing trips with constant headways ...")
+            with profiler.phase("frequencies") as phase:
+                trip_count: int = len(trip_result_list)
+                trip_result_list, stop_time_result_list, frequency_result_list = compress_frequencies(
+                    trip_result_list,
+                    stop_time_result_list,
+                    drop_short_names=self._drop_frequency_short_names,
+                    patterns=patterns
+                )
+                phase.rows = trip_count
+
+            logging.info(f"Replaced {trip_count - len(trip_result_list)} trips by {len(frequency_result_list)} frequencies")
+
+        # broken references are reported before the feed is written
+        if self._validation != 'off':
+            logging.info("Validating feed ...")
+            with profiler.phase("validation") as phase:
+                validate_feed(
+                    stop_result_list.values(),
+                    route_result_list.values(),
+                    trip_result_list,
+                    stop_time_result_list,
+                    calendar_rows,
+                    calendar_date_rows,
+                    frequency_result_list,
+                    diagnostics=diagnostics
+                )
+                phase.rows = len(trip_result_list) + len(stop_time_result_list)
+
+            errors: int = error_count(diagnostics)
+            if self._validation == 'strict' and errors > 0:
+                raise ValidationError(errors, diagnostics)
+
+        # create GTFS output files
+        feed: Feed = Feed(**self._feed_options, profiler=profiler)
+        feed.add_data('stops.txt', list(stop_result_list.values()))
+
+        if len(calendar_rows) > 0:
+            feed.add_data('calendar.txt', calendar_rows)
+        if len(calendar_date_rows) > 0:
+            feed.add_data('calendar_dates.txt', calendar_date_rows)
+
+        feed.add_data('agency.txt', list(agency_result_list.values()))
+        feed.add_data('routes.txt', list(route_result_list.values()))
+
+        feed.add_data('trips.txt', trip_result_list)
+        feed.add_data('stop_times.txt', stop_time_result_list)
+
+        if len(frequency_result_list) > 0:
+            feed.add_data('frequencies.txt', frequency_result_list)
+
+        return feed
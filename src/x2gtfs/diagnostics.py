@@ -0,0 +1,127 @@
+import json
+
+from openpyxl.utils import get_column_letter
+from typing import Any
+
+# message templates of the known problems, keyed by problem code
+MESSAGES: dict[str, str] = {
+    'unknown_route': "Route identification '{subject}' not found in route metadata. Using route identification as route_id fallback.",
+    'unknown_service': "Service identification '{subject}' not found in calendar metadata. Using service identification as service_id fallback.",
+    'unknown_stop': "Stop identification '{subject}' not found in stop metadata. Using stop identification as stop_id fallback.",
+    'invalid_time': "Time value '{subject}' can not be parsed with the configured time_format. The cell is skipped.",
+    'decreasing_time': "Time value '{subject}' is earlier than the previous time of its trip and does not follow a late evening time. The time is kept as it is.",
+    'duplicate_trip': "Trip with the same route, service, stops and times as trip '{subject}' found. The duplicate is dropped.",
+    'unknown_trip_id': "trip_id '{subject}' is not defined in trips.txt.",
+    'unknown_stop_id': "stop_id '{subject}' is not defined in stops.txt.",
+    'unknown_route_id': "route_id '{subject}' is not defined in routes.txt.",
+    'unknown_service_id': "service_id '{subject}' is not defined in calendar.txt or calendar_dates.txt.",
+    'unknown_parent_station': "parent_station '{subject}' is not defined in stops.txt.",
+    'duplicate_stop_sequence': "Trip '{subject}' has more than one stop time with the same stop_sequence.",
+    'decreasing_stop_time': "Times of trip '{subject}' decrease along its stop sequence.",
+    'trip_without_stop_times': "Trip '{subject}' has no stop times.",
+    'unused_stop': "Stop '{subject}' is not served by any trip.",
+    'unused_route': "Route '{subject}' has no trips.",
+    'unused_service': "Service '{subject}' is not used by any trip."
+}
+
+class Diagnostics:
+    """
+    Collector for problems found in the input files.
+
+    Each distinct problem, a problem code together with the offending
+    value, is counted once per occurrence. Only the first few locations
+    are kept as samples, so a problem hit by thousands of cells costs a
+    counter increment instead of a formatted log record per cell.
+
+    Collectors of single files can be merged, so worker processes and
+    cached results report into the collector of the run.
+
+    Usage:
+        diagnostics = Diagnostics()
+        diagnostics.report('unknown_stop', 'HBF', 'line1.xlsx', 6, 2)
+        print(diagnostics.summary())
+        diagnostics.write_json('diagnostics.json')
+    """
+    def __init__(self, max_samples: int = 5):
+        """
+        Args:
+            max_samples: Number of sample locations kept per distinct problem
+        """
+        self._max_samples: int = max_samples
+
+        # (code, subject) -> occurrence count and sample locations (file, row, column)
+        self._counts: dict[tuple[str, Any], int] = {}
+        self._samples: dict[tuple[str, Any], list[tuple[str, int|None, int|None]]] = {}
+
+    def report(self, code: str, subject: Any, filename: str, row: int|None = None, column: int|None = None) -> None:
+        """
+        Record one occurrence of a problem.
+
+        Args:
+            code: Problem code, one of MESSAGES
+            subject: Offending value, such as an unknown identification
+            filename: Input file the problem was found in
+            row: 1-based row of the offending cell, None if the problem is not bound to a cell
+            column: 1-based column of the offending cell, None if the problem is not bound to a cell
+        """
+        key: tuple[str, Any] = (code, subject)
+
+        count: int = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+
+        if count < self._max_samples:
+            self._samples.setdefault(key, []).append((filename, row, column))
+
+    def merge(self, other: 'Diagnostics') -> None:
+        """
+        Add all problems recorded by other to this collector.
+        """
+        for key, count in other._counts.items():
+            self._counts[key] = self._counts.get(key, 0) + count
+
+            samples: list[tuple[str, int|None, int|None]] = self._samples.setdefault(key, [])
+            samples.extend(other._samples.get(key, [])[:self._max_samples - len(samples)])
+
+    @property
+    def total(self) -> int:
+        return sum(self._counts.values())
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def entries(self) -> list[dict[str, Any]]:
+        """
+        Return one entry per distinct problem, most frequent problems first.
+        """
+        return [
+            {
+                'code': code,
+                'subject': subject,
+                'message': MESSAGES.get(code, code).format(subject=subject),
+                'count': count,
+                'samples': [
+                    {'file': filename, 'row': row, 'column': column}
+                    for filename, row, column in self._samples.get((code, subject), [])
+                ]
+            }
+            for (code, subject), count in sorted(self._counts.items(), key=lambda i: (-i[1], i[0][0], str(i[0][1])))
+        ]
+
+    def summary(self) -> str:
+        """
+        Return a table of all distinct problems with their count and samples.
+        """
+        lines: list[str] = [f"{'count':>8}  {'problem':<24} {'value':<24} samples"]
+        for entry in self.entries():
+            samples: str = ', '.join(
+                f"{s['file']}!{get_column_letter(s['column'])}{s['row']}" if s['row'] is not None else s['file']
+                for s in entry['samples']
+            )
+
+            lines.append(f"{entry['count']:>8}  {entry['code']:<24} {str(entry['subject']):<24} {samples}")
+
+        return '\n'.join(lines)
+
+    def write_json(self, filename: str) -> None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({'total': self.total, 'problems': self.entries()}, f, indent=2, default=str)
@@ -0,0 +1,218 @@
+import logging
+
+from dataclasses import fields, replace
+from itertools import groupby
+from operator import attrgetter
+
+from x2gtfs.models import Trip, StopTime, Frequency
+from x2gtfs.patterns import PatternIndex, StopPattern
+from x2gtfs.tables import StopTimeTable
+from x2gtfs.times import format_time, time_to_seconds
+
+# trip attributes which may differ between the trips of one frequency
+_TRIP_ATTRIBUTES_EXCLUDED: frozenset[str] = frozenset(('trip_id', 'trip_short_name'))
+
+def _trip_key(trip: Trip) -> tuple:
+    # route, service, headsign and all other attributes the trips of a frequency share
+    return tuple(getattr(trip, f.name) for f in fields(trip) if f.name not in _TRIP_ATTRIBUTES_EXCLUDED)
+
+def _timing_key(stop_time_list: list[StopTime]) -> tuple[tuple, int]|None:
+    """
+    Return the timing of the stop times of a trip and the time it starts at its first stop.
+
+    The timing consists of the times relative to the start of the trip and
+    all other stop time attributes except the stops, which are given by
+    the stop pattern. Trips with equal patterns and timings differ in their
+    start time only.
+
+    Returns:
+        (timing, start time in seconds) or None if the first stop has no time
+    """
+    first_stop_time: StopTime = stop_time_list[0]
+    start: int|None = time_to_seconds(first_stop_time.departure_time)
+    if start is None:
+        start = time_to_seconds(first_stop_time.arrival_time)
+    if start is None:
+        return None
+
+    timing: list[tuple] = []
+    for stop_time in stop_time_list:
+        arrival_time: int|None = time_to_seconds(stop_time.arrival_time)
+        departure_time: int|None = time_to_seconds(stop_time.departure_time)
+
+        timing.append((
+            stop_time.stop_sequence,
+            None if arrival_time is None else arrival_time - start,
+            None if departure_time is None else departure_time - start,
+            stop_time.stop_headsign,
+            stop_time.pickup_type,
+            stop_time.drop_off_type,
+            stop_time.shape_dist_traveled,
+            stop_time.timepoint
+        ))
+
+    return tuple(timing), start
+
+def _trip_timings(stop_time_list: list[StopTime]|StopTimeTable, trip_ids: set[str]) -> dict[str, tuple[tuple, int]|None]:
+    """
+    Return the timing key of each trip of trip_ids, streaming the stop times trip by trip.
+
+    Stores are iterated once and only the stop times of the current trip
+    are held, stop times of other trips are skipped. Trips whose stop times
+    are not listed consecutively get no timing and are never compressed.
+    """
+    trip_timings: dict[str, tuple[tuple, int]|None] = {}
+    for trip_id, trip_stop_times in groupby(stop_time_list, key=attrgetter('trip_id')):
+        if trip_id in trip_timings:
+            trip_timings[trip_id] = None
+        elif trip_id in trip_ids:
+            trip_timings[trip_id] = _timing_key(list(trip_stop_times))
+
+    return trip_timings
+
+def _constant_headway_runs(starts: list[tuple[int, int]], min_trips: int) -> list[tuple[list[int], int, int, int]]:
+    """
+    Split trips sorted by start time into runs with a constant headway.
+
+    Args:
+        starts: (start time, trip index) of the trips of one pattern, sorted by start time
+        min_trips: Minimum number of trips of a run
+
+    Returns:
+        List of (trip indices, start time, end time, headway) of all runs
+        with at least min_trips trips
+    """
+    runs: list[tuple[list[int], int, int, int]] = []
+
+    i: int = 0
+    while i < len(starts) - 1:
+        headway: int = starts[i + 1][0] - starts[i][0]
+
+        j: int = i + 1
+        while j + 1 < len(starts) and starts[j + 1][0] - starts[j][0] == headway:
+            j += 1
+
+        if headway > 0 and j - i + 1 >= min_trips:
+            # with exact_times the end time must be after the last start and before the
+            # departure following it, one second after the last start is read the same
+            # by consumers taking the end time as exclusive or as inclusive
+            end: int = starts[j][0] + 1
+            if j + 1 < len(starts) and starts[j + 1][0] > starts[j][0]:
+                end = min(end, starts[j + 1][0])
+
+            runs.append(([idx for _, idx in starts[i:j + 1]], starts[i][0], end, headway))
+            i = j + 1
+        else:
+            i += 1
+
+    return runs
+
+def compress_frequencies(
+        trip_list: list[Trip],
+        stop_time_list: list[StopTime]|StopTimeTable,
+        min_trips: int = 3,
+        drop_short_names: bool = False,
+        patterns: PatternIndex|None = None) -> tuple[list[Trip], list[StopTime]|StopTimeTable, list[Frequency]]:
+    """
+    Replace runs of trips with a constant headway by frequency entries.
+
+    Trips are grouped by route, service, headsign and all other trip
+    attributes except the trip ID and short name and by their stop pattern
+    first, only the trips of groups large enough for a run are grouped by
+    their travel times then. Within each group, trips following each other at
+    the same headway form a run. Each run of at least min_trips trips is
+    kept as its first trip, the template trip, and a Frequency with
+    exact_times set, so consumers expand it into exactly the original
+    departures.
+
+    Timetables usually give every trip its own short name, such as a train
+    number, which a frequency can not describe. Trips with different short
+    names are only merged with drop_short_names, the template trip of a run
+    then has no short name. Otherwise runs are formed of trips with the same
+    short name only, and trips left uncompressed for their short names are
+    logged.
+
+    Args:
+        trip_list: Trips as returned by process_timetable_files
+        stop_time_list: Stop times of the trips, list or any stop time store
+        min_trips: Minimum number of trips of a run to be compressed
+        drop_short_names: Merge trips with different short names
+        patterns: Stop patterns of the trips as filled by process_timetable_files,
+            None to intern the patterns of stop_time_list here
+
+    Returns:
+        Remaining trips, their stop times in a container of the same type
+        as stop_time_list and the frequency entries
+    """
+    if patterns is None:
+        patterns = PatternIndex.from_stop_times(stop_time_list)
+
+    # (trip attributes, pattern) -> indices of its trips, smaller groups than a run need no timings
+    pattern_trips: dict[tuple, list[int]] = {}
+    for idx, trip in enumerate(trip_list):
+        pattern: StopPattern|None = patterns.pattern(trip.trip_id)
+        if pattern is not None:
+            pattern_trips.setdefault((_trip_key(trip), pattern), []).append(idx)
+
+    candidates: list[tuple[tuple, list[int]]] = [(k, trips) for k, trips in pattern_trips.items() if len(trips) >= min_trips]
+    trip_timings: dict[str, tuple[tuple, int]|None] = _trip_timings(stop_time_list, {trip_list[idx].trip_id for _, trips in candidates for idx in trips})
+
+    # (trip attributes, pattern, timing) -> (start time, trip index) of all trips with these
+    timings: dict[tuple, list[tuple[int, int]]] = {}
+    for key, trips in candidates:
+        for idx in trips:
+            timing: tuple[tuple, int]|None = trip_timings.get(trip_list[idx].trip_id)
+            if timing is not None:
+                timings.setdefault((key, timing[0]), []).append((timing[1], idx))
+
+    removed: set[int] = set()
+    templates: dict[int, Trip] = {}
+    frequencies: list[tuple[int, Frequency]] = []
+    split_trips: int = 0
+
+    for starts in timings.values():
+        if len(starts) < min_trips:
+            continue
+
+        starts.sort()
+        runs: list[tuple[list[int], int, int, int]] = _constant_headway_runs(starts, min_trips)
+
+        if not drop_short_names and len({trip_list[idx].trip_short_name for _, idx in starts}) > 1:
+            merged_trips: int = sum(len(run) - 1 for run, _, _, _ in runs)
+
+            # runs are only formed of trips sharing their short name
+            short_name_starts: dict[str|None, list[tuple[int, int]]] = {}
+            for start, idx in starts:
+                short_name_starts.setdefault(trip_list[idx].trip_short_name, []).append((start, idx))
+
+            runs = [r for group in short_name_starts.values() for r in _constant_headway_runs(group, min_trips)]
+            split_trips += max(merged_trips - sum(len(run) - 1 for run, _, _, _ in runs), 0)
+
+        for run, start, end, headway in runs:
+            template_idx: int = run[0]
+            removed.update(run[1:])
+
+            if len({trip_list[idx].trip_short_name for idx in run}) > 1:
+                templates[template_idx] = replace(trip_list[template_idx], trip_short_name=None)
+
+            frequencies.append((template_idx, Frequency(
+                trip_id=trip_list[template_idx].trip_id,
+                start_time=format_time(start),
+                end_time=format_time(end),
+                headway_secs=headway,
+                exact_times=1
+            )))
+
+    if split_trips > 0:
+        logging.warning(f"{split_trips} trips at a constant headway are kept as they differ in trip_short_name only, drop their short names to compress them (--drop-frequency-short-names)")
+
+    # remaining trips and frequencies keep the order of the trips
+    result_trip_list: list[Trip] = [templates.get(idx, t) for idx, t in enumerate(trip_list) if idx not in removed]
+
+    removed_trip_ids: set[str] = {trip_list[idx].trip_id for idx in removed}
+    result_stop_time_list: list[StopTime]|StopTimeTable = type(stop_time_list)()
+    result_stop_time_list.extend(st for st in stop_time_list if st.trip_id not in removed_trip_ids)
+
+    frequencies.sort(key=lambda f: f[0])
+
+    return result_trip_list, result_stop_time_list, [f for _, f in frequencies]
@@ -1,25 +1,260 @@
 # feed_writer.py
-from dataclasses import fields, is_dataclass
-from typing import Type, List, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, fields, is_dataclass
+from functools import lru_cache, partial
+from operator import attrgetter, is_not
+from typing import Type, List, Any, Callable
+import copy
 import csv
-from io import StringIO
-from zipfile import ZipFile
+import hashlib
+import io
+import json
 import os
+import re
+import shutil
+import struct
+import tempfile
+import time
+from zipfile import BadZipFile, ZipFile, ZipInfo, ZIP_DEFLATED, ZIP64_LIMIT
+
+from x2gtfs.profiling import Profiler
+
+# size of the fixed part of a local file header in a ZIP archive
+_LOCAL_HEADER_SIZE = 30
+
+# members with more rows than this are written with ZIP64 extensions,
+# as their size is not known before streaming them into the archive
+_ZIP64_ROW_THRESHOLD = 5_000_000
+
+# serialized members of an incremental write are kept in memory up to this size
+_SPOOL_SIZE = 32 * 2**20
+
+@dataclass(frozen=True)
+class MemberChange:
+    """
+    Change of a GTFS file compared with the previous feed.
+    """
+    status: str                 # added, changed, unchanged or removed
+    rows: int|None              # None for removed files
+    previous_rows: int|None     # None for added files
+
+class _HashingWriter(io.RawIOBase):
+    """
+    Binary writer computing the SHA-256 digest of all bytes passed through to target.
+    """
+    def __init__(self, target: Any, close_target: bool = True):
+        self._target: Any = target
+        self._close_target: bool = close_target
+        self.hash = hashlib.sha256()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.hash.update(data)
+        self._target.write(data)
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed and self._close_target:
+            self._target.close()
+
+        super().close()
+
+@lru_cache(maxsize=None)
+def _model_headers(model: Type) -> tuple[str, ...]:
+    """
+    Return the GTFS column names of a model class in field order.
+    """
+    return tuple(f.name for f in fields(model))
+
+@lru_cache(maxsize=None)
+def _optional_headers(model: Type) -> frozenset[str]:
+    """
+    Return the column names of a model class which may be left empty.
+    """
+    return frozenset(f.name for f in fields(model) if f.default is None)
+
+@lru_cache(maxsize=None)
+def _row_serializer(headers: tuple[str, ...]) -> Callable[[Any], tuple]:
+    """
+    Build a function returning the values of headers of an object as tuple.
+
+    The serializer is built once per column set, so writing a row does not
+    look up the field names again.
+    """
+    if len(headers) == 1:
+        getter: attrgetter = attrgetter(headers[0])
+        return lambda obj: (getter(obj),)
+
+    return attrgetter(*headers)
+
+def _is_row_source(data_list: Any) -> bool:
+    return hasattr(data_list, 'iter_batches')
+
+def _member_info(zipf: ZipFile, filename: str, date_time: tuple[int, ...]) -> ZipInfo:
+    # ZipFile.open with a name dates the member 1980-01-01, the info carries the time of writing
+    info: ZipInfo = ZipInfo(filename, date_time=date_time)
+    info.compress_type = zipf.compression
+    info._compresslevel = zipf.compresslevel
+
+    return info
+
+def _copy_raw_member(source: ZipFile, info: ZipInfo, target: ZipFile) -> None:
+    """
+    Copy a member from one archive into another without recompressing it.
+
+    Args:
+        source: Archive opened for reading
+        info: ZipInfo of the member in source
+        target: Archive opened for writing
+    """
+    source.fp.seek(info.header_offset)
+    header: bytes = source.fp.read(_LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    # sizes and CRC are known, so the header is written without data descriptor
+    target_info: ZipInfo = copy.copy(info)
+    target_info.flag_bits &= ~0x08
+    target_info.extra = b''
+
+    zip64: bool = target_info.file_size > ZIP64_LIMIT or target_info.compress_size > ZIP64_LIMIT
+
+    target.fp.seek(target.start_dir)
+    target_info.header_offset = target.fp.tell()
+    target.fp.write(target_info.FileHeader(zip64))
+
+    remaining: int = target_info.compress_size
+    while remaining > 0:
+        chunk: bytes = source.fp.read(min(remaining, 1 << 20))
+        if not chunk:
+            raise EOFError(f"Unexpected end of data while copying {info.filename}.")
+
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+
+    target.start_dir = target.fp.tell()
+    target.filelist.append(target_info)
+    target.NameToInfo[target_info.filename] = target_info
+    target._didModify = True
+
+def partition_key(spec: str) -> Callable[[Any], str|None]:
+    """
+    Build the partition key function of Feed.partition from a specification.
+
+    Args:
+        spec: 'agency' to partition by agency_id, or 'route:<regex>' to
+            partition by the first group (or the whole match) of the regular
+            expression searched in route_id, routes not matching are left out
+
+    Raises:
+        ValueError: If spec is neither of both or the expression is invalid
+    """
+    if spec == 'agency':
+        return attrgetter('agency_id')
+
+    if spec.startswith('route:'):
+        try:
+            pattern: re.Pattern = re.compile(spec[len('route:'):])
+        except re.error as ex:
+            raise ValueError(f"Invalid route pattern in partition {spec}: {ex}") from None
+
+        def route_group(route: Any) -> str|None:
+            match: re.Match|None = pattern.search(route.route_id)
+            if match is None:
+                return None
+
+            return match.group(1) if pattern.groups else match.group(0)
+
+        return route_group
+
+    raise ValueError(f"Unknown partition {spec}, use agency or route:<regex>.")
+
+def change_summary(changes: dict[str, MemberChange]) -> str:
+    """
+    Format the changes returned by Feed.write as table.
+    """
+    lines: list[str] = [f"{'file':<24} {'status':<10} {'rows':>10} {'previous':>10}"]
+    for filename, change in changes.items():
+        rows: str = '' if change.rows is None else str(change.rows)
+        previous_rows: str = '' if change.previous_rows is None else str(change.previous_rows)
+        lines.append(f"{filename:<24} {change.status:<10} {rows:>10} {previous_rows:>10}")
+
+    return '\n'.join(lines)
+
+def _read_manifest(zip_filename: str) -> dict[str, dict]:
+    """
+    Return the manifest of the members of an archive written by Feed, empty if there is none.
+    """
+    try:
+        with ZipFile(zip_filename) as zipf:
+            manifest: Any = json.loads(zipf.comment.decode('utf-8')).get('members')
+    except (OSError, BadZipFile, ValueError, AttributeError):
+        return {}
+
+    return manifest if isinstance(manifest, dict) else {}
+
+def write_feeds(feeds: dict[str, 'Feed'], workers: int = 1, incremental: bool = False) -> dict[str, dict[str, MemberChange]]:
+    """
+    Write several feeds concurrently.
+
+    Feeds written at the same time compress their members with one thread
+    each, so no more than workers threads compress at once.
+
+    Args:
+        feeds: Feeds keyed by the name of their output ZIP file
+        workers: Number of feeds written at the same time
+        incremental: Compare each feed with the feed at its output path and
+            copy unchanged files from there, see Feed.write
+
+    Returns:
+        Changes of the files of each feed keyed by the name of its output ZIP file
+    """
+    def write(zip_filename: str, feed: 'Feed', feed_workers: int|None = None) -> dict[str, MemberChange]:
+        previous_filename: str|None = zip_filename if incremental and os.path.exists(zip_filename) else None
+        return feed.write(zip_filename, previous_filename, feed_workers)
+
+    if workers > 1 and len(feeds) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # building the dict consumes the results in order and raises the first exception of the writers
+            return dict(zip(feeds, executor.map(lambda f: write(*f, 1), feeds.items())))
+
+    return {zip_filename: write(zip_filename, feed) for zip_filename, feed in feeds.items()}
 
 class Feed:
     """
     Generic GTFS Feed writer for dataclass objects.
-    
+
+    Besides lists of dataclass objects, containers which provide a `model`
+    attribute, `has_values(header)` and `iter_batches(headers)` (such as
+    x2gtfs.tables.StopTimeTable) are written from their batches of row
+    tuples directly.
+
     Usage:
         feed = Feed()
         feed.add_data("stops.txt", list_of_stop_dataclasses)
         feed.add_data("routes.txt", list_of_route_dataclasses)
         feed.write("gtfs_feed.zip")
     """
-    def __init__(self):
+    def __init__(self, compresslevel: int|None = None, buffer_size: int = 1 << 16, workers: int = 1, drop_empty_columns: bool = False, profiler: Profiler|None = None):
+        """
+        Args:
+            compresslevel: DEFLATE compression level (0-9), None for the zlib default
+            buffer_size: Size of the write buffer between CSV writer and ZIP member
+            workers: Number of threads compressing members in parallel
+            drop_empty_columns: Omit optional columns which are empty in every row of a file
+            profiler: Profiler recording a phase for each member and the whole write
+        """
         # Dictionary mapping filename -> list of dataclass objects
         self._data_files: dict[str, List[Any]] = {}
 
+        self._compresslevel: int|None = compresslevel
+        self._buffer_size: int = buffer_size
+        self._workers: int = workers
+        self._drop_empty_columns: bool = drop_empty_columns
+        self._profiler: Profiler = profiler if profiler is not None else Profiler()
+
     def add_data(self, filename: str, data_list: List[Any]) -> None:
         """
         Add a list of dataclass objects to be written to a CSV file.
@@ -30,37 +265,344 @@ class Feed:
         """
         if not data_list:
             raise ValueError(f"No data provided for file {filename}.")
-        if not is_dataclass(data_list[0]):
+        if not _is_row_source(data_list) and not is_dataclass(data_list[0]):
             raise TypeError(f"Objects in list for {filename} must be dataclass instances.")
 
         # Store the list keyed by filename
         self._data_files[filename] = data_list
 
-    def write(self, zip_filename: str) -> None:
+    def partition(self, key: Callable[[Any], str|None]) -> dict[str, 'Feed']:
+        """
+        Split the feed into sub-feeds by a key of its routes.
+
+        Each sub-feed holds the routes with the same key together with
+        their trips, stop times and frequencies, and only the agencies,
+        stops (including their parent stations) and services these
+        reference. Routes with a key of None are in no sub-feed. Files
+        not related to routes are copied into every sub-feed. All stop
+        times are distributed in one pass into containers of the same
+        type as the stop times of this feed.
+
+        Args:
+            key: Function returning the partition of a route object, see partition_key
+
+        Returns:
+            Sub-feeds keyed by partition, with the options of this feed
+        """
+        partitions: dict[str, dict[str, list[Any]]] = {}
+        route_partitions: dict[str, str] = {}
+        for route in self._data_files.get('routes.txt', []):
+            value: str|None = key(route)
+            if value is not None:
+                route_partitions[route.route_id] = value
+                partitions.setdefault(value, {}).setdefault('routes.txt', []).append(route)
+
+        trip_partitions: dict[str, str] = {}
+        for trip in self._data_files.get('trips.txt', []):
+            value = route_partitions.get(trip.route_id)
+            if value is not None:
+                trip_partitions[trip.trip_id] = value
+                partitions[value].setdefault('trips.txt', []).append(trip)
+
+        stop_times: Any = self._data_files.get('stop_times.txt', [])
+        partition_stop_times: dict[str, Any] = {value: type(stop_times)() for value in partitions}
+        partition_stop_ids: dict[str, set[str]] = {value: set() for value in partitions}
+        for stop_time in stop_times:
+            value = trip_partitions.get(stop_time.trip_id)
+            if value is not None:
+                partition_stop_times[value].append(stop_time)
+                partition_stop_ids[value].add(stop_time.stop_id)
+
+        stops: dict[str, Any] = {s.stop_id: s for s in self._data_files.get('stops.txt', [])}
+
+        feeds: dict[str, Feed] = {}
+        for value, data_files in partitions.items():
+            # parent stations are referenced by their stops, stations may have parents themselves
+            stop_ids: set[str] = partition_stop_ids[value]
+            pending_stop_ids: set[str] = set(stop_ids)
+            while pending_stop_ids:
+                parent_ids: set[str] = {
+                    stops[s].parent_station for s in pending_stop_ids
+                    if s in stops and stops[s].parent_station is not None
+                }
+                pending_stop_ids = parent_ids - stop_ids
+                stop_ids |= pending_stop_ids
+
+            trip_ids: set[str] = {t.trip_id for t in data_files.get('trips.txt', [])}
+            service_ids: set[str] = {t.service_id for t in data_files.get('trips.txt', [])}
+            agency_ids: set[str|None] = {r.agency_id for r in data_files['routes.txt']}
+
+            selections: dict[str, Callable[[Any], bool]] = {
+                'agency.txt': lambda a: a.agency_id in agency_ids or None in agency_ids,
+                'stops.txt': lambda s: s.stop_id in stop_ids,
+                'calendar.txt': lambda c: c.service_id in service_ids,
+                'calendar_dates.txt': lambda c: c.service_id in service_ids,
+                'frequencies.txt': lambda f: f.trip_id in trip_ids
+            }
+
+            feed: Feed = Feed(self._compresslevel, self._buffer_size, self._workers, self._drop_empty_columns, self._profiler)
+            for filename, data_list in self._data_files.items():
+                if filename == 'stop_times.txt':
+                    data_list = partition_stop_times[value]
+                elif filename in data_files:
+                    data_list = data_files[filename]
+                elif filename in selections:
+                    data_list = list(filter(selections[filename], data_list))
+
+                if data_list:
+                    feed.add_data(filename, data_list)
+
+            feeds[value] = feed
+
+        return feeds
+
+    def write(self, zip_filename: str, previous_filename: str|None = None, workers: int|None = None) -> dict[str, MemberChange]:
         """
         Write all added data to CSV files and package them into a ZIP file.
 
+        Rows are streamed into DEFLATE compressed members, so no member is
+        held in memory as a whole. With more than one worker, members are
+        compressed in parallel into temporary archives first and copied
+        into the output archive afterwards.
+
+        The SHA-256 digest and row count of each member are stored as JSON
+        manifest in the archive comment. Given the previous feed, each
+        member is serialized and hashed first, members with the digest of
+        the previous manifest are copied from the previous archive as
+        compressed data and only changed members are compressed again. With
+        more than one worker, members are hashed and compressed in parallel
+        here as well.
+
+        The archive is written next to zip_filename and moved into place
+        when complete, so readers never see a partial feed and the previous
+        feed may be zip_filename itself.
+
         Args:
             zip_filename: Name of the output ZIP file
+            previous_filename: Feed written before, a feed without manifest is written in full
+            workers: Number of threads compressing members, None for the workers of the feed
+
+        Returns:
+            Change of each file compared with the previous feed
         """
-        with ZipFile(zip_filename, "w") as zipf:
-            for filename, data_list in self._data_files.items():
-                if not data_list:
-                    continue  # skip empty lists
+        data_files: list[tuple[str, List[Any]]] = [(f, d) for f, d in self._data_files.items() if d]
+        if workers is None:
+            workers = self._workers
+        previous_manifest: dict[str, dict] = _read_manifest(previous_filename) if previous_filename is not None else {}
+
+        # members written now are dated in local time, as ZIP readers expect
+        date_time: tuple[int, ...] = time.localtime()[:6]
+
+        temporary_filename: str = f"{zip_filename}.{os.getpid()}.tmp"
+        try:
+            with self._profiler.phase(f"write {os.path.basename(zip_filename)}") as phase:
+                phase.rows = sum(len(d) for _, d in data_files)
+
+                if previous_manifest:
+                    manifest: dict[str, dict] = self._write_incremental(temporary_filename, data_files, previous_filename, previous_manifest, date_time, workers)
+                else:
+                    manifest = self._write_archive(temporary_filename, data_files, date_time, workers)
+
+            os.replace(temporary_filename, zip_filename)
+        except BaseException:
+            if os.path.exists(temporary_filename):
+                os.remove(temporary_filename)
+            raise
+
+        changes: dict[str, MemberChange] = {}
+        for filename, entry in manifest.items():
+            previous_entry: dict|None = previous_manifest.get(filename)
+            if previous_entry is None:
+                changes[filename] = MemberChange('added', entry['rows'], None)
+            else:
+                status: str = 'unchanged' if previous_entry.get('sha256') == entry['sha256'] else 'changed'
+                changes[filename] = MemberChange(status, entry['rows'], previous_entry.get('rows'))
+
+        for filename, previous_entry in previous_manifest.items():
+            if filename not in manifest:
+                changes[filename] = MemberChange('removed', None, previous_entry.get('rows'))
+
+        return changes
+
+    def _write_archive(self, zip_filename: str, data_files: list[tuple[str, List[Any]]], date_time: tuple[int, ...], workers: int) -> dict[str, dict]:
+        manifest: dict[str, dict] = {}
+
+        with ZipFile(zip_filename, "w", compression=ZIP_DEFLATED, compresslevel=self._compresslevel) as zipf:
+            if workers > 1 and len(data_files) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    temporary_files: list[tuple[str, str]] = list(executor.map(lambda d: self._write_temporary(*d, date_time), data_files))
+
+                # assemble the archive in the order the files were added
+                for (filename, data_list), (temporary_filename, digest) in zip(data_files, temporary_files):
+                    try:
+                        with ZipFile(temporary_filename, "r") as tempf:
+                            _copy_raw_member(tempf, tempf.getinfo(filename), zipf)
+                    finally:
+                        os.remove(temporary_filename)
+
+                    manifest[filename] = {'sha256': digest, 'rows': len(data_list)}
+            else:
+                for filename, data_list in data_files:
+                    manifest[filename] = {'sha256': self._write_member(zipf, filename, data_list, date_time), 'rows': len(data_list)}
+
+            zipf.comment = json.dumps({'members': manifest}).encode('utf-8')
+
+        return manifest
+
+    def _write_incremental(self, zip_filename: str, data_files: list[tuple[str, List[Any]]], previous_filename: str, previous_manifest: dict[str, dict], date_time: tuple[int, ...], workers: int) -> dict[str, dict]:
+        manifest: dict[str, dict] = {}
+
+        with ZipFile(previous_filename, "r") as previous, ZipFile(zip_filename, "w", compression=ZIP_DEFLATED, compresslevel=self._compresslevel) as zipf:
+            # members with one of these digests are copied from the previous archive,
+            # unchanged members keep the date of the feed their data was written to
+            previous_digests: dict[str, str|None] = {
+                filename: previous_manifest.get(filename, {}).get('sha256') if filename in previous.NameToInfo else None
+                for filename, _ in data_files
+            }
+
+            if workers > 1 and len(data_files) > 1:
+                # members are hashed and changed members compressed in parallel, only copying into the archive is serial
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results: list[Future] = [
+                        executor.submit(self._write_changed_temporary, filename, data_list, previous_digests[filename], date_time)
+                        for filename, data_list in data_files
+                    ]
+
+                try:
+                    # assemble the archive in the order the files were added
+                    for (filename, data_list), result in zip(data_files, results):
+                        digest, temporary_filename = result.result()
+                        if temporary_filename is None:
+                            _copy_raw_member(previous, previous.getinfo(filename), zipf)
+                        else:
+                            with ZipFile(temporary_filename, "r") as tempf:
+                                _copy_raw_member(tempf, tempf.getinfo(filename), zipf)
+
+                        manifest[filename] = {'sha256': digest, 'rows': len(data_list)}
+                finally:
+                    for result in results:
+                        if result.exception() is None and result.result()[1] is not None:
+                            os.remove(result.result()[1])
+            else:
+                for filename, data_list in data_files:
+                    with self._profiler.phase(f"write {filename}") as phase:
+                        phase.rows = len(data_list)
+
+                        # the digest is only known after serializing, the CSV data is kept until then
+                        with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as spool:
+                            digest: str = self._serialize(_HashingWriter(spool, close_target=False), data_list)
+
+                            if digest == previous_digests[filename]:
+                                _copy_raw_member(previous, previous.getinfo(filename), zipf)
+                            else:
+                                self._compress_spool(zipf, filename, spool, len(data_list), date_time)
+
+                    manifest[filename] = {'sha256': digest, 'rows': len(data_list)}
+
+            zipf.comment = json.dumps({'members': manifest}).encode('utf-8')
+
+        return manifest
+
+    def _write_changed_temporary(self, filename: str, data_list: List[Any], previous_digest: str|None, date_time: tuple[int, ...]) -> tuple[str, str|None]:
+        """
+        Serialize a member and, unless its digest is previous_digest, write it into a temporary archive.
+
+        Returns:
+            Digest of the CSV data and the filename of the temporary archive, None if the member is unchanged
+        """
+        with self._profiler.phase(f"write {filename}") as phase:
+            phase.rows = len(data_list)
+
+            with tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE) as spool:
+                digest: str = self._serialize(_HashingWriter(spool, close_target=False), data_list)
+                if digest == previous_digest:
+                    return digest, None
+
+                fd, temporary_filename = tempfile.mkstemp(suffix='.zip')
+                os.close(fd)
+
+                try:
+                    with ZipFile(temporary_filename, "w", compression=ZIP_DEFLATED, compresslevel=self._compresslevel) as tempf:
+                        self._compress_spool(tempf, filename, spool, len(data_list), date_time)
+                except BaseException:
+                    os.remove(temporary_filename)
+                    raise
+
+        return digest, temporary_filename
+
+    def _compress_spool(self, zipf: ZipFile, filename: str, spool: Any, rows: int, date_time: tuple[int, ...]) -> None:
+        # CSV data serialized into spool before is compressed into a new member of zipf
+        spool.seek(0)
+        with zipf.open(_member_info(zipf, filename, date_time), "w", force_zip64=rows > _ZIP64_ROW_THRESHOLD) as member:
+            shutil.copyfileobj(spool, member, self._buffer_size)
+
+    def _write_temporary(self, filename: str, data_list: List[Any], date_time: tuple[int, ...]) -> tuple[str, str]:
+        """
+        Write a single member into a temporary archive and return its filename and digest.
+        """
+        fd, temporary_filename = tempfile.mkstemp(suffix='.zip')
+        os.close(fd)
+
+        try:
+            with ZipFile(temporary_filename, "w", compression=ZIP_DEFLATED, compresslevel=self._compresslevel) as tempf:
+                digest: str = self._write_member(tempf, filename, data_list, date_time)
+        except BaseException:
+            os.remove(temporary_filename)
+            raise
+
+        return temporary_filename, digest
+
+    def _write_member(self, zipf: ZipFile, filename: str, data_list: List[Any], date_time: tuple[int, ...]) -> str:
+        """
+        Stream the rows of data_list as CSV into a new member of zipf and return the SHA-256 digest of the CSV data.
+        """
+        with self._profiler.phase(f"write {filename}") as phase:
+            phase.rows = len(data_list)
+
+            force_zip64: bool = len(data_list) > _ZIP64_ROW_THRESHOLD
+            return self._serialize(_HashingWriter(zipf.open(_member_info(zipf, filename, date_time), "w", force_zip64=force_zip64)), data_list)
+
+    def _serialize(self, target: _HashingWriter, data_list: List[Any]) -> str:
+        """
+        Write the rows of data_list as CSV into target and return the SHA-256 digest of the CSV data.
+        """
+        # Extract headers from dataclass fields
+        headers: tuple[str, ...] = self._headers(data_list)
+        serializer: Callable[[Any], tuple] = _row_serializer(headers)
+
+        buffer: io.BufferedWriter = io.BufferedWriter(target, buffer_size=self._buffer_size)
+        with io.TextIOWrapper(buffer, encoding="utf-8", newline="") as output:
+            writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
+
+            writer.writerow(headers)
+
+            if _is_row_source(data_list):
+                for batch in data_list.iter_batches(headers):
+                    writer.writerows(batch)
+            else:
+                writer.writerows(map(serializer, data_list))
+
+        return target.hash.hexdigest()
+
+    def _headers(self, data_list: List[Any]) -> tuple[str, ...]:
+        """
+        Return the columns to write for data_list.
+        """
+        model: Type = data_list.model if _is_row_source(data_list) else type(data_list[0])
+        headers: tuple[str, ...] = _model_headers(model)
 
-                # Create CSV in memory
-                output = StringIO()
-                writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
+        if not self._drop_empty_columns:
+            return headers
 
-                # Extract headers from dataclass fields
-                headers = [f.name for f in fields(data_list[0])]
-                writer.writerow(headers)
+        # an optional column is kept as soon as one row has a value
+        optional_headers: frozenset[str] = _optional_headers(model)
+        return tuple(
+            h for h in headers
+            if h not in optional_headers or self._has_values(data_list, h)
+        )
 
-                # Write rows
-                for obj in data_list:
-                    row = [getattr(obj, f) for f in headers]
-                    writer.writerow(row)
+    def _has_values(self, data_list: List[Any], header: str) -> bool:
+        if _is_row_source(data_list):
+            return data_list.has_values(header)
 
-                # Write CSV into the ZIP
-                zipf.writestr(filename, output.getvalue())
-                output.close()
+        return any(map(partial(is_not, None), map(attrgetter(header), data_list)))
@@ -1,99 +1,118 @@
-from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.cell.cell import Cell
 from typing import Generator
 
-def iter_data_vertical(ws: Worksheet, start_cell: Cell) -> Generator[Cell, None, None]:
+from x2gtfs.reader import Sheet, SheetCell
+
+def _is_empty(line: tuple) -> bool:
+    # counting is done in C, which is much cheaper than testing each value
+    return line.count(None) + line.count("") == len(line)
+
+def _runs(lines: list[tuple]) -> list[tuple[int, int, int]]:
+    """
+    Find the first run of values of each line until a line is entirely empty.
+
+    The run of a line starts at its first value and ends at the first
+    empty value after it.
+
+    Returns:
+        List of line index, run start and run end (exclusive)
+    """
+    runs: list[tuple[int, int, int]] = []
+    for line_idx, line in enumerate(lines):
+        if _is_empty(line):
+            # entire line is empty → stop iteration
+            break
+
+        start: int = 0
+        while line[start] is None or line[start] == "":
+            start += 1
+
+        end: int = start + 1
+        size: int = len(line)
+        while end < size and line[end] is not None and line[end] != "":
+            end += 1
+
+        runs.append((line_idx, start, end))
+
+    return runs
+
+def _data_rows(sheet: Sheet, start_row: int, start_col: int) -> list[tuple]:
+    """
+    Cut the data area starting at start_row / start_col out of the sheet.
+
+    Rows are padded with None to a common width, so the result is a
+    rectangular grid which can be transposed with zip. Trailing rows
+    without any value inside the data area are dropped.
+    """
+    width: int = max(sheet.max_column - start_col + 1, 0)
+    padding: tuple = (None,) * width
+
+    # find the last row with a value inside the data area, checking the
+    # whole row first avoids slicing rows which are empty anyway
+    end: int = sheet.max_row
+    while end >= start_row:
+        row: tuple = sheet.rows[end - 1]
+        if not _is_empty(row) and not _is_empty(row[start_col - 1:]):
+            break
+
+        end -= 1
+
+    return [
+        (row[start_col - 1:] + padding)[:width]
+        for row in sheet.rows[start_row - 1:end]
+    ]
+
+def iter_data_vertical(sheet: Sheet, start_cell: SheetCell) -> Generator[SheetCell, None, None]:
     """
     Iterate vertically over columns starting from start_cell.
-    
+
     - Each column is traversed from start_cell.row downwards
     - Row iteration stops at the first empty cell after at least one value has been found
     - Then moves to the next column
     - Iteration stops only when an entire column from start_cell.row is empty
-    
+
+    The data area is cut out of the value grid and transposed once into
+    column tuples, so empty columns and trailing empty rows are detected in
+    bulk instead of probing every cell up to max_row.
+
     Args:
-        ws: openpyxl Worksheet object
+        sheet: Sheet containing the worksheet values
         start_cell: The starting cell for the iteration
 
     Yields:
-        Cell objects in the order of iteration
+        SheetCell records in the order of iteration
     """
     start_row: int = start_cell.row
     start_col: int = start_cell.column
-    col: int = start_col
-    max_row: int = ws.max_row
-
-    while True:
-        # Check if the entire column from start_row is empty
-        col_empty: bool = True
-        for r in range(start_row, max_row + 1):
-            if ws.cell(row=r, column=col).value not in (None, ""):
-                col_empty = False
-                break
-
-        if col_empty:
-            # Entire column is empty → stop iteration
-            break
 
-        # Iterate rows in the current column
-        row: int = start_row
-        found_value_in_column: bool = False
-        while row <= max_row:
-            cell: Cell = ws.cell(row=row, column=col)
-            if cell.value not in (None, ""):
-                found_value_in_column = True
-                yield cell
-            elif found_value_in_column:
-                # After the first value, an empty cell → move to next column
-                break
-            row += 1
-
-        col += 1
-
-def iter_data_horizontal(ws: Worksheet, start_cell: Cell) -> Generator[Cell, None, None]:
+    columns: list[tuple] = list(zip(*_data_rows(sheet, start_row, start_col)))
+
+    for col_offset, start, end in _runs(columns):
+        column: tuple = columns[col_offset]
+        for row_offset in range(start, end):
+            yield SheetCell(start_row + row_offset, start_col + col_offset, column[row_offset])
+
+def iter_data_horizontal(sheet: Sheet, start_cell: SheetCell) -> Generator[SheetCell, None, None]:
     """
     Iterate horizontally over rows starting from start_cell.
-    
+
     - Each row is traversed from start_cell.column to the right
     - Column iteration stops at the first empty cell after at least one value has been found
     - Then moves to the next row
     - Iteration stops only when an entire row from start_cell.column is empty
-    
+
     Args:
-        ws: openpyxl Worksheet object
+        sheet: Sheet containing the worksheet values
         start_cell: The starting cell for the iteration
 
     Yields:
-        Cell objects in the order of iteration
+        SheetCell records in the order of iteration
     """
     start_row: int = start_cell.row
     start_col: int = start_cell.column
-    row: int = start_row
-    max_col: int = ws.max_column
-
-    while True:
-        # Check if the entire row from start_col is empty
-        row_empty: bool = True
-        for c in range(start_col, max_col + 1):
-            if ws.cell(row=row, column=c).value not in (None, ""):
-                row_empty = False
-                break
-
-        if row_empty:
-            # Entire row is empty → stop iteration
-            break
 
-        # Iterate columns in the current row
-        col: int = start_col
-        found_value_in_row: bool = False
-        while col <= max_col:
-            cell: Cell = ws.cell(row=row, column=col)
-            if cell.value not in (None, ""):
-                found_value_in_row = True
-                yield cell
-            elif found_value_in_row:
-                # After the first value, an empty cell → move to next row
-                break
-            col += 1
-
-        row += 1
\ No newline at end of file
+    rows: list[tuple] = _data_rows(sheet, start_row, start_col)
+
+    for row_offset, start, end in _runs(rows):
+        row: tuple = rows[row_offset]
+        for col_offset in range(start, end):
+            yield SheetCell(start_row + row_offset, start_col + col_offset, row[col_offset])
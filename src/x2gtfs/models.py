@@ -56,7 +56,7 @@ class Route:
     route_color: Optional[str] = None
     route_text_color: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Trip:
     trip_id: str = ""
     route_id: str = ""
@@ -69,7 +69,7 @@ class Trip:
     wheelchair_accessible: Optional[int] = None
     bikes_allowed: Optional[int] = None
 
-@dataclass
+@dataclass(slots=True)
 class StopTime:
     trip_id: str = ""
     arrival_time: str = "00:00:00"  # HH:MM:SS
@@ -82,6 +82,14 @@ class StopTime:
     shape_dist_traveled: Optional[float] = None
     timepoint: Optional[int] = None
 
+@dataclass
+class Frequency:
+    trip_id: str = ""
+    start_time: str = "00:00:00"  # HH:MM:SS
+    end_time: str = "00:00:00"    # HH:MM:SS
+    headway_secs: int = 0
+    exact_times: Optional[int] = None  # 0 = frequency-based, 1 = schedule-based
+
 @dataclass
 class ShapePoint:
     shape_id: str = ""
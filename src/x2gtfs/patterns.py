@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
+from typing import Iterable, Iterator
+
+from x2gtfs.models import StopTime
+
+# patterns are interned, so they compare and hash by identity instead of by their stops
+@dataclass(frozen=True, slots=True, eq=False)
+class StopPattern:
+    """
+    Sequence of stops served by one or more trips.
+    """
+    pattern_id: int
+    stop_ids: tuple[str, ...]
+
+class PatternIndex:
+    """
+    Interning index of the stop patterns of all trips.
+
+    Trips serving the same stops in the same order share one StopPattern
+    object, so each distinct stop sequence is stored once. The index also
+    maps each pattern to its trips and each trip to its pattern, later
+    stages can look up all trips of a pattern without comparing the stop
+    times of every trip.
+
+    process_timetable_files fills the index passed to it and detects
+    duplicate trips by pattern, compress_frequencies groups trips by it.
+
+    Usage:
+        patterns = PatternIndex()
+        pattern = patterns.add('trip:1', ('S1', 'S2', 'S3'))
+        patterns.trip_ids(pattern)
+    """
+    def __init__(self):
+        self._patterns: dict[tuple[str, ...], StopPattern] = {}
+        self._trip_ids: dict[StopPattern, list[str]] = {}
+        self._trip_patterns: dict[str, StopPattern] = {}
+
+    @classmethod
+    def from_stop_times(cls, stop_times: Iterable[StopTime]) -> 'PatternIndex':
+        """
+        Build the index of stop times listed trip by trip, such as the stop times of any store.
+
+        Trips whose stop times are not listed consecutively get no pattern.
+        """
+        patterns: PatternIndex = cls()
+        seen_trip_ids: set[str] = set()
+        for trip_id, trip_stop_times in groupby(stop_times, key=attrgetter('trip_id')):
+            if trip_id in seen_trip_ids:
+                patterns.remove(trip_id)
+            else:
+                seen_trip_ids.add(trip_id)
+                patterns.add(trip_id, tuple(st.stop_id for st in trip_stop_times))
+
+        return patterns
+
+    def intern(self, stop_ids: tuple[str, ...]) -> StopPattern:
+        """
+        Return the pattern of stop_ids, a new pattern is created on first use.
+        """
+        pattern: StopPattern|None = self._patterns.get(stop_ids)
+        if pattern is None:
+            pattern = self._patterns[stop_ids] = StopPattern(len(self._patterns) + 1, stop_ids)
+            self._trip_ids[pattern] = []
+
+        return pattern
+
+    def add(self, trip_id: str, stop_ids: tuple[str, ...]) -> StopPattern:
+        """
+        Intern the stop sequence of a trip and register the trip with its pattern.
+        """
+        pattern: StopPattern = self.intern(stop_ids)
+        self.assign(trip_id, pattern)
+
+        return pattern
+
+    def assign(self, trip_id: str, pattern: StopPattern) -> None:
+        """
+        Register a trip with a pattern returned by intern.
+        """
+        self._trip_ids[pattern].append(trip_id)
+        self._trip_patterns[trip_id] = pattern
+
+    def remove(self, trip_id: str) -> None:
+        """
+        Unregister a trip, its pattern is kept.
+        """
+        pattern: StopPattern|None = self._trip_patterns.pop(trip_id, None)
+        if pattern is not None:
+            self._trip_ids[pattern].remove(trip_id)
+
+    def pattern(self, trip_id: str) -> StopPattern|None:
+        return self._trip_patterns.get(trip_id)
+
+    def trip_ids(self, pattern: StopPattern) -> list[str]:
+        return self._trip_ids.get(pattern, [])
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __iter__(self) -> Iterator[StopPattern]:
+        return iter(self._patterns.values())
@@ -0,0 +1,231 @@
+from dataclasses import dataclass, field
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.cell import coordinate_from_string
+from types import MappingProxyType
+from typing import Any, Mapping
+
+@dataclass(frozen=True)
+class StopsPlan:
+    input_filename: str
+    stop_identification_col: int
+    stop_id_col: int
+    stop_name_col: int
+    stop_lat_col: int
+    stop_lon_col: int
+
+@dataclass(frozen=True)
+class RoutesPlan:
+    input_filename: str
+    route_identification_col: int
+    route_id_col: int
+    route_short_name_col: int
+    route_long_name_col: int
+    route_type_col: int
+    route_color_col: int
+    route_text_color_col: int
+    agency_name_col: int
+    agency_url_col: int
+
+@dataclass(frozen=True)
+class CalendarsPlan:
+    input_filename: str
+    date_format: str
+    service_identification_col: int
+    weekday_cols: tuple[int, ...]  # monday to sunday
+    start_date_col: int
+    end_date_col: int
+
+@dataclass(frozen=True)
+class CalendarExceptionsPlan:
+    input_filename: str
+    date_format: str
+    service_identification_col: int
+    date_col: int
+    exception_type_col: int
+
+@dataclass(frozen=True)
+class TimetablesPlan:
+    input_directory: str
+    layout_type: str
+    run_through_char: str
+    time_format: str
+    sheet_name_pattern: str|None  # glob pattern of the worksheets to convert, None for the active sheet
+    data_start_row: int
+    data_start_col: int
+    stop_identification_col: int
+    route_identification_row: int
+    service_identification_row: int
+    shape_identification_row: int
+    trip_short_name_row: int
+    trip_headsign_row: int
+
+@dataclass(frozen=True)
+class CsvFormat:
+    delimiter: str
+    encoding: str
+
+@dataclass(frozen=True)
+class ConversionPlan:
+    """
+    Immutable, precompiled form of the configuration.
+
+    Column letters are resolved to 1-based column indices, mappings are
+    plain read-only dicts and ID patterns are ready to be formatted, so
+    loaders and the timetable parser do no configuration lookups per cell.
+    Metadata sections are None if they are not configured.
+
+    The merged configuration the plan was compiled from is kept for cache
+    keys, a plan is pickled as this configuration and compiled again.
+    """
+    stops: StopsPlan|None
+    routes: RoutesPlan|None
+    calendars: CalendarsPlan|None
+    calendar_exceptions: CalendarExceptionsPlan|None
+    timetables: TimetablesPlan
+    csv_format: CsvFormat  # format of all CSV input files
+
+    route_type: Mapping[Any, int]
+    calendar_day_type: Mapping[Any, int]
+    calendar_exception_type: Mapping[Any, int]
+
+    agency_id_pattern: str
+    agency_timezone: str
+    trip_id_pattern: str
+    service_id_pattern: str
+
+    config: dict = field(compare=False, repr=False, default_factory=dict)
+
+    def __reduce__(self) -> tuple:
+        # mappings are read-only proxies, which can not be pickled
+        return compile_plan, (self.config,)
+
+    def section(self, *path: str) -> Any:
+        """
+        Return a plain value of the configuration, e.g. section('config', 'timetables').
+        """
+        current: Any = self.config
+        for key in path:
+            current = current.get(key) if isinstance(current, dict) else None
+
+        return current
+
+    def agency_id(self, agency_number: int) -> str:
+        return self.agency_id_pattern.format(agency_id=agency_number)
+
+    def trip_id(self, trip_number: int) -> str:
+        return self.trip_id_pattern.format(trip_id=trip_number).zfill(6)
+
+    def service_id(self, service_number: int) -> str:
+        return self.service_id_pattern.format(service_id=service_number)
+
+def _col(section: dict, key: str) -> int:
+    return column_index_from_string(section[key])
+
+def _mapping(mappings: dict, key: str) -> Mapping[Any, int]:
+    return MappingProxyType(dict(mappings.get(key) or {}))
+
+def compile_plan(config: dict) -> ConversionPlan:
+    """
+    Compile a validated and merged configuration into a ConversionPlan.
+
+    Args:
+        config: Configuration dict with defaults applied
+
+    Returns:
+        ConversionPlan for the configuration
+    """
+    metadata: dict = config['config'].get('metadata') or {}
+    timetables: dict = config['config']['timetables']
+    mappings: dict = config['config']['mappings']
+    defaults: dict = config['config']['defaults']
+    csv_format: dict = config['config']['csv']
+
+    stops: StopsPlan|None = None
+    if 'stops' in metadata:
+        section: dict = metadata['stops']
+        stops = StopsPlan(
+            input_filename=section['input_filename'],
+            stop_identification_col=_col(section, 'stop_identification_index'),
+            stop_id_col=_col(section, 'stop_id_index'),
+            stop_name_col=_col(section, 'stop_name_index'),
+            stop_lat_col=_col(section, 'stop_lat_index'),
+            stop_lon_col=_col(section, 'stop_lon_index')
+        )
+
+    routes: RoutesPlan|None = None
+    if 'routes' in metadata:
+        section = metadata['routes']
+        routes = RoutesPlan(
+            input_filename=section['input_filename'],
+            route_identification_col=_col(section, 'route_identification_index'),
+            route_id_col=_col(section, 'route_id_index'),
+            route_short_name_col=_col(section, 'route_short_name_index'),
+            route_long_name_col=_col(section, 'route_long_name_index'),
+            route_type_col=_col(section, 'route_type_index'),
+            route_color_col=_col(section, 'route_color_index'),
+            route_text_color_col=_col(section, 'route_text_color_index'),
+            agency_name_col=_col(section, 'agency_name_index'),
+            agency_url_col=_col(section, 'agency_url_index')
+        )
+
+    calendars: CalendarsPlan|None = None
+    if 'calendars' in metadata:
+        section = metadata['calendars']
+        calendars = CalendarsPlan(
+            input_filename=section['input_filename'],
+            date_format=section.get('date_format'),
+            service_identification_col=_col(section, 'service_identification_index'),
+            weekday_cols=tuple(
+                _col(section, f"{day}_index")
+                for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+            ),
+            start_date_col=_col(section, 'start_date_index'),
+            end_date_col=_col(section, 'end_date_index')
+        )
+
+    calendar_exceptions: CalendarExceptionsPlan|None = None
+    if 'calendar_exceptions' in metadata:
+        section = metadata['calendar_exceptions']
+        calendar_exceptions = CalendarExceptionsPlan(
+            input_filename=section['input_filename'],
+            date_format=section.get('date_format'),
+            service_identification_col=_col(section, 'service_identification_index'),
+            date_col=_col(section, 'date_index'),
+            exception_type_col=_col(section, 'exception_type_index')
+        )
+
+    data_start_col, data_start_row = coordinate_from_string(timetables['data_start_area'])
+
+    return ConversionPlan(
+        stops=stops,
+        routes=routes,
+        calendars=calendars,
+        calendar_exceptions=calendar_exceptions,
+        timetables=TimetablesPlan(
+            input_directory=timetables['input_directory'],
+            layout_type=timetables['layout_type'],
+            run_through_char=timetables['run_through_char'],
+            time_format=timetables['time_format'],
+            sheet_name_pattern=timetables.get('sheet_name_pattern'),
+            data_start_row=data_start_row,
+            data_start_col=column_index_from_string(data_start_col),
+            stop_identification_col=_col(timetables, 'stop_identification_index'),
+            route_identification_row=int(timetables['route_identification_index']),
+            service_identification_row=int(timetables['service_identification_index']),
+            shape_identification_row=int(timetables['shape_identification_index']),
+            trip_short_name_row=int(timetables['trip_short_name_index']),
+            trip_headsign_row=int(timetables['trip_headsign_index'])
+        ),
+        csv_format=CsvFormat(
+            delimiter=csv_format['delimiter'],
+            encoding=csv_format['encoding']
+        ),
+        route_type=_mapping(mappings, 'route_type'),
+        calendar_day_type=_mapping(mappings, 'calendar_day_type'),
+        calendar_exception_type=_mapping(mappings, 'calendar_exception_type'),
+        agency_id_pattern=defaults['agency_id_pattern'],
+        agency_timezone=defaults['agency_timezone'],
+        trip_id_pattern=defaults['trip_id_pattern'],
+        service_id_pattern=defaults['service_id_pattern'],
+        config=config
+    )
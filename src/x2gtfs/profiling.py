@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator
+
+@dataclass
+class Phase:
+    name: str
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    rows: int|None = None
+    peak_memory: int|None = None
+
+class Profiler:
+    """
+    Records wall time, CPU time, rows produced and peak traced memory of
+    the phases of a conversion run.
+
+    Peak memory is measured with tracemalloc and only if trace_memory is
+    set, as tracing slows down workbook loading considerably. It is the
+    highest traced memory during a phase above the memory traced when it
+    started. CPU time is the time of the whole process, so phases running
+    concurrently in threads share it.
+
+    Usage:
+        profiler = Profiler(trace_memory=True)
+        with profiler.phase("stops") as phase:
+            stops = load_stop_metadata()
+            phase.rows = len(stops)
+        print(profiler.table())
+    """
+    def __init__(self, trace_memory: bool = False):
+        """
+        Args:
+            trace_memory: Measure peak memory of each phase with tracemalloc
+        """
+        self._trace_memory: bool = trace_memory
+        self._phases: list[Phase] = []
+
+        # open phases with the traced memory at their start and their peak so far
+        self._open: dict[int, list[int]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def trace_memory(self) -> bool:
+        return self._trace_memory
+
+    @property
+    def phases(self) -> list[Phase]:
+        return self._phases
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        """
+        Measure the phase name while the context is active.
+
+        Phases can be nested, each phase is recorded with its own values.
+        Set rows of the yielded Phase to record the rows produced.
+        """
+        phase: Phase = Phase(name)
+
+        if self._trace_memory:
+            with self._lock:
+                self._update_peaks()
+                tracemalloc.reset_peak()
+
+                current, _ = tracemalloc.get_traced_memory()
+                self._open[id(phase)] = [current, current]
+
+        wall_start: float = time.perf_counter()
+        cpu_start: float = time.process_time()
+
+        try:
+            yield phase
+        finally:
+            phase.wall_time = time.perf_counter() - wall_start
+            phase.cpu_time = time.process_time() - cpu_start
+
+            if self._trace_memory:
+                with self._lock:
+                    self._update_peaks()
+
+                    start, peak = self._open.pop(id(phase))
+                    phase.peak_memory = peak - start
+
+            with self._lock:
+                self._phases.append(phase)
+
+    def add(self, phases: Iterable[Phase]) -> None:
+        """
+        Add phases measured elsewhere, such as in worker processes.
+        """
+        with self._lock:
+            self._phases.extend(phases)
+
+    def table(self) -> str:
+        """
+        Return a table of all phases in the order they were finished.
+        """
+        lines: list[str] = [f"{'phase':<40} {'wall s':>9} {'cpu s':>9} {'rows':>10} {'peak MiB':>9}"]
+        for phase in self._phases:
+            rows: str = '' if phase.rows is None else str(phase.rows)
+            peak_memory: str = '' if phase.peak_memory is None else f"{phase.peak_memory / 2**20:.1f}"
+
+            lines.append(f"{phase.name:<40} {phase.wall_time:>9.3f} {phase.cpu_time:>9.3f} {rows:>10} {peak_memory:>9}")
+
+        return '\n'.join(lines)
+
+    def write_json(self, filename: str) -> None:
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump([asdict(p) for p in self._phases], f, indent=2)
+
+    def _update_peaks(self) -> None:
+        # the traced peak is reset for every new phase, so the peak since
+        # the last reset is carried into all phases which are still open
+        _, peak = tracemalloc.get_traced_memory()
+        for values in self._open.values():
+            values[1] = max(values[1], peak)
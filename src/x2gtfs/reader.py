@@ -0,0 +1,194 @@
+import csv
+import openpyxl as xl
+import os
+
+from itertools import islice
+from openpyxl import Workbook
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.cell import coordinate_from_string
+from typing import Any, Callable, Generator, NamedTuple
+
+from x2gtfs.plan import CsvFormat
+from x2gtfs.xlsxreader import iter_xlsx_rows, xlsx_sheet_names
+
+_DEFAULT_CSV_FORMAT: CsvFormat = CsvFormat(delimiter=',', encoding='utf-8-sig')
+
+class SheetCell(NamedTuple):
+    row: int
+    column: int
+    value: Any
+
+class Sheet:
+    """
+    Plain value grid of a worksheet.
+
+    Rows and columns are 1-based like in openpyxl. Cells outside the
+    loaded data area are reported as None.
+
+    Usage:
+        sheet = load_sheet("timetable.xlsx")
+        sheet.value(1, 3)
+        sheet["C6"].value
+    """
+    def __init__(self, rows: list[tuple]):
+        # drop trailing empty rows, read-only worksheets report rows
+        # which only carry formatting as rows of None values
+        while rows and rows[-1].count(None) + rows[-1].count("") == len(rows[-1]):
+            rows.pop()
+
+        self.rows: list[tuple] = rows
+        self.max_row: int = len(rows)
+        self.max_column: int = max((len(r) for r in rows), default=0)
+
+    def value(self, row: int, column: int) -> Any:
+        """
+        Return the value at row and column or None if the cell is empty.
+        """
+        if row < 1 or row > self.max_row:
+            return None
+
+        return cell_value(self.rows[row - 1], column)
+
+    def cell(self, row: int, column: int) -> SheetCell:
+        return SheetCell(row, column, self.value(row, column))
+
+    def __getitem__(self, coordinate: str) -> SheetCell:
+        column_letter, row = coordinate_from_string(coordinate)
+        return self.cell(row, column_index_from_string(column_letter))
+
+def cell_value(row: tuple, column: int) -> Any:
+    """
+    Return the value of the 1-based column in a row tuple.
+
+    Rows read in streaming mode end at their last non-empty cell, so
+    columns beyond the tuple are treated as empty.
+    """
+    if column > len(row):
+        return None
+
+    return row[column - 1]
+
+def iter_sheet_rows(filename: str, min_row: int = 1, sheet_name: str|None = None) -> Generator[tuple, None, None]:
+    """
+    Stream the rows of a worksheet as plain value tuples.
+
+    The workbook is opened in read-only mode, so cells are parsed while
+    iterating instead of building the whole cell object graph in memory.
+
+    Args:
+        filename: Name of the .xlsx file
+        min_row: First row (1-based) to yield
+        sheet_name: Name of the worksheet, None for the active sheet
+
+    Yields:
+        Tuples of cell values, one per row
+    """
+    wb: Workbook = xl.load_workbook(filename, read_only=True, data_only=True)
+
+    try:
+        ws = wb.active if sheet_name is None else wb[sheet_name]
+
+        # do not trust the stored dimension, some writers store a wrong one
+        ws.reset_dimensions()
+
+        yield from ws.iter_rows(min_row=min_row, values_only=True)
+    finally:
+        wb.close()
+
+# engines streaming the rows of a workbook, both produce identical sheets
+SHEET_READERS: dict[str, Callable[..., Generator[tuple, None, None]]] = {
+    'openpyxl': iter_sheet_rows,
+    'fast': iter_xlsx_rows
+}
+
+def iter_csv_rows(filename: str, min_row: int = 1, sheet_name: str|None = None, csv_format: CsvFormat|None = None) -> Generator[tuple, None, None]:
+    """
+    Stream the rows of a CSV file as plain value tuples.
+
+    A CSV file is a single sheet, so sheet_name is ignored. All cells are
+    read as text, empty cells are None like empty cells of a worksheet.
+    Loaders parse numbers, dates and times given as text in workbooks the
+    same way, so a CSV export of a workbook converts into the same feed.
+
+    Args:
+        filename: Name of the .csv file
+        min_row: First row (1-based) to yield
+        sheet_name: Ignored, CSV files have no worksheets
+        csv_format: Delimiter and encoding, None for comma separated UTF-8
+
+    Yields:
+        Tuples of cell values, one per row
+    """
+    if csv_format is None:
+        csv_format = _DEFAULT_CSV_FORMAT
+
+    with open(filename, 'r', encoding=csv_format.encoding, newline='') as csvfile:
+        for row in islice(csv.reader(csvfile, delimiter=csv_format.delimiter), min_row - 1, None):
+            yield tuple([v or None for v in row])
+
+# readers of input files other than workbooks, keyed by file extension
+FILE_READERS: dict[str, Callable[..., Generator[tuple, None, None]]] = {
+    '.csv': iter_csv_rows
+}
+
+# extensions of the files in the timetable directory which are converted
+INPUT_EXTENSIONS: tuple[str, ...] = ('.xlsx', *FILE_READERS)
+
+def input_filenames(directory: str) -> list[str]:
+    """
+    Return the sorted names of the files in directory with one of the INPUT_EXTENSIONS.
+
+    Subdirectories are skipped, even if their name ends with an input extension.
+    """
+    return sorted(
+        f for f in os.listdir(directory)
+        if f.endswith(INPUT_EXTENSIONS) and os.path.isfile(os.path.join(directory, f))
+    )
+
+def is_workbook(filename: str) -> bool:
+    """
+    Return whether filename is read as workbook, not by one of FILE_READERS.
+    """
+    return os.path.splitext(filename)[1].lower() not in FILE_READERS
+
+def iter_rows(filename: str, min_row: int = 1, sheet_name: str|None = None, reader: str = 'openpyxl', csv_format: CsvFormat|None = None) -> Generator[tuple, None, None]:
+    """
+    Stream the rows of an input file with the reader for its file extension.
+
+    Args:
+        filename: Name of the workbook or CSV file
+        min_row: First row (1-based) to yield
+        sheet_name: Name of the worksheet, None for the active sheet
+        reader: Engine to read workbooks with, one of SHEET_READERS
+        csv_format: Format of CSV files, None for comma separated UTF-8
+
+    Yields:
+        Tuples of cell values, one per row
+    """
+    if is_workbook(filename):
+        return SHEET_READERS[reader](filename, min_row=min_row, sheet_name=sheet_name)
+
+    return FILE_READERS[os.path.splitext(filename)[1].lower()](filename, min_row=min_row, sheet_name=sheet_name, csv_format=csv_format)
+
+def load_sheet(filename: str, reader: str = 'openpyxl', sheet_name: str|None = None, csv_format: CsvFormat|None = None) -> Sheet:
+    """
+    Load a worksheet of a workbook or a CSV file into a Sheet.
+
+    Args:
+        filename: Name of the .xlsx or .csv file
+        reader: Engine to read workbooks with, one of SHEET_READERS
+        sheet_name: Name of the worksheet, None for the active sheet
+        csv_format: Format of CSV files, None for comma separated UTF-8
+
+    Returns:
+        Sheet containing all values of the worksheet
+    """
+    return Sheet(list(iter_rows(filename, sheet_name=sheet_name, reader=reader, csv_format=csv_format)))
+
+def sheet_names(filename: str) -> list[str]:
+    """
+    Return the names of all worksheets of a workbook in workbook order.
+
+    Only the workbook part is read, so this is cheap for large workbooks.
+    """
+    return xlsx_sheet_names(filename)
@@ -0,0 +1,340 @@
+import os
+import sqlite3
+import tempfile
+import weakref
+
+from array import array
+from dataclasses import fields
+from itertools import repeat
+from typing import Any, Generator, Iterable, Iterator
+
+from x2gtfs.models import StopTime
+from x2gtfs.times import format_time, time_to_seconds
+
+# marker for missing arrival / departure times in the time columns
+_NO_TIME = -1
+
+class StopTimeTable:
+    """
+    Columnar store for stop times.
+
+    Trip and stop indices, stop sequence and arrival / departure times are
+    kept in typed arrays. Times are stored as seconds since midnight of the
+    service day, so times past 24:00 are kept as is. Trip and stop IDs are
+    dictionary-encoded, every distinct ID is stored only once.
+
+    The table is filled with StopTime objects and can be iterated as StopTime
+    objects again, so it can be used in place of a list of stop times. Feed
+    writes it from the columns directly.
+
+    Usage:
+        table = StopTimeTable()
+        table.append(stop_time)
+        feed.add_data("stop_times.txt", table)
+    """
+    model = StopTime
+
+    # columns which can have values, all other StopTime fields are empty
+    columns: tuple[str, ...] = ('trip_id', 'arrival_time', 'departure_time', 'stop_id', 'stop_sequence')
+
+    def __init__(self, stop_times: Iterable[StopTime] = ()):
+        self._trip_index: array = array('I')
+        self._stop_index: array = array('I')
+        self._stop_sequence: array = array('I')
+        self._arrival_time: array = array('i')
+        self._departure_time: array = array('i')
+
+        self._trip_ids: list[str] = []
+        self._trip_lookup: dict[str, int] = {}
+        self._stop_ids: list[str] = []
+        self._stop_lookup: dict[str, int] = {}
+
+        self.extend(stop_times)
+
+    def append(self, stop_time: StopTime) -> None:
+        trip_idx: int|None = self._trip_lookup.get(stop_time.trip_id)
+        if trip_idx is None:
+            trip_idx = self._trip_lookup[stop_time.trip_id] = len(self._trip_ids)
+            self._trip_ids.append(stop_time.trip_id)
+
+        stop_idx: int|None = self._stop_lookup.get(stop_time.stop_id)
+        if stop_idx is None:
+            stop_idx = self._stop_lookup[stop_time.stop_id] = len(self._stop_ids)
+            self._stop_ids.append(stop_time.stop_id)
+
+        arrival_time: int|None = time_to_seconds(stop_time.arrival_time)
+        departure_time: int|None = time_to_seconds(stop_time.departure_time)
+
+        self._trip_index.append(trip_idx)
+        self._stop_index.append(stop_idx)
+        self._stop_sequence.append(stop_time.stop_sequence)
+        self._arrival_time.append(_NO_TIME if arrival_time is None else arrival_time)
+        self._departure_time.append(_NO_TIME if departure_time is None else departure_time)
+
+    def extend(self, stop_times: Iterable[StopTime]) -> None:
+        for stop_time in stop_times:
+            self.append(stop_time)
+
+    def __len__(self) -> int:
+        return len(self._trip_index)
+
+    def __iter__(self) -> Iterator[StopTime]:
+        for idx in range(len(self)):
+            yield StopTime(
+                trip_id=self._trip_ids[self._trip_index[idx]],
+                arrival_time=_format_time(self._arrival_time[idx]),
+                departure_time=_format_time(self._departure_time[idx]),
+                stop_id=self._stop_ids[self._stop_index[idx]],
+                stop_sequence=self._stop_sequence[idx]
+            )
+
+    def iter_seconds(self) -> Iterator[tuple[str, str, int, int|None, int|None]]:
+        """
+        Yield (trip_id, stop_id, stop_sequence, arrival, departure) of each row,
+        times in seconds or None if missing. The times are not formatted.
+        """
+        trip_ids: list[str] = self._trip_ids
+        stop_ids: list[str] = self._stop_ids
+
+        for trip_idx, stop_idx, stop_sequence, arrival_time, departure_time in zip(
+                self._trip_index, self._stop_index, self._stop_sequence, self._arrival_time, self._departure_time):
+            yield (
+                trip_ids[trip_idx],
+                stop_ids[stop_idx],
+                stop_sequence,
+                None if arrival_time == _NO_TIME else arrival_time,
+                None if departure_time == _NO_TIME else departure_time
+            )
+
+    def has_values(self, header: str) -> bool:
+        """
+        Return whether the column header has a value in any row.
+        """
+        if header in ('arrival_time', 'departure_time'):
+            column: array = self._arrival_time if header == 'arrival_time' else self._departure_time
+            return column.count(_NO_TIME) < len(column)
+
+        return header in self.columns and len(self) > 0
+
+    def iter_batches(self, headers: Iterable[str], batch_size: int = 1 << 16) -> Generator[Iterable[tuple], None, None]:
+        """
+        Yield the rows of the table in batches of row tuples.
+
+        Each batch is built column by column from slices of the arrays, IDs
+        and times are decoded with one map call per column.
+
+        Args:
+            headers: Columns to return in each row tuple
+            batch_size: Number of rows per batch
+        """
+        headers = tuple(headers)
+
+        for start in range(0, len(self), batch_size):
+            end: int = min(start + batch_size, len(self))
+            yield zip(*(self._column(h, start, end) for h in headers))
+
+    def _column(self, header: str, start: int, end: int) -> Iterable[Any]:
+        if header == 'trip_id':
+            return map(self._trip_ids.__getitem__, self._trip_index[start:end])
+        elif header == 'stop_id':
+            return map(self._stop_ids.__getitem__, self._stop_index[start:end])
+        elif header == 'stop_sequence':
+            return self._stop_sequence[start:end]
+        elif header == 'arrival_time':
+            return map(_format_time, self._arrival_time[start:end])
+        elif header == 'departure_time':
+            return map(_format_time, self._departure_time[start:end])
+
+        return repeat(None, end - start)
+
+def _format_time(seconds: int) -> str|None:
+    return None if seconds == _NO_TIME else format_time(seconds)
+
+
+def _remove_database(connection: sqlite3.Connection, filename: str) -> None:
+    connection.close()
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
+
+class SqliteStopTimeTable:
+    """
+    Disk-backed store for stop times in a temporary SQLite database.
+
+    Stop times are buffered and written in batches, only the current
+    batch, the trip IDs and the row count are held in memory. Times are
+    stored as seconds since midnight of the service day like in
+    StopTimeTable, all other StopTime fields are kept as they are.
+
+    The table is read back ordered by trip, in the order the trips were
+    first appended, and stop sequence. Feed streams it batch by batch, so
+    memory stays flat however many stop times the network has. The
+    database file is removed by close() or when the table is garbage
+    collected.
+
+    Usage:
+        table = SqliteStopTimeTable()
+        table.extend(stop_times)
+        feed.add_data("stop_times.txt", table)
+    """
+    model = StopTime
+
+    columns: tuple[str, ...] = tuple(f.name for f in fields(StopTime))
+
+    def __init__(self, stop_times: Iterable[StopTime] = (), directory: str|None = None, batch_size: int = 1 << 14):
+        """
+        Args:
+            stop_times: Stop times to append
+            directory: Directory of the temporary database file, None for the default temporary directory
+            batch_size: Number of stop times written and read per batch
+        """
+        fd, self._filename = tempfile.mkstemp(suffix='.sqlite', dir=directory)
+        os.close(fd)
+
+        # the database is temporary, a crash loses nothing worth a journal
+        # Feed may write the table from one of its compression threads
+        self._connection: sqlite3.Connection = sqlite3.connect(self._filename, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode = OFF')
+        self._connection.execute('PRAGMA synchronous = OFF')
+        self._connection.execute(
+            f"CREATE TABLE stop_times (trip_index INTEGER NOT NULL, {', '.join(self.columns[1:])})"
+        )
+
+        self._finalizer: weakref.finalize = weakref.finalize(self, _remove_database, self._connection, self._filename)
+
+        self._batch_size: int = batch_size
+        self._pending: list[tuple] = []
+        self._count: int = 0
+
+        self._trip_ids: list[str] = []
+        self._trip_lookup: dict[str, int] = {}
+
+        self._insert: str = f"INSERT INTO stop_times VALUES ({', '.join('?' * len(self.columns))})"
+        self._indexed: bool = False
+
+        self.extend(stop_times)
+
+    def append(self, stop_time: StopTime) -> None:
+        trip_idx: int|None = self._trip_lookup.get(stop_time.trip_id)
+        if trip_idx is None:
+            trip_idx = self._trip_lookup[stop_time.trip_id] = len(self._trip_ids)
+            self._trip_ids.append(stop_time.trip_id)
+
+        self._pending.append((
+            trip_idx,
+            time_to_seconds(stop_time.arrival_time),
+            time_to_seconds(stop_time.departure_time),
+            stop_time.stop_id,
+            stop_time.stop_sequence,
+            stop_time.stop_headsign,
+            stop_time.pickup_type,
+            stop_time.drop_off_type,
+            stop_time.shape_dist_traveled,
+            stop_time.timepoint
+        ))
+        self._count += 1
+
+        if len(self._pending) >= self._batch_size:
+            self._flush()
+
+    def extend(self, stop_times: Iterable[StopTime]) -> None:
+        for stop_time in stop_times:
+            self.append(stop_time)
+
+    def close(self) -> None:
+        """
+        Close and remove the database, the table can not be used afterwards.
+        """
+        self._finalizer()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[StopTime]:
+        for batch in self.iter_batches(self.columns):
+            for row in batch:
+                yield StopTime(*row)
+
+    def iter_seconds(self) -> Iterator[tuple[str, str, int, int|None, int|None]]:
+        """
+        Yield (trip_id, stop_id, stop_sequence, arrival, departure) of each row,
+        times in seconds or None if missing. The times are not formatted.
+        """
+        trip_ids: list[str] = self._trip_ids
+        for rows in self._iter_rows(('trip_index', 'stop_id', 'stop_sequence', 'arrival_time', 'departure_time')):
+            for trip_idx, stop_id, stop_sequence, arrival_time, departure_time in rows:
+                yield trip_ids[trip_idx], stop_id, stop_sequence, arrival_time, departure_time
+
+    def has_values(self, header: str) -> bool:
+        """
+        Return whether the column header has a value in any row.
+        """
+        if header == 'trip_id':
+            return self._count > 0
+        if header not in self.columns:
+            return False
+
+        self._flush()
+        return self._connection.execute(f"SELECT EXISTS (SELECT 1 FROM stop_times WHERE {header} IS NOT NULL)").fetchone()[0] == 1
+
+    def iter_batches(self, headers: Iterable[str]) -> Generator[Iterable[tuple], None, None]:
+        """
+        Yield the rows of the table in batches of row tuples, ordered by trip
+        and stop sequence.
+
+        Args:
+            headers: Columns to return in each row tuple
+        """
+        headers = tuple(headers)
+        selected: tuple[str, ...] = tuple(
+            'trip_index' if h == 'trip_id' else h if h in self.columns else 'NULL'
+            for h in headers
+        )
+
+        # columns needing a conversion, trip indices into IDs and seconds into times
+        converters: list[tuple[int, Any]] = [
+            (i, self._trip_ids.__getitem__) if h == 'trip_id' else (i, _format_optional_time)
+            for i, h in enumerate(headers) if h in ('trip_id', 'arrival_time', 'departure_time')
+        ]
+
+        for rows in self._iter_rows(selected):
+            if not converters:
+                yield rows
+                continue
+
+            columns: list[Iterable[Any]] = [list(c) for c in zip(*rows)]
+            for i, converter in converters:
+                columns[i] = map(converter, columns[i])
+
+            yield zip(*columns)
+
+    def _iter_rows(self, selected: tuple[str, ...]) -> Generator[list[tuple], None, None]:
+        self._flush()
+
+        # the index is built once on the first read instead of being updated by each insert,
+        # its entries end with the rowid, so reads in index order need no sort
+        if not self._indexed:
+            self._connection.execute('CREATE INDEX stop_times_order ON stop_times (trip_index, stop_sequence)')
+            self._connection.commit()
+            self._indexed = True
+
+        # rowid keeps the order of appending for stop times of a trip with the same sequence
+        cursor: sqlite3.Cursor = self._connection.execute(
+            f"SELECT {', '.join(selected)} FROM stop_times ORDER BY trip_index, stop_sequence, rowid"
+        )
+
+        try:
+            while rows := cursor.fetchmany(self._batch_size):
+                yield rows
+        finally:
+            cursor.close()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._connection.executemany(self._insert, self._pending)
+            self._connection.commit()
+            self._pending = []
+
+def _format_optional_time(seconds: int|None) -> str|None:
+    return None if seconds is None else format_time(seconds)
@@ -0,0 +1,107 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Any
+
+SECONDS_PER_DAY = 86400
+
+# a trip runs past midnight if a late evening time is followed by an early morning time
+LATE_EVENING = 18 * 3600
+EARLY_MORNING = 6 * 3600
+
+# formatted times of all whole minutes of two service days, timetables
+# rarely have seconds, so most times are formatted by a single lookup
+_MINUTE_TIMES: tuple[str, ...] = tuple(f"{m // 60:02d}:{m % 60:02d}:00" for m in range(2 * 24 * 60))
+
+def time_to_seconds(value: Any) -> int|None:
+    """
+    Convert a timetable cell value into seconds since midnight.
+
+    Args:
+        value: datetime.time, datetime.datetime, datetime.timedelta or a
+            string in the form H:MM[:SS], hours may exceed 23
+
+    Returns:
+        Seconds since midnight or None if value is empty
+    """
+    if value is None or value == "":
+        return None
+
+    return parse_time(value)
+
+@lru_cache(maxsize=1 << 16, typed=True)
+def parse_time(value: Any, time_format: str = '%H:%M:%S') -> int:
+    """
+    Parse a timetable cell value into seconds since midnight.
+
+    Results are memoised by the raw value, timetables repeat the same
+    few hundred times in thousands of cells.
+
+    Args:
+        value: datetime.time, datetime.datetime, datetime.timedelta, an
+            Excel time serial as number or a string. Strings in the form
+            H:MM[:SS] may exceed 23 hours, other strings are parsed with
+            time_format.
+        time_format: strptime format of time strings
+
+    Returns:
+        Seconds since midnight
+
+    Raises:
+        ValueError: If value can not be parsed as time
+    """
+    if isinstance(value, datetime):
+        value = value.time()
+
+    if isinstance(value, time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+
+    if isinstance(value, timedelta):
+        return int(value.total_seconds())
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value < 0:
+            raise ValueError(f"Invalid time value '{value}'.")
+
+        # number cells without time format keep the Excel serial, a fraction of a day
+        return round(value * SECONDS_PER_DAY)
+
+    text: str = str(value).strip()
+
+    parts: list[str] = text.split(':')
+    if len(parts) in (2, 3) and all(p.isdigit() for p in parts):
+        hours, minutes, seconds = (int(p) for p in parts + ['0'] * (3 - len(parts)))
+        return hours * 3600 + minutes * 60 + seconds
+
+    try:
+        parsed: datetime = datetime.strptime(text, time_format)
+    except ValueError:
+        raise ValueError(f"Invalid time value '{value}'.") from None
+
+    return parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+
+def crosses_midnight(previous_seconds: int, seconds: int) -> bool:
+    """
+    Return whether a time earlier than the previous time of a trip is on the next day.
+
+    Only a drop from the late evening to the early morning is taken as
+    midnight, other drops are typing errors in the timetable.
+    """
+    return previous_seconds % SECONDS_PER_DAY >= LATE_EVENING and seconds % SECONDS_PER_DAY < EARLY_MORNING
+
+def format_time(seconds: int|None) -> str|None:
+    """
+    Format seconds since midnight as GTFS time HH:MM:SS.
+
+    Hours are not wrapped, so times after midnight of the service day are
+    formatted as 24:00:00 and later.
+    """
+    if seconds is None:
+        return None
+
+    minutes, second = divmod(seconds, 60)
+    if second == 0 and minutes < len(_MINUTE_TIMES):
+        return _MINUTE_TIMES[minutes]
+
+    hours, minute = divmod(minutes, 60)
+
+    return f"{hours:02d}:{minute:02d}:{second:02d}"
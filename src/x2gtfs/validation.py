@@ -0,0 +1,229 @@
+from dataclasses import fields
+from typing import Any, Iterable, Iterator
+
+from x2gtfs.diagnostics import Diagnostics
+from x2gtfs.models import Stop, Route, Trip, StopTime, Calendar, CalendarDate, Frequency
+from x2gtfs.tables import StopTimeTable
+from x2gtfs.times import time_to_seconds
+
+# problems which make consumers reject the feed, all other problems are warnings
+ERROR_CODES: frozenset[str] = frozenset((
+    'unknown_trip_id',
+    'unknown_stop_id',
+    'unknown_route_id',
+    'unknown_service_id',
+    'unknown_parent_station',
+    'duplicate_stop_sequence',
+    'decreasing_stop_time',
+    'trip_without_stop_times'
+))
+
+# stop sequences below are tracked in the bitset of their trip
+_MAX_BITSET_SEQUENCE = 1 << 12
+
+def _column(model: type, name: str) -> int:
+    # 1-based column of a field, diagnostics locate problems like cells of a sheet
+    return [f.name for f in fields(model)].index(name) + 1
+
+def _stop_time_rows(stop_time_list: list[StopTime]|StopTimeTable) -> Iterator[tuple[str, str, int, int|None, int|None]]:
+    # stores keeping times in seconds provide them without formatting and parsing
+    if hasattr(stop_time_list, 'iter_seconds'):
+        return stop_time_list.iter_seconds()
+
+    return (
+        (st.trip_id, st.stop_id, st.stop_sequence, time_to_seconds(st.arrival_time), time_to_seconds(st.departure_time))
+        for st in stop_time_list
+    )
+
+def error_count(diagnostics: Diagnostics) -> int:
+    """
+    Return the number of problems in diagnostics which are errors.
+    """
+    return sum(e['count'] for e in diagnostics.entries() if e['code'] in ERROR_CODES)
+
+def validate_feed(
+        stop_list: Iterable[Stop],
+        route_list: Iterable[Route],
+        trip_list: Iterable[Trip],
+        stop_time_list: list[StopTime]|StopTimeTable,
+        calendar_list: Iterable[Calendar],
+        calendar_date_list: Iterable[CalendarDate],
+        frequency_list: Iterable[Frequency] = (),
+        diagnostics: Diagnostics|None = None) -> Diagnostics:
+    """
+    Check the references between the files of a feed and the order of the
+    stop times of each trip.
+
+    ID sets of stops, routes, trips and services are built once, then each
+    file is checked in a single pass. Stop sequences of a trip are tracked
+    as bitset, so the check runs in linear time and memory proportional to
+    the number of trips, not of stop times, for the usual small sequence
+    numbers. Stop times listed out of stop
+    sequence order are sorted per trip in a second pass over these trips
+    only.
+
+    Problems are reported with the GTFS file as filename and the 1-based
+    row (the header being row 1) and column of the offending value.
+
+    Checks:
+        - trip_id, stop_id, route_id, service_id and parent_station refer
+          to existing objects
+        - stop_sequence is unique within a trip
+        - arrival and departure times do not decrease along a trip
+        - every trip has stop times
+        - every stop, route and service is used
+
+    Args:
+        stop_list, route_list, trip_list, stop_time_list, calendar_list,
+        calendar_date_list, frequency_list: Contents of the GTFS files
+        diagnostics: Collector to report into, a new one is created if None
+
+    Returns:
+        Collector with all problems found, see error_count for the number of errors
+    """
+    if diagnostics is None:
+        diagnostics = Diagnostics()
+
+    stop_ids: set[str] = set()
+    parent_stations: list[tuple[int, str]] = []
+    for row, stop in enumerate(stop_list, start=2):
+        stop_ids.add(stop.stop_id)
+        if stop.parent_station is not None:
+            parent_stations.append((row, stop.parent_station))
+
+    for row, parent_station in parent_stations:
+        if parent_station not in stop_ids:
+            diagnostics.report('unknown_parent_station', parent_station, 'stops.txt', row, _column(Stop, 'parent_station'))
+
+    route_ids: dict[str, None] = dict.fromkeys(r.route_id for r in route_list)
+    # service_id -> file and row defining the service, services of calendar.txt may have exceptions in calendar_dates.txt
+    service_ids: dict[str, tuple[str, int, int]] = {}
+    for row, calendar in enumerate(calendar_list, start=2):
+        service_ids.setdefault(calendar.service_id, ('calendar.txt', row, _column(Calendar, 'service_id')))
+    for row, calendar_date in enumerate(calendar_date_list, start=2):
+        service_ids.setdefault(calendar_date.service_id, ('calendar_dates.txt', row, _column(CalendarDate, 'service_id')))
+
+    # trip_id -> bitset of the stop sequences seen so far, sequences too
+    # large for a bitset are kept as (trip_id, stop_sequence) in a set
+    trip_sequences: dict[str, int] = {}
+    large_sequences: set[tuple[str, int]] = set()
+    used_route_ids: set[str] = set()
+    used_service_ids: set[str] = set()
+
+    route_column: int = _column(Trip, 'route_id')
+    service_column: int = _column(Trip, 'service_id')
+    for row, trip in enumerate(trip_list, start=2):
+        trip_sequences[trip.trip_id] = 0
+
+        used_route_ids.add(trip.route_id)
+        if trip.route_id not in route_ids:
+            diagnostics.report('unknown_route_id', trip.route_id, 'trips.txt', row, route_column)
+
+        used_service_ids.add(trip.service_id)
+        if trip.service_id not in service_ids:
+            diagnostics.report('unknown_service_id', trip.service_id, 'trips.txt', row, service_column)
+
+    # trip_id -> (stop sequence, time) of the previous stop time with a time
+    previous_times: dict[str, tuple[int, int]] = {}
+    unordered_trip_ids: set[str] = set()
+    decreasing_trip_ids: set[str] = set()
+    used_stop_ids: set[str] = set()
+
+    trip_column: int = _column(StopTime, 'trip_id')
+    stop_column: int = _column(StopTime, 'stop_id')
+    sequence_column: int = _column(StopTime, 'stop_sequence')
+    arrival_column: int = _column(StopTime, 'arrival_time')
+
+    for row, (trip_id, stop_id, stop_sequence, arrival_time, departure_time) in enumerate(_stop_time_rows(stop_time_list), start=2):
+        sequences: int|None = trip_sequences.get(trip_id)
+        if sequences is None:
+            diagnostics.report('unknown_trip_id', trip_id, 'stop_times.txt', row, trip_column)
+
+        used_stop_ids.add(stop_id)
+        if stop_id not in stop_ids:
+            diagnostics.report('unknown_stop_id', stop_id, 'stop_times.txt', row, stop_column)
+
+        if sequences is not None and 0 <= stop_sequence < _MAX_BITSET_SEQUENCE:
+            bit: int = 1 << stop_sequence
+            if sequences & bit:
+                diagnostics.report('duplicate_stop_sequence', trip_id, 'stop_times.txt', row, sequence_column)
+            trip_sequences[trip_id] = sequences | bit
+        elif sequences is not None:
+            if (trip_id, stop_sequence) in large_sequences:
+                diagnostics.report('duplicate_stop_sequence', trip_id, 'stop_times.txt', row, sequence_column)
+            large_sequences.add((trip_id, stop_sequence))
+
+        if trip_id in unordered_trip_ids:
+            continue
+
+        # times are compared in stop sequence order, which stop times usually are listed in
+        previous: tuple[int, int]|None = previous_times.get(trip_id)
+        if previous is not None and stop_sequence < previous[0]:
+            unordered_trip_ids.add(trip_id)
+            continue
+
+        for seconds in (arrival_time, departure_time):
+            if seconds is None:
+                continue
+
+            if previous is not None and seconds < previous[1]:
+                diagnostics.report('decreasing_stop_time', trip_id, 'stop_times.txt', row, arrival_column)
+                decreasing_trip_ids.add(trip_id)
+                break
+
+            previous = (stop_sequence, seconds)
+
+        if previous is not None:
+            previous_times[trip_id] = previous
+
+    # trips already reported with decreasing times are not checked again
+    unordered_trip_ids -= decreasing_trip_ids
+    if unordered_trip_ids:
+        _validate_unordered_times(stop_time_list, unordered_trip_ids, diagnostics, arrival_column)
+
+    frequency_column: int = _column(Frequency, 'trip_id')
+    for row, frequency in enumerate(frequency_list, start=2):
+        if frequency.trip_id not in trip_sequences:
+            diagnostics.report('unknown_trip_id', frequency.trip_id, 'frequencies.txt', row, frequency_column)
+
+    trip_ids_with_large_sequences: set[str] = {t for t, _ in large_sequences}
+    for trip_id, sequences in trip_sequences.items():
+        if not sequences and trip_id not in trip_ids_with_large_sequences:
+            diagnostics.report('trip_without_stop_times', trip_id, 'trips.txt')
+
+    used_stop_ids.update(s for _, s in parent_stations)
+    for stop_id in stop_ids - used_stop_ids:
+        diagnostics.report('unused_stop', stop_id, 'stops.txt')
+
+    for route_id in route_ids:
+        if route_id not in used_route_ids:
+            diagnostics.report('unused_route', route_id, 'routes.txt')
+
+    for service_id, (filename, row, column) in service_ids.items():
+        if service_id not in used_service_ids:
+            diagnostics.report('unused_service', service_id, filename, row, column)
+
+    return diagnostics
+
+def _validate_unordered_times(
+        stop_time_list: list[StopTime]|StopTimeTable,
+        trip_ids: set[str],
+        diagnostics: Diagnostics,
+        column: int) -> None:
+    """
+    Check the times of trips with stop times out of stop sequence order.
+    """
+    trip_times: dict[str, list[tuple[int, int, int|None, int|None]]] = {}
+    for row, (trip_id, _, stop_sequence, arrival_time, departure_time) in enumerate(_stop_time_rows(stop_time_list), start=2):
+        if trip_id in trip_ids:
+            trip_times.setdefault(trip_id, []).append((stop_sequence, row, arrival_time, departure_time))
+
+    for trip_id, times in trip_times.items():
+        previous_seconds: int = -1
+        for _, row, arrival_time, departure_time in sorted(times):
+            times_of_stop: list[Any] = [t for t in (arrival_time, departure_time) if t is not None]
+            if any(t < previous_seconds for t in times_of_stop):
+                diagnostics.report('decreasing_stop_time', trip_id, 'stop_times.txt', row, column)
+                break
+
+            previous_seconds = max(times_of_stop, default=previous_seconds)
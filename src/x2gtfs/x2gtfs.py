@@ -1,312 +1,524 @@
+import fnmatch
+import hashlib
 import logging
-import openpyxl as xl
 import os
+import pickle
+import tracemalloc
 
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
-from openpyxl.utils import column_index_from_string
+from functools import partial
+from typing import Any, Iterator, Mapping
 
+from x2gtfs.cache import Cache
 from x2gtfs.config import Configuration
+from x2gtfs.diagnostics import Diagnostics
+from x2gtfs.patterns import PatternIndex, StopPattern
+from x2gtfs.profiling import Phase, Profiler
 
+from x2gtfs.plan import ConversionPlan, StopsPlan, CalendarsPlan, CalendarExceptionsPlan, RoutesPlan, TimetablesPlan
 from x2gtfs.models import Stop, Calendar, CalendarDate, Agency, Route, Trip, StopTime
 from x2gtfs.iterator import iter_data_vertical, iter_data_horizontal
+from x2gtfs.reader import Sheet, cell_value, input_filenames, is_workbook, iter_rows, load_sheet, sheet_names
+from x2gtfs.tables import SqliteStopTimeTable, StopTimeTable
+from x2gtfs.times import SECONDS_PER_DAY, crosses_midnight, format_time, parse_time
+
+# containers process_timetable_files can collect stop times in
+STOP_TIME_STORES: dict[str, type] = {
+    'objects': list,
+    'columnar': StopTimeTable,
+    'sqlite': SqliteStopTimeTable
+}
 
 def _parse_datetime(date_str: str, date_format: str) -> datetime:
     dt: datetime = datetime.strptime(date_str, date_format)
 
     return dt
 
-def load_stop_metadata() -> dict[str, Stop]:
-    stop_result_list: dict[str, Stop] = {}
-    
-    wb: Workbook = xl.load_workbook(
-        os.path.join(Configuration.config.metadata.stops.input_filename), 
-        data_only=True
+def _metadata_cache_key(cache: Cache, plan: ConversionPlan, name: str, *sections: str) -> str:
+    return cache.key(
+        name,
+        [cache.file_digest(plan.section('config', 'metadata', s, 'input_filename')) for s in sections],
+        [plan.section('config', 'metadata', s) for s in sections],
+        plan.section('config', 'csv'),
+        plan.section('config', 'defaults'),
+        plan.section('config', 'mappings')
     )
 
-    ws: Worksheet = wb.active
+def _format_date(value: str|datetime, date_format: str) -> str:
+    if isinstance(value, datetime):
+        return value.strftime('%Y%m%d')
 
-    stop_identification_col_idx: int = column_index_from_string(Configuration.config.metadata.stops.stop_identification_index)
-    stop_id_col_idx: int = column_index_from_string(Configuration.config.metadata.stops.stop_id_index)
-    stop_name_col_idx: int = column_index_from_string(Configuration.config.metadata.stops.stop_name_index)
-    stop_lat_col_idx: int = column_index_from_string(Configuration.config.metadata.stops.stop_lat_index)
-    stop_lon_col_idx: int = column_index_from_string(Configuration.config.metadata.stops.stop_lon_index)
-    
-    current_row: int = 2
-    while True:
-        stop_identification_cell = ws.cell(row=current_row, column=stop_identification_col_idx)
-        if stop_identification_cell.value is None:
+    return _parse_datetime(value, date_format).strftime('%Y%m%d')
+
+def load_stop_metadata(cache: Cache|None = None, conversion_plan: ConversionPlan|None = None) -> dict[str, Stop]:
+    # without a plan of the caller, the applied Configuration is used
+    if conversion_plan is None:
+        conversion_plan = Configuration.plan
+
+    if cache is not None:
+        return cache.get_or_create(_metadata_cache_key(cache, conversion_plan, 'stops', 'stops'), partial(load_stop_metadata, conversion_plan=conversion_plan))
+
+    stop_result_list: dict[str, Stop] = {}
+
+    plan: StopsPlan = conversion_plan.stops
+
+    for row in iter_rows(os.path.join(plan.input_filename), min_row=2, csv_format=conversion_plan.csv_format):
+        stop_identification: str = cell_value(row, plan.stop_identification_col)
+        if stop_identification is None:
             break
         
         stop = Stop()
-        stop.stop_id = str(ws.cell(row=current_row, column=stop_id_col_idx).value)
-        stop.stop_name = ws.cell(row=current_row, column=stop_name_col_idx).value
-        stop.stop_lat = float(ws.cell(row=current_row, column=stop_lat_col_idx).value)
-        stop.stop_lon = float(ws.cell(row=current_row, column=stop_lon_col_idx).value)
-
-        stop_result_list[stop_identification_cell.value] = stop
+        stop.stop_id = str(cell_value(row, plan.stop_id_col))
+        stop.stop_name = cell_value(row, plan.stop_name_col)
+        stop.stop_lat = float(cell_value(row, plan.stop_lat_col))
+        stop.stop_lon = float(cell_value(row, plan.stop_lon_col))
 
-        current_row += 1
+        stop_result_list[stop_identification] = stop
 
     return stop_result_list
 
-def load_calendar_metadata() -> tuple[dict[str, Calendar], dict[str, list[CalendarDate]]]:
+def load_calendar_metadata(cache: Cache|None = None, conversion_plan: ConversionPlan|None = None) -> tuple[dict[str, Calendar], dict[str, list[CalendarDate]]]:
+    if conversion_plan is None:
+        conversion_plan = Configuration.plan
+
+    if cache is not None:
+        return cache.get_or_create(
+            _metadata_cache_key(cache, conversion_plan, 'calendars', 'calendars', 'calendar_exceptions'),
+            partial(load_calendar_metadata, conversion_plan=conversion_plan)
+        )
+
     calendar_result_list: dict[str, Calendar] = {}
     calendar_date_result_list: dict[str, list[CalendarDate]] = {}
 
-    wb: Workbook = xl.load_workbook(
-        os.path.join(Configuration.config.metadata.calendars.input_filename), 
-        data_only=True
-    )
+    plan: CalendarsPlan = conversion_plan.calendars
+    day_type: Mapping[Any, int] = conversion_plan.calendar_day_type
 
-    ws: Worksheet = wb.active
-
-    service_identification_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.service_identification_index)
-    monday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.monday_index)
-    tuesday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.tuesday_index)
-    wednesday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.wednesday_index) 
-    thursday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.thursday_index)
-    friday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.friday_index)
-    saturday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.saturday_index)
-    sunday_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.sunday_index)
-    start_date_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.start_date_index)
-    end_date_col_idx: int = column_index_from_string(Configuration.config.metadata.calendars.end_date_index)
-
-    current_row: int = 2
-    while True:
+    for row in iter_rows(os.path.join(plan.input_filename), min_row=2, csv_format=conversion_plan.csv_format):
         calendar: Calendar = Calendar()
-        service_identification_cell = ws.cell(row=current_row, column=service_identification_col_idx)
-        if service_identification_cell.value is None:
+        service_identification: str = cell_value(row, plan.service_identification_col)
+        if service_identification is None:
             break
 
-        calendar.service_id = Configuration.config.defaults.service_id_pattern.format(service_id=len(calendar_result_list) + 1)
-        calendar.monday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=monday_col_idx).value, 0)
-        calendar.tuesday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=tuesday_col_idx).value, 0)
-        calendar.wednesday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=wednesday_col_idx).value, 0)
-        calendar.thursday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=thursday_col_idx).value, 0)
-        calendar.friday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=friday_col_idx).value, 0)
-        calendar.saturday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=saturday_col_idx).value, 0)
-        calendar.sunday = Configuration.config.mappings.calendar_day_type.dict().get(ws.cell(row=current_row, column=sunday_col_idx).value, 0)
-
-        start_date_value: str|datetime = ws.cell(row=current_row, column=start_date_col_idx).value
-        if isinstance(start_date_value, datetime):
-            calendar.start_date = start_date_value.strftime('%Y%m%d')
-        else:
-            calendar.start_date = _parse_datetime(  
-                start_date_value,
-                Configuration.config.metadata.calendars.date_format
-            ).strftime('%Y%m%d')
-
-        end_date_value: str|datetime = ws.cell(row=current_row, column=end_date_col_idx).value
-        if isinstance(end_date_value, datetime):
-            calendar.end_date = end_date_value.strftime('%Y%m%d')
-        else:
-            calendar.end_date = _parse_datetime(  
-                end_date_value,
-                Configuration.config.metadata.calendars.date_format
-            ).strftime('%Y%m%d')
+        calendar.service_id = conversion_plan.service_id(len(calendar_result_list) + 1)
+        (
+            calendar.monday,
+            calendar.tuesday,
+            calendar.wednesday,
+            calendar.thursday,
+            calendar.friday,
+            calendar.saturday,
+            calendar.sunday
+        ) = (day_type.get(cell_value(row, col_idx), 0) for col_idx in plan.weekday_cols)
 
-        calendar_result_list[service_identification_cell.value] = calendar
+        calendar.start_date = _format_date(cell_value(row, plan.start_date_col), plan.date_format)
+        calendar.end_date = _format_date(cell_value(row, plan.end_date_col), plan.date_format)
 
-        current_row += 1
+        calendar_result_list[service_identification] = calendar
 
-    wb: Workbook = xl.load_workbook(
-        os.path.join(Configuration.config.metadata.calendar_exceptions.input_filename), 
-        data_only=True
-    )
+    exception_plan: CalendarExceptionsPlan = conversion_plan.calendar_exceptions
+    exception_type: Mapping[Any, int] = conversion_plan.calendar_exception_type
 
-    ws: Worksheet = wb.active
-
-    service_identification_col_idx: int = column_index_from_string(Configuration.config.metadata.calendar_exceptions.service_identification_index)
-    date_col_idx: int = column_index_from_string(Configuration.config.metadata.calendar_exceptions.date_index)
-    exception_type_col_idx: int = column_index_from_string(Configuration.config.metadata.calendar_exceptions.exception_type_index)
-
-    current_row: int = 2
-    while True:
+    for row in iter_rows(os.path.join(exception_plan.input_filename), min_row=2, csv_format=conversion_plan.csv_format):
         calendar_date: CalendarDate = CalendarDate()
-        service_identification_cell = ws.cell(row=current_row, column=service_identification_col_idx)
-        if service_identification_cell.value is None:
+        service_identification: str = cell_value(row, exception_plan.service_identification_col)
+        if service_identification is None:
             break
 
-        if service_identification_cell.value not in calendar_result_list:
+        if service_identification not in calendar_result_list:
             continue
 
-        calendar_date.service_id = calendar_result_list[service_identification_cell.value].service_id
-        
-        date_value: str|datetime = ws.cell(row=current_row, column=date_col_idx).value
-        if isinstance(date_value, datetime):
-            calendar_date.date = date_value.strftime('%Y%m%d')
-        else:
-            calendar_date.date = _parse_datetime(  
-                date_value,
-                Configuration.config.metadata.calendar_exceptions.date_format
-            ).strftime('%Y%m%d')
-
-        calendar_date.exception_type = Configuration.config.mappings.calendar_exception_type.dict().get(
-            ws.cell(row=current_row, column=exception_type_col_idx).value,
-            1
-        )
+        calendar_date.service_id = calendar_result_list[service_identification].service_id
+        calendar_date.date = _format_date(cell_value(row, exception_plan.date_col), exception_plan.date_format)
+        calendar_date.exception_type = exception_type.get(cell_value(row, exception_plan.exception_type_col), 1)
 
-        if service_identification_cell.value not in calendar_date_result_list:
-            calendar_date_result_list[service_identification_cell.value] = []
+        if service_identification not in calendar_date_result_list:
+            calendar_date_result_list[service_identification] = []
 
-        calendar_date_result_list[service_identification_cell.value].append(calendar_date)
-
-        current_row += 1
+        calendar_date_result_list[service_identification].append(calendar_date)
 
     return calendar_result_list, calendar_date_result_list
 
-def load_agency_and_route_metadata() -> tuple[dict[str, Agency], dict[str, Route]]:
+def load_agency_and_route_metadata(cache: Cache|None = None, conversion_plan: ConversionPlan|None = None) -> tuple[dict[str, Agency], dict[str, Route]]:
+    if conversion_plan is None:
+        conversion_plan = Configuration.plan
+
+    if cache is not None:
+        return cache.get_or_create(_metadata_cache_key(cache, conversion_plan, 'routes', 'routes'), partial(load_agency_and_route_metadata, conversion_plan=conversion_plan))
+
     agency_result_list: dict[str, Agency] = {}
     route_result_list: dict[str, Route] = {}
 
-    wb: Workbook = xl.load_workbook(
-        os.path.join(Configuration.config.metadata.routes.input_filename), 
-        data_only=True
-    )
+    plan: RoutesPlan = conversion_plan.routes
+    route_type: Mapping[Any, int] = conversion_plan.route_type
 
-    ws: Worksheet = wb.active
-
-    route_identification_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_identification_index)
-    route_id_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_id_index)
-    route_short_name_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_short_name_index)
-    route_long_name_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_long_name_index)
-    route_type_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_type_index)
-    route_color_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_color_index)
-    route_text_color_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.route_text_color_index)
-    agency_name_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.agency_name_index)
-    agency_url_col_idx: int = column_index_from_string(Configuration.config.metadata.routes.agency_url_index)
-
-    current_row: int = 2
-    while True:
-        route_identification_cell = ws.cell(row=current_row, column=route_identification_col_idx)
-        if route_identification_cell.value is None:
+    for row in iter_rows(os.path.join(plan.input_filename), min_row=2, csv_format=conversion_plan.csv_format):
+        route_identification: str = cell_value(row, plan.route_identification_col)
+        if route_identification is None:
             break
         
         route = Route()
-        route.route_id = str(ws.cell(row=current_row, column=route_id_col_idx).value)
-        route.route_short_name = ws.cell(row=current_row, column=route_short_name_col_idx).value
-        route.route_long_name = ws.cell(row=current_row, column=route_long_name_col_idx).value
-        
-        if ws.cell(row=current_row, column=route_type_col_idx).value in Configuration.config.mappings.route_type.dict().keys():
-            route.route_type = Configuration.config.mappings.route_type.dict()[ws.cell(row=current_row, column=route_type_col_idx).value]
-        else:
-            route.route_type = 3
+        route.route_id = str(cell_value(row, plan.route_id_col))
+        route.route_short_name = cell_value(row, plan.route_short_name_col)
+        route.route_long_name = cell_value(row, plan.route_long_name_col)
+        route.route_type = route_type.get(cell_value(row, plan.route_type_col), 3)
+        route.route_color = cell_value(row, plan.route_color_col)
+        route.route_text_color = cell_value(row, plan.route_text_color_col)
+
+        route_result_list[route_identification] = route
+
+        # agencies are keyed by their name, later routes of an operator share its agency_id
+        agency_name: str = cell_value(row, plan.agency_name_col)
+        if agency_name not in agency_result_list.keys():
+            agency = Agency()
+            agency.agency_id = conversion_plan.agency_id(len(agency_result_list) + 1)
+            agency.agency_name = agency_name
+            agency.agency_url = cell_value(row, plan.agency_url_col)
+            agency.agency_timezone = conversion_plan.agency_timezone
 
-        route.route_color = ws.cell(row=current_row, column=route_color_col_idx).value
-        route.route_text_color = ws.cell(row=current_row, column=route_text_color_col_idx).value
+            agency_result_list[agency_name] = agency
 
-        route_result_list[route_identification_cell.value] = route
+        route.agency_id = agency_result_list[agency_name].agency_id
 
-        if ws.cell(row=current_row, column=agency_name_col_idx).value not in agency_result_list.keys():
-            agency = Agency()
-            agency.agency_id = Configuration.config.defaults.agency_id_pattern.format(agency_id=len(agency_result_list) + 1)
-            agency.agency_name = ws.cell(row=current_row, column=agency_name_col_idx).value
-            agency.agency_url = ws.cell(row=current_row, column=agency_url_col_idx).value
-            agency.agency_timezone = Configuration.config.defaults.agency_timezone
+    return agency_result_list, route_result_list
+
+_worker_arguments: tuple = ()
+
+def _init_timetable_worker(trace_memory: bool, *arguments) -> None:
+    global _worker_arguments
+
+    # the plan is part of the arguments, workers do not read the applied Configuration
+    _worker_arguments = arguments
 
-            route.agency_id = agency.agency_id
+    if trace_memory:
+        tracemalloc.start()
 
-            agency_result_list[route_identification_cell.value] = agency
+def _process_timetable_file_worker(unit: tuple[str, str|None]) -> tuple[list[tuple[Trip, list[StopTime]]], Diagnostics, list[Phase]]:
+    return _profile_timetable_file(unit, *_worker_arguments)
+
+def _unit_name(unit: tuple[str, str|None]) -> str:
+    input_filename, sheet_name = unit
+    return input_filename if sheet_name is None else f"{input_filename}[{sheet_name}]"
+
+def _timetable_units(input_directory: str, filenames: list[str], sheet_name_pattern: str|None) -> list[tuple[str, str|None]]:
+    """
+    Return the work units of the timetable stage as (filename, sheet name).
+
+    Without a sheet name pattern each file is one unit of its active sheet,
+    otherwise each matching worksheet is a unit of its own. Files without
+    worksheets, such as CSV files, are always a single unit. Units are
+    ordered by filename and by the order of the sheets in the workbook.
+    """
+    if sheet_name_pattern is None:
+        return [(f, None) for f in filenames]
+
+    units: list[tuple[str, str|None]] = []
+    for input_filename in filenames:
+        if not is_workbook(input_filename):
+            units.append((input_filename, None))
+            continue
+
+        for sheet_name in sheet_names(os.path.join(input_directory, input_filename)):
+            if fnmatch.fnmatchcase(sheet_name, sheet_name_pattern):
+                units.append((input_filename, sheet_name))
+
+    return units
+
+def _profile_timetable_file(unit: tuple[str, str|None], reader: str, conversion_plan: ConversionPlan, *metadata) -> tuple[list[tuple[Trip, list[StopTime]]], Diagnostics, list[Phase]]:
+    # units are measured in the process parsing them, workers return their phases with the result
+    profiler: Profiler = Profiler(trace_memory=tracemalloc.is_tracing())
+    with profiler.phase(f"timetable {_unit_name(unit)}") as phase:
+        trip_result_list, diagnostics = _process_timetable_file(unit[0], *metadata, reader=reader, sheet_name=unit[1], conversion_plan=conversion_plan)
+        phase.rows = sum(len(stop_time_list) for _, stop_time_list in trip_result_list)
+
+    return trip_result_list, diagnostics, profiler.phases
+
+def _process_timetable_file(
+        input_filename: str,
+        stop_meta_list: dict[str, Stop],
+        calendar_meta_list: dict[str, Calendar], 
+        calendar_exception_meta_list: dict[str, list[CalendarDate]], 
+        route_meta_list: dict[str, Route],
+        reader: str = 'openpyxl',
+        sheet_name: str|None = None,
+        conversion_plan: ConversionPlan|None = None) -> tuple[list[tuple[Trip, list[StopTime]]], Diagnostics]:
+    
+    if conversion_plan is None:
+        conversion_plan = Configuration.plan
+
+    unit_name: str = _unit_name((input_filename, sheet_name))
+    logging.info(f"Processing file: {unit_name}")
+
+    # problems are collected per file and merged into the diagnostics of the run
+    diagnostics: Diagnostics = Diagnostics()
+
+    # plan values are bound to locals once, the loop below runs for every cell
+    plan: TimetablesPlan = conversion_plan.timetables
+    run_through_char: str = plan.run_through_char
+    stop_identification_col: int = plan.stop_identification_col
+    time_format: str = plan.time_format
+
+    ws: Sheet = load_sheet(os.path.join(plan.input_directory, input_filename), reader, sheet_name, conversion_plan.csv_format)
+    value = ws.value
+
+    trip_result_list: list[tuple[Trip, list[StopTime]]] = []
+
+    current_trip_idx: int = -1
+    current_stop_idx: str|None = None
+
+    current_trip: Trip|None = None
+    current_stop_time: StopTime|None = None
+    current_stop_time_list: list[StopTime] = []
+    current_stop_sequence: int = 0
+
+    # times of a trip never go backwards, a smaller time than the previous
+    # one continues on the next day and is counted past 24:00:00
+    current_day_offset: int = 0
+    previous_seconds: int = -1
+
+    if plan.layout_type == 'vertical':
+        for cell in iter_data_vertical(ws, ws.cell(plan.data_start_row, plan.data_start_col)):
+            if cell.value == run_through_char:
+                continue
+
+            if not cell.column == current_trip_idx:
+                if current_trip is not None:
+                    trip_result_list.append((current_trip, current_stop_time_list))
+
+                current_trip = Trip()
+                current_stop_time_list = []
+
+                route_idx: str = value(plan.route_identification_row, cell.column)
+                if route_idx in route_meta_list:
+                    current_trip.route_id = route_meta_list[route_idx].route_id
+                else:
+                    diagnostics.report('unknown_route', route_idx, unit_name, plan.route_identification_row, cell.column)
+                    current_trip.route_id = route_idx
+
+                service_idx: str = value(plan.service_identification_row, cell.column)
+                if service_idx in calendar_meta_list:
+                    current_trip.service_id = calendar_meta_list[service_idx].service_id
+                elif service_idx in calendar_exception_meta_list:
+                    current_trip.service_id = calendar_exception_meta_list[service_idx][0].service_id
+                else:
+                    diagnostics.report('unknown_service', service_idx, unit_name, plan.service_identification_row, cell.column)
+                    current_trip.service_id = service_idx
+
+                shape_idx: str = value(plan.shape_identification_row, cell.column)
+
+                current_trip.trip_short_name = value(plan.trip_short_name_row, cell.column)
+                current_trip.trip_headsign = value(plan.trip_headsign_row, cell.column)
+
+                current_trip_idx = cell.column
+
+                # stop sequence and arrival / departure merging are tracked per trip
+                current_stop_idx = None
+                current_stop_sequence = 0
+                current_day_offset = 0
+                previous_seconds = -1
+
+            try:
+                seconds: int = parse_time(cell.value, time_format) + current_day_offset
+            except ValueError:
+                diagnostics.report('invalid_time', cell.value, unit_name, cell.row, cell.column)
+                continue
+
+            if seconds < previous_seconds:
+                if crosses_midnight(previous_seconds, seconds):
+                    current_day_offset += SECONDS_PER_DAY
+                    seconds += SECONDS_PER_DAY
+                else:
+                    diagnostics.report('decreasing_time', cell.value, unit_name, cell.row, cell.column)
+
+            previous_seconds = seconds
+            formatted_time: str = format_time(seconds)
+
+            stop_idx: str = value(cell.row, stop_identification_col)
+            if not stop_idx == current_stop_idx:
+                current_stop_time = StopTime()
+
+                if stop_idx in stop_meta_list:
+                    current_stop_time.stop_id = stop_meta_list[stop_idx].stop_id
+                else:
+                    diagnostics.report('unknown_stop', stop_idx, unit_name, cell.row, cell.column)
+                    current_stop_time.stop_id = stop_idx
+
+                current_stop_sequence += 1
+                current_stop_time.stop_sequence = current_stop_sequence
+                current_stop_time.arrival_time = formatted_time
+                current_stop_time.departure_time = formatted_time
+
+                current_stop_time_list.append(current_stop_time)
+                current_stop_idx = stop_idx
+            else:
+                # same stop in consecutive rows, second value is the departure time
+                current_stop_time.departure_time = formatted_time
+
+        if current_trip is not None:
+            trip_result_list.append((current_trip, current_stop_time_list))
+
+    else:
+        raise NotImplementedError("Only 'vertical' layout type is currently implemented.")
+
+    return trip_result_list, diagnostics
+
+def _unit_results(
+        units: list[tuple[str, str|None]],
+        pending_units: list[tuple[str, str|None]],
+        parsed_results: Iterator[tuple[list[tuple[Trip, list[StopTime]]], Diagnostics, list[Phase]]],
+        cache: Cache|None,
+        cache_keys: dict[tuple[str, str|None], str],
+        arguments: tuple,
+        profiler: Profiler) -> Iterator[tuple[list[tuple[Trip, list[StopTime]]], Diagnostics]]:
+
+    pending: set[tuple[str, str|None]] = set(pending_units)
+    for unit in units:
+        if unit in pending:
+            trip_result_list, diagnostics, phases = next(parsed_results)
+            unit_result: tuple[list[tuple[Trip, list[StopTime]]], Diagnostics] = (trip_result_list, diagnostics)
+            profiler.add(phases)
+
+            if cache is not None:
+                cache.put(cache_keys[unit], unit_result)
         else:
-            route.agency_id = agency_result_list[ws.cell(row=current_row, column=agency_name_col_idx).value].agency_id
+            logging.info(f"Loading cached result of file: {_unit_name(unit)}")
+            with profiler.phase(f"timetable {_unit_name(unit)} (cached)") as phase:
+                unit_result = cache.get(cache_keys[unit])
+                if unit_result is not None:
+                    phase.rows = sum(len(stop_time_list) for _, stop_time_list in unit_result[0])
 
-        current_row += 1
+            if unit_result is None:
+                # entry vanished since it was checked, parse the unit again
+                trip_result_list, diagnostics, phases = _profile_timetable_file(unit, *arguments)
+                unit_result = (trip_result_list, diagnostics)
+                profiler.add(phases)
 
-    return agency_result_list, route_result_list
+        yield unit_result
 
 def process_timetable_files(
         stop_meta_list: dict[str, Stop],
         calendar_meta_list: dict[str, Calendar], 
         calendar_exception_meta_list: dict[str, list[CalendarDate]], 
         agency_meta_list: dict[str, Agency],
-        route_meta_list: dict[str, Route]) -> tuple[list[Trip], list[StopTime]]:
+        route_meta_list: dict[str, Route],
+        jobs: int = 1,
+        stop_time_store: str = 'objects',
+        cache: Cache|None = None,
+        diagnostics: Diagnostics|None = None,
+        profiler: Profiler|None = None,
+        reader: str = 'openpyxl',
+        patterns: PatternIndex|None = None,
+        drop_duplicate_trips: bool = False,
+        conversion_plan: ConversionPlan|None = None) -> tuple[list[Trip], list[StopTime]|StopTimeTable]:
     
     trip_result_list: list[Trip] = []
-    stop_time_result_list: list[StopTime] = []
-
-    for input_filename in os.listdir(Configuration.config.timetables.input_directory):
-        if input_filename.endswith('.xlsx'):
-            logging.info(f"Processing file: {input_filename}")
-            wb: Workbook = xl.load_workbook(
-                os.path.join(Configuration.config.timetables.input_directory, input_filename), 
-                data_only=True
+    stop_time_result_list: list[StopTime]|StopTimeTable = STOP_TIME_STORES[stop_time_store]()
+
+    plan: ConversionPlan = conversion_plan if conversion_plan is not None else Configuration.plan
+    input_directory: str = plan.timetables.input_directory
+
+    # every matching worksheet is parsed as a unit of its own
+    units: list[tuple[str, str|None]] = _timetable_units(input_directory, input_filenames(input_directory), plan.timetables.sheet_name_pattern)
+
+    metadata: tuple = (stop_meta_list, calendar_meta_list, calendar_exception_meta_list, route_meta_list)
+
+    # both readers produce identical sheets, so the reader is not part of the cache keys
+    arguments: tuple = (reader, plan, *metadata)
+
+    # without a collector of the caller, each distinct problem is logged once
+    run_diagnostics: Diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+    run_profiler: Profiler = profiler if profiler is not None else Profiler()
+
+    # results of worker processes carry their own copies of each identifier,
+    # share one object per distinct value across all stop times instead
+    interned_ids: dict[Any, Any] = {}
+
+    # trips share one pattern object per distinct stop sequence, a caller
+    # passing its own index can look up the trips of each pattern later
+    run_patterns: PatternIndex = patterns if patterns is not None else PatternIndex()
+
+    # (route, service, pattern, times) -> first trip with these
+    trip_keys: dict[tuple, Trip] = {}
+
+    # cached results are keyed by file content, sheet, timetable configuration
+    # and the metadata used for resolving IDs, the trip IDs are not part of them
+    cache_keys: dict[tuple[str, str|None], str] = {}
+    if cache is not None:
+        metadata_digest: str = hashlib.sha256(pickle.dumps(metadata)).hexdigest()
+        for unit in units:
+            cache_keys[unit] = cache.key(
+                'timetable',
+                cache.file_digest(os.path.join(input_directory, unit[0])),
+                unit[1],
+                plan.section('config', 'timetables'),
+                plan.section('config', 'csv'),
+                plan.section('config', 'defaults'),
+                metadata_digest
             )
 
-            ws: Worksheet = wb.active
-
-            current_trip_idx: int = -1
-            current_stop_idx: str|None = None
+    pending_units: list[tuple[str, str|None]] = [u for u in units if u not in cache_keys or not cache.contains(cache_keys[u])]
 
-            current_trip: Trip|None = None
-            current_stop_time: StopTime|None = None
+    with ExitStack() as stack:
+        if jobs > 1 and len(pending_units) > 1:
+            executor: ProcessPoolExecutor = stack.enter_context(ProcessPoolExecutor(
+                max_workers=min(jobs, len(pending_units)),
+                initializer=_init_timetable_worker,
+                initargs=(run_profiler.trace_memory, *arguments)
+            ))
 
-            if Configuration.config.timetables.layout_type == 'vertical':
-                for cell in iter_data_vertical(ws, ws[Configuration.config.timetables.data_start_area]):
-                    if cell.value == Configuration.config.timetables.run_through_char:
+            parsed_results = executor.map(_process_timetable_file_worker, pending_units)
+        else:
+            parsed_results = (_profile_timetable_file(u, *arguments) for u in pending_units)
+
+        # trip IDs are assigned while merging in unit order, so the
+        # numbering does not depend on the number of worker processes
+        # or on which units were loaded from the cache
+        unit_results: Iterator = _unit_results(units, pending_units, parsed_results, cache, cache_keys, arguments, run_profiler)
+        for unit, (unit_result, unit_diagnostics) in zip(units, unit_results):
+            run_diagnostics.merge(unit_diagnostics)
+
+            for trip, stop_time_list in unit_result:
+                trip.route_id = interned_ids.setdefault(trip.route_id, trip.route_id)
+                trip.service_id = interned_ids.setdefault(trip.service_id, trip.service_id)
+
+                pattern: StopPattern = run_patterns.intern(tuple(interned_ids.setdefault(st.stop_id, st.stop_id) for st in stop_time_list))
+
+                if drop_duplicate_trips:
+                    # run-through trips and overlapping lines list the same trip in several files
+                    trip_key: tuple = (
+                        trip.route_id,
+                        trip.service_id,
+                        pattern,
+                        tuple((st.arrival_time, st.departure_time) for st in stop_time_list)
+                    )
+
+                    original_trip: Trip|None = trip_keys.get(trip_key)
+                    if original_trip is not None:
+                        # attributes only the duplicate has are merged into the first trip
+                        for field_name in Trip.__slots__:
+                            if getattr(original_trip, field_name) is None:
+                                setattr(original_trip, field_name, getattr(trip, field_name))
+
+                        run_diagnostics.report('duplicate_trip', original_trip.trip_id, _unit_name(unit))
                         continue
-                    
-                    if not cell.column == current_trip_idx:
-                        if current_trip is not None:
-                            trip_result_list.append(current_trip)
-                        
-                        current_trip = Trip()
-                        current_trip.trip_id = Configuration.config.defaults.trip_id_pattern.format(trip_id=len(trip_result_list) + 1).zfill(6)
-                        
-                        route_idx: str = ws.cell(Configuration.config.timetables.route_identification_index, cell.column).value
-                        if route_idx in route_meta_list:
-                            current_trip.route_id = route_meta_list[route_idx].route_id
-                        else:
-                            logging.warning(f"Route identification '{route_idx}' not found in route metadata. Using route identification as route_id fallback.")
-                            current_trip.route_id = route_idx
-                        
-                        service_idx: str = ws.cell(Configuration.config.timetables.service_identification_index, cell.column).value
-                        if service_idx in calendar_meta_list:
-                            current_trip.service_id = calendar_meta_list[service_idx].service_id
-                        elif service_idx in calendar_exception_meta_list:
-                            current_trip.service_id = calendar_exception_meta_list[service_idx][0].service_id
-                        else:
-                            logging.warning(f"Service identification '{service_idx}' not found in calendar metadata. Using service identification as service_id fallback.")
-                            current_trip.service_id = service_idx
-
-                        shape_idx: str = ws.cell(Configuration.config.timetables.shape_identification_index, cell.column).value
-
-                        current_trip.trip_short_name = ws.cell(Configuration.config.timetables.trip_short_name_index, cell.column).value
-                        current_trip.trip_headsign = ws.cell(Configuration.config.timetables.trip_headsign_index, cell.column).value
-
-                        current_trip_idx = cell.column
-                        
-                    stop_idx: str = ws.cell(cell.row, column_index_from_string(Configuration.config.timetables.stop_identification_index)).value
-                    if not stop_idx == current_stop_idx:
-                        current_stop_time = StopTime()
-                        current_stop_time.trip_id = current_trip.trip_id
-
-                        if stop_idx in stop_meta_list:
-                            current_stop_time.stop_id = stop_meta_list[stop_idx].stop_id
-                        else:
-                            logging.warning(f"Stop identification '{stop_idx}' not found in stop metadata. Using stop identification as stop_id fallback.")
-                            current_stop_time.stop_id = stop_idx
-
-                        current_stop_time.stop_sequence = len([st for st in stop_time_result_list if st.trip_id == current_trip.trip_id]) + 1
-                        current_stop_time.arrival_time = cell.value
-                        current_stop_time.departure_time = cell.value
-
-                        stop_time_result_list.append(current_stop_time)
-                        current_stop_idx = stop_idx
-                    else:
-                        if stop_idx in stop_meta_list:
-                            resolved_stop_id: str = stop_meta_list[stop_idx].stop_id
-                        else:
-                            resolved_stop_id: str = stop_idx
-
-                        last_stop_time: StopTime = next(st for st in reversed(stop_time_result_list) if st.trip_id == current_trip.trip_id and st.stop_id == resolved_stop_id)
-                        last_stop_time.departure_time = cell.value
 
-                if current_trip is not None:
-                    trip_result_list.append(current_trip)
+                trip.trip_id = plan.trip_id(len(trip_result_list) + 1)
+                run_patterns.assign(trip.trip_id, pattern)
 
-            else:
-                raise NotImplementedError("Only 'vertical' layout type is currently implemented.")
+                if drop_duplicate_trips:
+                    trip_keys[trip_key] = trip
+
+                # stop times share the stop IDs of their pattern
+                for stop_time, stop_id in zip(stop_time_list, pattern.stop_ids):
+                    stop_time.trip_id = trip.trip_id
+                    stop_time.stop_id = stop_id
+
+                trip_result_list.append(trip)
+                stop_time_result_list.extend(stop_time_list)
+
+    if diagnostics is None:
+        for entry in run_diagnostics.entries():
+            logging.warning(f"{entry['message']} ({entry['count']} occurrences)")
 
     return trip_result_list, stop_time_result_list
\ No newline at end of file
@@ -0,0 +1,315 @@
+import posixpath
+
+from datetime import time
+from functools import lru_cache
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from typing import Any, BinaryIO, Generator
+from xml.etree.ElementTree import iterparse
+from zipfile import ZipFile
+
+_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+_OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+_SHARED_STRINGS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+_STYLES_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+_WORKSHEET_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet'
+
+_ROW = f"{_MAIN_NS}row"
+_CELL = f"{_MAIN_NS}c"
+_VALUE = f"{_MAIN_NS}v"
+_INLINE_STRING = f"{_MAIN_NS}is"
+_STRING_ITEM = f"{_MAIN_NS}si"
+_TEXT = f"{_MAIN_NS}t"
+_RUN = f"{_MAIN_NS}r"
+
+_SECONDS_PER_DAY = 86400
+
+def time_serial_to_seconds(value: float) -> int|None:
+    """
+    Decode an Excel time serial, the fraction of a day, into whole seconds.
+
+    The serial is rounded to milliseconds the same way openpyxl does.
+
+    Returns:
+        Seconds since midnight or None if value is not a time of day in
+        whole seconds
+    """
+    if not 0 <= value < 1:
+        return None
+
+    milliseconds: int = round(value * _SECONDS_PER_DAY * 1000)
+    if milliseconds % 1000 or milliseconds >= _SECONDS_PER_DAY * 1000:
+        return None
+
+    return milliseconds // 1000
+
+@lru_cache(maxsize=None)
+def _time_of_day(seconds: int) -> time:
+    minutes, second = divmod(seconds, 60)
+    hour, minute = divmod(minutes, 60)
+    return time(hour, minute, second)
+
+@lru_cache(maxsize=None)
+def _column_index(column_letter: str) -> int:
+    return column_index_from_string(column_letter)
+
+def _text_content(node: Any) -> str:
+    # plain text and text of rich text runs, phonetic runs are left out
+    snippets: list[str] = []
+
+    plain: Any = node.find(_TEXT)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+
+    for run in node.iterfind(_RUN):
+        text: str|None = run.findtext(_TEXT)
+        if text is not None:
+            snippets.append(text)
+
+    return ''.join(snippets)
+
+def _relationships(archive: ZipFile, part: str) -> dict[str, tuple[str, str]]:
+    """
+    Return the relationships of a package part as id -> (type, target part).
+    """
+    directory, filename = posixpath.split(part)
+    rels_part: str = posixpath.join(directory, '_rels', f"{filename}.rels")
+
+    if rels_part not in archive.NameToInfo:
+        return {}
+
+    relationships: dict[str, tuple[str, str]] = {}
+    with archive.open(rels_part) as source:
+        for _, node in iterparse(source):
+            if node.tag == f"{_PACKAGE_REL_NS}Relationship":
+                target: str = node.get('Target')
+                if target.startswith('/'):
+                    target = target[1:]
+                else:
+                    target = posixpath.normpath(posixpath.join(directory, target))
+
+                relationships[node.get('Id')] = (node.get('Type'), target)
+
+    return relationships
+
+def _read_shared_strings(source: BinaryIO) -> list[str]:
+    strings: list[str] = []
+    for _, node in iterparse(source):
+        if node.tag == _STRING_ITEM:
+            strings.append(_text_content(node).replace('x005F_', ''))
+            node.clear()
+
+    return strings
+
+def _read_date_styles(source: BinaryIO) -> tuple[set[int], set[int]]:
+    """
+    Return the indices of cell styles with a date and with a timedelta format.
+    """
+    custom_formats: dict[int, str] = {}
+    cell_formats: list[int] = []
+
+    in_cell_xfs: bool = False
+    for event, node in iterparse(source, events=('start', 'end')):
+        if node.tag == f"{_MAIN_NS}cellXfs":
+            in_cell_xfs = event == 'start'
+        elif event == 'end' and node.tag == f"{_MAIN_NS}numFmt":
+            custom_formats[int(node.get('numFmtId'))] = node.get('formatCode')
+        elif event == 'end' and node.tag == f"{_MAIN_NS}xf" and in_cell_xfs:
+            cell_formats.append(int(node.get('numFmtId', 0)))
+
+    date_styles: set[int] = set()
+    timedelta_styles: set[int] = set()
+    for idx, format_id in enumerate(cell_formats):
+        number_format: str|None = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id))
+        if number_format is None:
+            continue
+
+        if is_date_format(number_format):
+            date_styles.add(idx)
+        if is_timedelta_format(number_format):
+            timedelta_styles.add(idx)
+
+    return date_styles, timedelta_styles
+
+def _cast_number(value: str) -> int|float:
+    if '.' in value or 'E' in value or 'e' in value:
+        return float(value)
+
+    return int(value)
+
+class _Workbook:
+    """
+    Package parts of a workbook needed for reading the values of its sheets.
+    """
+    def __init__(self, archive: ZipFile, read_styles: bool = True):
+        office_document: str = next(
+            target for rel_type, target in _relationships(archive, '').values()
+            if rel_type == _OFFICE_DOCUMENT_REL
+        )
+        relationships: dict[str, tuple[str, str]] = _relationships(archive, office_document)
+
+        # all sheets in workbook order as (name, relationship type, part)
+        sheets: list[tuple[str, str, str]] = []
+        active_sheet_idx: int|None = None
+        self.epoch = CALENDAR_WINDOWS_1900
+
+        with archive.open(office_document) as source:
+            for _, node in iterparse(source):
+                if node.tag == f"{_MAIN_NS}sheet":
+                    rel_type, part = relationships[node.get(f"{_REL_NS}id")]
+                    sheets.append((node.get('name'), rel_type, part))
+                elif node.tag == f"{_MAIN_NS}workbookView" and active_sheet_idx is None:
+                    active_sheet_idx = int(node.get('activeTab', 0))
+                elif node.tag == f"{_MAIN_NS}workbookPr" and node.get('date1904') in ('1', 'true'):
+                    self.epoch = CALENDAR_MAC_1904
+
+        # the first workbook view defines the active sheet, like in openpyxl
+        self.active_sheet_part: str = sheets[active_sheet_idx or 0][2]
+        self.worksheet_parts: dict[str, str] = {
+            name: part for name, rel_type, part in sheets if rel_type == _WORKSHEET_REL
+        }
+
+        self.shared_strings: list[str] = []
+        self.date_styles: set[int] = set()
+        self.timedelta_styles: set[int] = set()
+
+        if not read_styles:
+            return
+
+        for rel_type, target in relationships.values():
+            if rel_type == _SHARED_STRINGS_REL:
+                with archive.open(target) as source:
+                    self.shared_strings = _read_shared_strings(source)
+            elif rel_type == _STYLES_REL:
+                with archive.open(target) as source:
+                    self.date_styles, self.timedelta_styles = _read_date_styles(source)
+
+    def number_value(self, style_id: str|None, text: str) -> Any:
+        """
+        Decode the text of a numeric cell with the style style_id.
+        """
+        value: int|float = _cast_number(text)
+
+        style_idx: int = int(style_id or 0)
+        if style_idx not in self.date_styles:
+            return value
+
+        if style_idx not in self.timedelta_styles:
+            seconds: int|None = time_serial_to_seconds(value)
+            if seconds is not None:
+                return _time_of_day(seconds)
+
+        try:
+            return from_excel(value, self.epoch, timedelta=style_idx in self.timedelta_styles)
+        except (OverflowError, ValueError):
+            return '#VALUE!'
+
+def xlsx_sheet_names(filename: str) -> list[str]:
+    """
+    Return the names of all worksheets of an .xlsx file in workbook order.
+    """
+    with ZipFile(filename) as archive:
+        return list(_Workbook(archive, read_styles=False).worksheet_parts)
+
+def iter_xlsx_rows(filename: str, min_row: int = 1, sheet_name: str|None = None) -> Generator[tuple, None, None]:
+    """
+    Stream the rows of a worksheet of an .xlsx file as value tuples.
+
+    The shared strings, the number formats of the styles and the sheet
+    XML are parsed incrementally without building any openpyxl objects.
+    Values are decoded like openpyxl does in read-only, data-only mode,
+    so a Sheet built from these rows is identical to one built by
+    x2gtfs.reader.iter_sheet_rows. Time serials are decoded into seconds
+    and returned as datetime.time.
+
+    Args:
+        filename: Name of the .xlsx file
+        min_row: First row (1-based) to yield
+        sheet_name: Name of the worksheet, None for the active sheet
+
+    Yields:
+        Tuples of cell values, one per row
+    """
+    with ZipFile(filename) as archive:
+        workbook: _Workbook = _Workbook(archive)
+
+        if sheet_name is None:
+            sheet_part: str = workbook.active_sheet_part
+        elif sheet_name in workbook.worksheet_parts:
+            sheet_part = workbook.worksheet_parts[sheet_name]
+        else:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+
+        shared_strings: list[str] = workbook.shared_strings
+        number_values: dict[tuple[str|None, str], Any] = {}
+
+        row_counter: int = 0
+        expected_row: int = min_row
+
+        with archive.open(sheet_part) as source:
+            for _, node in iterparse(source):
+                if node.tag != _ROW:
+                    continue
+
+                row_number: str|None = node.get('r')
+                row_counter = int(float(row_number)) if row_number is not None else row_counter + 1
+
+                values: list[Any] = []
+                column_counter: int = 0
+
+                for cell in node.iterfind(_CELL):
+                    coordinate: str|None = cell.get('r')
+                    if coordinate is not None:
+                        column_counter = _column_index(coordinate.rstrip('0123456789'))
+                    else:
+                        column_counter += 1
+
+                    data_type: str|None = cell.get('t')
+                    value: Any = None
+
+                    if data_type == 'inlineStr':
+                        inline_string: Any = cell.find(_INLINE_STRING)
+                        if inline_string is not None:
+                            value = _text_content(inline_string)
+                    else:
+                        value = cell.findtext(_VALUE) or None
+
+                        if value is None:
+                            pass
+                        elif data_type is None or data_type == 'n':
+                            # timetables repeat the same few times, decode each distinct value once
+                            number_key: tuple[str|None, str] = (cell.get('s'), value)
+                            if number_key in number_values:
+                                value = number_values[number_key]
+                            else:
+                                value = number_values[number_key] = workbook.number_value(*number_key)
+                        elif data_type == 's':
+                            value = shared_strings[int(value)]
+                        elif data_type == 'b':
+                            value = bool(int(value))
+                        elif data_type == 'd':
+                            value = from_ISO8601(value)
+
+                    if column_counter == len(values) + 1:
+                        values.append(value)
+                    else:
+                        if column_counter > len(values):
+                            values.extend([None] * (column_counter - len(values)))
+
+                        values[column_counter - 1] = value
+
+                node.clear()
+
+                if row_counter < expected_row:
+                    continue
+
+                # rows missing in the sheet XML are empty rows
+                for _ in range(expected_row, row_counter):
+                    yield ()
+
+                expected_row = row_counter + 1
+                yield tuple(values)
@@ -0,0 +1,29 @@
+import os
+import pytest
+
+from click.testing import CliRunner, Result
+from typing import Callable
+from zipfile import ZipFile
+
+from x2gtfs.__main__ import main
+
+# sample configurations refer to their files relative to the repository root
+REPOSITORY_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def convert(tmp_path, monkeypatch) -> Callable[..., dict[str, bytes]]:
+    """
+    Convert a configuration with the command line and return the members of the feed.
+    """
+    monkeypatch.chdir(REPOSITORY_DIRECTORY)
+
+    def run(config_filename: str, *options: str) -> dict[str, bytes]:
+        output_filename: str = str(tmp_path / f"feed{len(list(tmp_path.iterdir()))}.zip")
+        result: Result = CliRunner().invoke(main, [config_filename, output_filename, '--no-cache', *options], catch_exceptions=False)
+        assert result.exit_code == 0, result.output
+
+        with ZipFile(output_filename) as zipf:
+            return {name: zipf.read(name) for name in zipf.namelist()}
+
+    return run
@@ -0,0 +1,55 @@
+import csv
+import os
+import yaml
+
+from datetime import datetime, time
+from typing import Any
+
+from x2gtfs.reader import iter_sheet_rows
+
+REPOSITORY_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _csv_value(value: Any) -> str:
+    # values are written the way spreadsheet applications export them
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%d.%m.%Y')
+    if isinstance(value, time):
+        return value.strftime('%H:%M:%S')
+
+    return str(value)
+
+def _export_csv(xlsx_filename: str, csv_filename: str) -> str:
+    with open(csv_filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        for row in iter_sheet_rows(os.path.join(REPOSITORY_DIRECTORY, xlsx_filename)):
+            writer.writerow([_csv_value(v) for v in row])
+
+    return csv_filename
+
+def test_csv_export_of_samples_converts_like_workbooks(convert, tmp_path):
+    with open(os.path.join(REPOSITORY_DIRECTORY, 'samples', 'simplexl', 'config.yaml')) as f:
+        config: dict = yaml.safe_load(f)
+
+    config['config']['csv'] = {'delimiter': ';'}
+    for section in config['config']['metadata'].values():
+        section['input_filename'] = _export_csv(section['input_filename'], str(tmp_path / f"{os.path.basename(section['input_filename'])}.csv"))
+
+    timetable_directory: str = config['config']['timetables']['input_directory']
+    config['config']['timetables']['input_directory'] = str(tmp_path / 'timetables')
+    os.makedirs(tmp_path / 'timetables')
+    for filename in os.listdir(os.path.join(REPOSITORY_DIRECTORY, timetable_directory)):
+        if filename.endswith('.xlsx'):
+            _export_csv(os.path.join(timetable_directory, filename), str(tmp_path / 'timetables' / f"{filename[:-len('.xlsx')]}.csv"))
+
+    csv_config_filename: str = str(tmp_path / 'config.yaml')
+    with open(csv_config_filename, 'w') as f:
+        yaml.safe_dump(config, f, allow_unicode=True)
+
+    xlsx_members: dict[str, bytes] = convert('samples/simplexl/config.yaml')
+    csv_members: dict[str, bytes] = convert(csv_config_filename)
+
+    assert 'stop_times.txt' in xlsx_members
+    assert csv_members == xlsx_members
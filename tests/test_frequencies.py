@@ -0,0 +1,48 @@
+from x2gtfs.frequencies import compress_frequencies
+from x2gtfs.models import Trip, StopTime, Frequency
+from x2gtfs.times import format_time, time_to_seconds
+
+
+def _network(departures: list[int]) -> tuple[list[Trip], list[StopTime]]:
+    # one trip per departure, all trips of one route and service with the same two stops
+    trips: list[Trip] = []
+    stop_times: list[StopTime] = []
+    for i, departure in enumerate(departures):
+        trip_id: str = f"trip{i}"
+        trips.append(Trip(trip_id=trip_id, route_id='route', service_id='service'))
+        stop_times.append(StopTime(trip_id=trip_id, stop_id='A', stop_sequence=1, arrival_time=format_time(departure), departure_time=format_time(departure)))
+        stop_times.append(StopTime(trip_id=trip_id, stop_id='B', stop_sequence=2, arrival_time=format_time(departure + 600), departure_time=format_time(departure + 600)))
+
+    return trips, stop_times
+
+def _expand(frequency: Frequency, inclusive: bool) -> list[int]:
+    end: int = time_to_seconds(frequency.end_time) + (1 if inclusive else 0)
+    return list(range(time_to_seconds(frequency.start_time), end, frequency.headway_secs))
+
+def _assert_expands_to_departures(departures: list[int]) -> None:
+    trips, stop_times = _network(departures)
+    result_trips, result_stop_times, frequencies = compress_frequencies(trips, stop_times)
+
+    assert frequencies
+    frequency_trip_ids: set[str] = {f.trip_id for f in frequencies}
+
+    for inclusive in (False, True):
+        starts: list[int] = [
+            time_to_seconds(st.departure_time) for st in result_stop_times
+            if st.stop_sequence == 1 and st.trip_id not in frequency_trip_ids
+        ]
+        for frequency in frequencies:
+            assert time_to_seconds(frequency.start_time) < time_to_seconds(frequency.end_time)
+            starts.extend(_expand(frequency, inclusive))
+
+        assert sorted(starts) == sorted(departures)
+
+def test_frequency_expands_to_original_starts():
+    # 09:06 to 09:34 every 420 s, the run must not end at 09:41:00
+    _assert_expands_to_departures([32760 + i * 420 for i in range(5)])
+
+def test_frequency_expands_to_original_starts_after_midnight():
+    _assert_expands_to_departures([85800 + i * 300 for i in range(4)])
+
+def test_adjacent_runs_expand_to_original_starts():
+    _assert_expands_to_departures([21600 + i * 600 for i in range(6)] + [25200 + i * 900 for i in range(1, 6)] + [30000, 30017])
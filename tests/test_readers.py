@@ -0,0 +1,6 @@
+def test_fast_reader_converts_samples_like_openpyxl(convert):
+    openpyxl_members: dict[str, bytes] = convert('samples/simplexl/config.yaml', '--reader', 'openpyxl')
+    fast_members: dict[str, bytes] = convert('samples/simplexl/config.yaml', '--reader', 'fast')
+
+    assert 'stop_times.txt' in openpyxl_members
+    assert fast_members == openpyxl_members